@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark - Single-call versus two-pass blog generation
+
+Generates blog posts in both generation modes and reports the latency, the
+number of LLM calls and the tokens used per post. By default the Groq API is
+simulated: each completion takes a fixed time to first token plus a time per
+generated token, and token counts are estimated from word counts, so the
+benchmark runs offline and isolates the cost of the extra round trip. With
+--live the real API is called (GROQ_API_KEY must be set). Live completions
+can be recorded with --cache record and replayed offline later with
+--cache replay; the random seeds are fixed so both runs send the same requests.
+
+Usage:
+    cd backend
+    python benchmarks/bench_generation_modes.py [--posts 3] [--max-length 800] [--live]
+        [--cache {record,replay,read_write}] [--seed 0]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# GroqService refuses to start without a key; the simulated API does not check it
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import httpx
+
+from services.groq_service import groq_service
+from services.humanizer_service import humanizer
+from services.llm_gateway import LLMGateway
+from services.llm_cache import LLMCache
+from services.pipeline import run_pipeline
+from benchmarks.bench_text_buffer import make_document
+
+# Rough tokens per English word for the simulated usage
+TOKENS_PER_WORD = 1.3
+
+
+class SimulatedGroq:
+    """Chat completions endpoint that answers with filler text at a fixed token rate"""
+
+    def __init__(self, first_token_ms: float, tokens_per_second: float):
+        self.first_token = first_token_ms / 1000
+        self.tokens_per_second = tokens_per_second
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        prompt_words = sum(len(message["content"].split()) for message in body["messages"])
+        # Both callers budget two tokens per expected word: the requested length
+        # for a generation, the input length for a rewrite
+        words = body["max_tokens"] // 2
+        completion_tokens = int(words * TOKENS_PER_WORD)
+        await asyncio.sleep(self.first_token + completion_tokens / self.tokens_per_second)
+        return httpx.Response(200, json={
+            "model": body["model"],
+            "choices": [{"message": {"content": make_document(words)}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": int(prompt_words * TOKENS_PER_WORD),
+                "completion_tokens": completion_tokens
+            }
+        })
+
+
+def generate_post(prompt: str, max_length: int, style: str, mode: str, gateway: LLMGateway) -> str:
+    """Generate and process one post the way /generate-blog does (without post-processing)"""
+    response = gateway.chat_sync(**groq_service.generation_request(prompt, max_length, style, mode))
+    draft = groq_service.draft_result(response, mode)
+    plan = groq_service.blog_plan(style, mode)
+    return run_pipeline(plan, draft["content"], random.getrandbits(32), max_words=max_length)["processed_content"]
+
+
+def run_mode(mode: str, posts: int, max_length: int, gateway: LLMGateway) -> dict:
+    """Generate posts in one mode and collect latency and gateway usage"""
+    gateway.metrics.clear()
+    latencies = []
+    for _ in range(posts):
+        started = time.perf_counter()
+        generate_post("Why remote teams write things down", max_length, "casual", mode, gateway)
+        latencies.append(time.perf_counter() - started)
+
+    usage = gateway.get_metrics()["purposes"].values()
+    return {
+        "latency_ms": statistics.mean(latencies) * 1000,
+        "calls": sum(metrics["requests"] for metrics in usage) / posts,
+        "cached": sum(metrics["cache_hits"] for metrics in usage) / posts,
+        "prompt_tokens": sum(metrics["prompt_tokens"] for metrics in usage) / posts,
+        "completion_tokens": sum(metrics["completion_tokens"] for metrics in usage) / posts
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=3, help="Posts generated per mode")
+    parser.add_argument("--max-length", type=int, default=800, help="Requested words per post")
+    parser.add_argument("--first-token-ms", type=float, default=250, help="Simulated time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=275, help="Simulated generation speed")
+    parser.add_argument("--live", action="store_true", help="Call the real Groq API")
+    parser.add_argument("--cache", choices=["record", "replay", "read_write"],
+                        help="Record completions to, or replay them from, the LLM cache")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the local passes")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if args.live or args.cache == "replay":
+        gateway = LLMGateway(cache=LLMCache(mode=args.cache))
+    else:
+        gateway = LLMGateway(
+            api_key="benchmark",
+            transport=httpx.MockTransport(SimulatedGroq(args.first_token_ms, args.tokens_per_second)),
+            cache=LLMCache(mode=args.cache)
+        )
+    humanizer.gateway = gateway
+
+    print(
+        f"{'mode':>12} {'latency ms':>12} {'LLM calls':>10} {'cached':>7} "
+        f"{'prompt tok':>11} {'output tok':>11} {'total tok':>10}"
+    )
+    for mode in ["two_pass", "single_call"]:
+        row = run_mode(mode, args.posts, args.max_length, gateway)
+        print(
+            f"{mode:>12} {row['latency_ms']:>12.0f} {row['calls']:>10.1f} {row['cached']:>7.1f} {row['prompt_tokens']:>11.0f} "
+            f"{row['completion_tokens']:>11.0f} {row['prompt_tokens'] + row['completion_tokens']:>10.0f}"
+        )
+    gateway.close()
+
+
+if __name__ == "__main__":
+    main()
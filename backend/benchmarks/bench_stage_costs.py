@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark - Cost of each pipeline stage
+
+Runs every local pipeline stage on its own over a generated document and
+reports its cost in microseconds per word (the best of several runs). With
+--write the costs are saved to config.STAGE_COSTS_FILE, where the scheduler
+reads them to decide which optional stages to skip for requests with a
+deadline_ms. The llm_rewrite stage is not measured: its time depends on the
+API, not on this machine.
+
+Usage:
+    cd backend
+    python benchmarks/bench_stage_costs.py [--words 5000] [--runs 5] [--write]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import config
+from services.pipeline import STAGES, Plan, run_pipeline
+from benchmarks.bench_text_buffer import make_document
+
+
+def measure(name: str, document: str, runs: int) -> float:
+    """Best time of a stage on the document, in microseconds per word"""
+    plan = Plan(name, [STAGES[name]], [])
+    words = len(document.split())
+    best = float("inf")
+    for seed in range(runs):
+        started = time.perf_counter()
+        run_pipeline(plan, document, seed)
+        best = min(best, time.perf_counter() - started)
+    return best / words * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=5000, help="Words in the generated document")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--write", action="store_true", help=f"Save the costs to {config.STAGE_COSTS_FILE}")
+    args = parser.parse_args()
+
+    document = make_document(args.words)
+    costs = {}
+    print(f"{'stage':>20} {'processor':>10} {'optional':>9} {'us/word':>9}")
+    for name, stage in STAGES.items():
+        if stage.rewrites:
+            continue
+        costs[name] = round(measure(name, document, args.runs), 3)
+        print(f"{name:>20} {stage.processor:>10} {str(stage.optional):>9} {costs[name]:>9.2f}")
+
+    if args.write:
+        with open(config.STAGE_COSTS_FILE, "w", encoding="utf-8") as costs_file:
+            json.dump(costs, costs_file, indent=2)
+            costs_file.write("\n")
+        print(f"Wrote {config.STAGE_COSTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark - Scaling of the text rewriting passes
+
+Times the humanizer on documents of doubling size and compares rewriting a
+document match by match with plain string replacement against the piece-table
+buffer. Per-word cost should stay flat for the humanizer and the buffer, while
+string replacement grows with the document size.
+
+Usage:
+    cd backend
+    python benchmarks/bench_text_buffer.py [--max-words 160000]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.humanizer_service import humanizer
+from services.text_buffer import TextBuffer
+
+SAMPLE = (
+    "It is important to note that the utilization of modern tools can facilitate "
+    "substantial improvements. Furthermore, organizations that implement these "
+    "methodologies demonstrate considerable gains. In order to understand the "
+    "results, it should be noted that they do not appear immediately. The "
+    "subsequent analysis will commence shortly. This approach is not optional. "
+)
+
+
+def make_document(words: int) -> str:
+    """Repeat the sample paragraph until the document has the given number of words"""
+    sample_words = SAMPLE.split()
+    repeats = words // len(sample_words) + 1
+    return "\n\n".join([SAMPLE] * repeats)
+
+
+def time_call(function, *args) -> float:
+    """Run a function once and return the elapsed seconds"""
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def replace_with_strings(text: str, pattern: re.Pattern) -> str:
+    """Replace every match one at a time on an immutable string"""
+    for match in pattern.findall(text):
+        text = text.replace(match, "really", 1)
+    return text
+
+
+def replace_with_buffer(text: str, pattern: re.Pattern) -> str:
+    """Replace every match through the piece-table buffer"""
+    buffer = TextBuffer(text)
+    buffer.sub(pattern, "really")
+    return buffer.text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the text rewriting passes")
+    parser.add_argument("--min-words", type=int, default=5000)
+    parser.add_argument("--max-words", type=int, default=160000)
+    args = parser.parse_args()
+
+    sizes = []
+    size = args.min_words
+    while size <= args.max_words:
+        sizes.append(size)
+        size *= 2
+
+    print("📈 Humanizer (heavy) scaling")
+    print(f"{'words':>10} {'ms':>10} {'µs/word':>10}")
+    for size in sizes:
+        document = make_document(size)
+        elapsed = time_call(humanizer.humanize_text, document, "heavy", False, 0)
+        print(f"{size:>10} {elapsed * 1000:>10.1f} {elapsed / size * 1e6:>10.2f}")
+
+    print("\n📈 Match-by-match replacement")
+    pattern = re.compile(r"substantial|considerable", re.IGNORECASE)
+    print(f"{'words':>10} {'string ms':>10} {'buffer ms':>10}")
+    for size in sizes:
+        document = make_document(size)
+        string_time = time_call(replace_with_strings, document, pattern)
+        buffer_time = time_call(replace_with_buffer, document, pattern)
+        print(f"{size:>10} {string_time * 1000:>10.1f} {buffer_time * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
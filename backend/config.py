@@ -13,6 +13,45 @@ class Config:
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
     GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+    # LLM Gateway Configuration
+    # Model pinned per kind of call; an unset entry is left to the model router
+    LLM_MODELS = {
+        "generate_blog": os.getenv("GENERATE_BLOG_MODEL", ""),
+        "humanize": os.getenv("HUMANIZE_MODEL", "")
+    }
+    # Models the router chooses between: the rewrite and short posts go to the
+    # fast tier, long posts and the styles below to the quality tier
+    LLM_MODEL_TIERS = {
+        "fast": os.getenv("LLM_FAST_MODEL", "llama-3.1-8b-instant"),
+        "quality": os.getenv("LLM_QUALITY_MODEL", GROQ_MODEL)
+    }
+    LLM_ROUTER_SHORT_WORDS = int(os.getenv("LLM_ROUTER_SHORT_WORDS", "400"))
+    LLM_ROUTER_QUALITY_STYLES = ["professional", "technical", "factual"]
+    # A model with this many calls in flight, or slower than this per generated
+    # token, sends new calls to the other tier
+    LLM_ROUTER_MAX_IN_FLIGHT = int(os.getenv("LLM_ROUTER_MAX_IN_FLIGHT", "8"))
+    LLM_ROUTER_SLOW_MS_PER_TOKEN = float(os.getenv("LLM_ROUTER_SLOW_MS_PER_TOKEN", "25"))
+    # Weight of the newest response in the moving average of a model's speed
+    LLM_ROUTER_SMOOTHING = 0.2
+    # Completion cache: "off", "read_write", "record" or "replay" (recorded answers only, no network)
+    LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "llm_cache.db"))
+    # Least recently used answers are evicted past this size
+    LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+    # Seconds allowed for one attempt and for opening a connection
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+    # Attempts after the first for timeouts, rate limits and server errors
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+    LLM_MAX_BACKOFF_SECONDS = float(os.getenv("LLM_MAX_BACKOFF_SECONDS", "8"))
+    # Pooled keep-alive connections per process and how long idle ones stay open
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+    # Whether the API returns several choices for one request ("n"); Groq accepts only n=1,
+    # so alternatives are requested as concurrent calls unless this is set
+    LLM_SUPPORTS_N = os.getenv("LLM_SUPPORTS_N", "false").lower() == "true"
     
     # Application Configuration
     APP_NAME = "Blog Generator AI Agent"
@@ -22,6 +61,14 @@ class Config:
     DEFAULT_MAX_LENGTH = 800
     DEFAULT_STYLE = "informative"
     DEFAULT_PROCESSING_INTENSITY = "heavy"
+    # "two_pass" rewrites each draft with a second Groq call, "single_call"
+    # asks for the final voice in the first completion and only runs the local passes
+    GENERATION_MODES = ["two_pass", "single_call"]
+    DEFAULT_GENERATION_MODE = os.getenv("GENERATION_MODE", "two_pass")
+    # Recent drafts kept for requests that accept the draft of a similar earlier prompt
+    PROMPT_INDEX_SIZE = int(os.getenv("PROMPT_INDEX_SIZE", "1000"))
+    # Most alternative posts one /generate-blog request may ask for
+    MAX_BLOG_VARIANTS = int(os.getenv("MAX_BLOG_VARIANTS", "5"))
     
     # Available writing styles
     AVAILABLE_STYLES = [
@@ -40,7 +87,158 @@ class Config:
         "plagiarism_focused",
         "ai_focused"
     ]
-    
+
+    # Pipeline Configuration
+    # Stage sequences per intensity and per blog style (stages are defined in
+    # services/pipeline.py); "@name" includes another pipeline and "@post_process"
+    # the post-processing pipeline of the request's processing_intensity
+    PIPELINES = {
+        "humanize:light": ["break_ai_patterns", "statistical_patterns", "polish", "llm_rewrite"],
+        "humanize:medium": [
+            "ai_phrases", "contractions", "vocabulary",
+            "break_ai_patterns", "statistical_patterns", "polish", "llm_rewrite"
+        ],
+        "humanize:heavy": [
+            "ai_phrases", "contractions", "vocabulary",
+            "personal_touches", "imperfections", "sentence_structure",
+            "break_ai_patterns", "statistical_patterns", "polish", "llm_rewrite"
+        ],
+        "post_process:balanced": [
+            "balanced_phrases", "natural_elements", "synonyms", "unique_variations",
+            "optimize_balanced", "balanced_polish"
+        ],
+        "post_process:plagiarism_focused": [
+            "balanced_phrases", "natural_elements", "synonyms", "unique_variations",
+            "optimize_plagiarism", "balanced_polish"
+        ],
+        "post_process:ai_focused": [
+            "balanced_phrases", "natural_elements", "synonyms", "unique_variations",
+            "ai_contractions", "balanced_polish"
+        ],
+        "blog:default": ["@humanize:heavy", "trim", "@post_process"],
+        # Humanization is skipped to keep these styles objective
+        "blog:factual": ["trim", "@post_process"],
+        "blog:professional": ["trim", "@post_process"]
+    }
+
+    # Measured microseconds per word of each stage, written by benchmarks/bench_stage_costs.py;
+    # requests with a deadline_ms skip optional stages that would not fit in it
+    STAGE_COSTS_FILE = os.getenv("STAGE_COSTS_FILE", os.path.join(os.path.dirname(__file__), "stage_costs.json"))
+    # Multiplier for the measured costs on machines slower (> 1) or faster (< 1) than the benchmark's
+    STAGE_COST_SCALE = float(os.getenv("STAGE_COST_SCALE", "1.0"))
+
+    # Transform Executor Configuration
+    # "process" isolates CPU-heavy transforms from the event loop and from each other,
+    # "thread" avoids process start-up and pickling costs for small deployments
+    TRANSFORM_EXECUTOR = os.getenv("TRANSFORM_EXECUTOR", "process")
+
+    # Each endpoint gets its own worker pool and bounded queue so that a large
+    # request on one endpoint cannot delay small requests on another
+    TRANSFORM_LANES = {
+        "humanize": {
+            "workers": int(os.getenv("HUMANIZE_WORKERS", "2")),
+            "queue_size": int(os.getenv("HUMANIZE_QUEUE_SIZE", "64"))
+        },
+        "post_process": {
+            "workers": int(os.getenv("POST_PROCESS_WORKERS", "2")),
+            "queue_size": int(os.getenv("POST_PROCESS_QUEUE_SIZE", "16"))
+        },
+        "generate_blog": {
+            "workers": int(os.getenv("GENERATE_BLOG_WORKERS", "2")),
+            "queue_size": int(os.getenv("GENERATE_BLOG_QUEUE_SIZE", "32"))
+        },
+        "humanize_batch": {
+            "workers": int(os.getenv("HUMANIZE_BATCH_WORKERS", "2")),
+            "queue_size": int(os.getenv("HUMANIZE_BATCH_QUEUE_SIZE", "64"))
+        },
+        "post_process_batch": {
+            "workers": int(os.getenv("POST_PROCESS_BATCH_WORKERS", "2")),
+            "queue_size": int(os.getenv("POST_PROCESS_BATCH_QUEUE_SIZE", "64"))
+        },
+        "analyze": {
+            "workers": int(os.getenv("ANALYZE_WORKERS", "2")),
+            "queue_size": int(os.getenv("ANALYZE_QUEUE_SIZE", "16"))
+        },
+        "humanize_upload": {
+            "workers": int(os.getenv("HUMANIZE_UPLOAD_WORKERS", "2")),
+            "queue_size": int(os.getenv("HUMANIZE_UPLOAD_QUEUE_SIZE", "16"))
+        },
+        # Pieces of large documents processed with parallel=true, one worker per core
+        "parallel": {
+            "workers": int(os.getenv("PARALLEL_WORKERS", str(os.cpu_count() or 2))),
+            "queue_size": int(os.getenv("PARALLEL_QUEUE_SIZE", "64"))
+        }
+    }
+
+    # Documents are only split for parallel processing into pieces at least
+    # this many characters long, below that the split costs more than it saves
+    PARALLEL_MIN_CHUNK_CHARS = int(os.getenv("PARALLEL_MIN_CHUNK_CHARS", "20000"))
+
+    # Texts at least this many characters long are handed to worker processes
+    # through shared memory instead of being pickled
+    SHARED_MEMORY_THRESHOLD = int(os.getenv("SHARED_MEMORY_THRESHOLD", str(256 * 1024)))
+    # Output segments are preallocated at this multiple of the input size (plus 64 KiB)
+    SHARED_MEMORY_OUTPUT_FACTOR = float(os.getenv("SHARED_MEMORY_OUTPUT_FACTOR", "2.0"))
+
+    # Batch Configuration
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+    # Items of a single batch processed at the same time
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # Incremental Humanization Configuration
+    # Humanized paragraphs kept for reuse when edited documents are resubmitted
+    PARAGRAPH_CACHE_SIZE = int(os.getenv("PARAGRAPH_CACHE_SIZE", "5000"))
+
+    # File Upload Configuration
+    # Bytes read from an uploaded file at a time
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+    # Paragraphs are sent to the workers in groups of about this many characters
+    UPLOAD_GROUP_CHARS = int(os.getenv("UPLOAD_GROUP_CHARS", "32000"))
+    # Groups of one upload processed at the same time; output is streamed in order
+    UPLOAD_WINDOW = int(os.getenv("UPLOAD_WINDOW", "4"))
+    # Paragraphs longer than this are cut at a space so they never have to be held whole
+    UPLOAD_MAX_PARAGRAPH_CHARS = int(os.getenv("UPLOAD_MAX_PARAGRAPH_CHARS", "65536"))
+
+    # Profiling Configuration
+    # Requests run with ?profile=true must send this value in X-Admin-Token;
+    # profiling is disabled while it is unset
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    # Collapsed-stack profiles kept for download from /profiles/{id}
+    PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "50"))
+    PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "25"))
+
+    # UI Configuration
+    STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(os.path.dirname(__file__), "static"))
+    # Browsers reuse the built-in pages this long before revalidating with their ETag
+    UI_CACHE_MAX_AGE = int(os.getenv("UI_CACHE_MAX_AGE", "300"))
+
+    # Response Compression Configuration
+    # Responses smaller than this many bytes are not worth compressing
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    # Levels for on-the-fly compression: fast settings that still shrink JSON text well
+    COMPRESSION_LEVELS = {
+        "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        "br": int(os.getenv("COMPRESSION_BR_LEVEL", "5")),
+        "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+    }
+
+    # Job Queue Configuration
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), "jobs.db"))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+    JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "24"))
+    # Seconds a job may run before it is cancelled and marked failed
+    JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "600"))
+    # Seconds a running job's claim lasts without a heartbeat; another server
+    # process picks up jobs whose claim has lapsed
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+
+    # Request Deadline Configuration
+    # Longest a request may take, and the deadline of requests that do not send
+    # an X-Request-Timeout-Ms header
+    REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "300"))
+
     def validate_required_keys(self) -> None:
         """Validate that required configuration keys are set"""
         required_keys = ["GROQ_API_KEY"]
@@ -1,16 +1,36 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Callable
 import os
+import json
+import secrets
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 print("GROQ_API_KEY loaded:", os.getenv("GROQ_API_KEY"))
 from services.groq_service import groq_service
+from services.llm_gateway import LLMError, llm_gateway
 from services.balanced_processor import balanced_processor
 from services.humanizer_service import humanizer
+from services.executor_service import transform_executor, TransformQueueFull
+from services.batch_service import parse_batch_items, stream_batch
+from services.upload_service import MultipartFile, UploadError, UploadResponse, upload_media_type, read_pieces, stream_groups
+from services.job_queue import job_queue, JobQueueFull
+from services.static_assets import static_assets
+from services.compression import CompressionMiddleware
+from services.json_response import FastJSONResponse
+from services.change_log import VERBOSITY_LEVELS, merge_reports
+from services.profiler import Profile, profile_store
+from services.deadline import DeadlineExceeded, DeadlineMiddleware, deadline_metrics
+from services.pipeline import Plan, compile_pipeline, pipeline_name
+from services.prompt_index import prompt_index
+from services.paragraph_cache import paragraph_cache, split_paragraphs, group_paragraphs, paragraph_digest, paragraph_seed
 from config import config
+import asyncio
+import random
+import time
 
 # Validate required configuration
 try:
@@ -19,7 +39,7 @@ except ValueError as e:
     print(f"Configuration Error: {e}")
     print("Please set your GROQ_API_KEY environment variable")
 
-app = FastAPI(title="Blog Generator AI Agent", version="1.0.0")
+app = FastAPI(title="Blog Generator AI Agent", version="1.0.0", default_response_class=FastJSONResponse)
 
 # CORS middleware for frontend integration
 app.add_middleware(
@@ -30,6 +50,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses for clients that accept it
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=config.COMPRESSION_MIN_SIZE,
+    levels=config.COMPRESSION_LEVELS
+)
+
+# Outermost: give every request a deadline and cancel it when the client goes away
+app.add_middleware(DeadlineMiddleware, timeout_seconds=config.REQUEST_TIMEOUT_SECONDS)
+
+@app.on_event("startup")
+async def start_job_queue():
+    """Start the background job workers"""
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    """Stop the job workers, the transform worker pools and the LLM connections"""
+    await job_queue.stop()
+    transform_executor.shutdown()
+    llm_gateway.close()
+
 # Request models
 class BlogRequest(BaseModel):
     prompt: str
@@ -37,6 +79,9 @@ class BlogRequest(BaseModel):
     style: Optional[str] = "informative"
     post_process: Optional[bool] = True
     processing_intensity: Optional[str] = "heavy"
+    generation_mode: Optional[str] = None
+    similarity_threshold: Optional[float] = None
+    variants: Optional[int] = 1
 
 class BlogResponse(BaseModel):
     content: str
@@ -45,23 +90,70 @@ class BlogResponse(BaseModel):
     plagiarism_score: Optional[float] = None
     post_processing_applied: Optional[bool] = False
     processing_changes: Optional[int] = 0
+    generation_mode: Optional[str] = None
+    pipeline: Optional[dict] = None
+    similar_prompt: Optional[dict] = None
+    variants: Optional[list] = None
     success: bool
+    profile: Optional[dict] = None
     error: Optional[str] = None
 
 class HumanizeRequest(BaseModel):
     text: str
     intensity: Optional[str] = "heavy"
     use_groq: Optional[bool] = False
+    seed: Optional[int] = None
+    incremental: Optional[bool] = False
+    parallel: Optional[bool] = False
+    fields: Optional[str] = "full"
+    deadline_ms: Optional[int] = None
 
 class HumanizeResponse(BaseModel):
-    original: str
+    original: Optional[str] = None
     humanized: str
-    changes_made: list
+    changes_made: Optional[list] = None
     success: bool
-    word_count_original: int
-    word_count_humanized: int
+    word_count_original: Optional[int] = None
+    word_count_humanized: Optional[int] = None
+    seed: Optional[int] = None
+    paragraph_count: Optional[int] = None
+    reused_paragraphs: Optional[list] = None
+    pipeline: Optional[dict] = None
+    skipped_stages: Optional[list] = None
+    profile: Optional[dict] = None
     error: Optional[str] = None
 
+# Response fields returned for each "fields" option; "full" returns every field,
+# including the echoed input
+RESPONSE_FIELD_SETS = ["output", "stats", "full"]
+
+HUMANIZE_FIELDS = {
+    "output": ["success", "humanized"],
+    "stats": [
+        "success", "humanized", "changes_made", "word_count_original", "word_count_humanized",
+        "seed", "paragraph_count", "reused_paragraphs", "pipeline", "skipped_stages", "profile"
+    ]
+}
+
+POST_PROCESS_FIELDS = {
+    "output": ["success", "processed_content"],
+    "stats": [
+        "success", "processed_content", "changes_made", "change_spans", "change_counts",
+        "total_changes", "processing_intensity", "seed", "pipeline", "skipped_stages", "profile"
+    ]
+}
+
+def _project(values: dict, fields: str, field_sets: dict) -> dict:
+    """The response values a "fields" option asks for"""
+    if fields == "full":
+        return values
+    return {name: values[name] for name in field_sets[fields] if name in values}
+
+class AnalyzeRequest(BaseModel):
+    original: str
+    revised: str
+    include_spans: Optional[bool] = True
+
 @app.get("/")
 async def root():
     return {
@@ -76,9 +168,59 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "model": config.GROQ_MODEL}
 
-@app.post("/generate-blog", response_model=BlogResponse)
-async def generate_blog(request: BlogRequest):
-    """Generate a blog post based on the given prompt"""
+@app.get("/metrics")
+async def get_metrics():
+    """Queue depth and queue-wait metrics for the executor lanes and the job queue"""
+    return {
+        "transform_executor": transform_executor.get_metrics(),
+        "jobs": job_queue.get_metrics(),
+        "paragraph_cache": paragraph_cache.get_metrics(),
+        "llm_gateway": llm_gateway.get_metrics(),
+        "prompt_index": prompt_index.get_metrics(),
+        "requests": deadline_metrics.to_dict()
+    }
+
+def _deadline(deadline_ms) -> Optional[float]:
+    """The time.time() a request with a deadline_ms latency budget has to finish by"""
+    if deadline_ms is None:
+        return None
+    if not isinstance(deadline_ms, int) or isinstance(deadline_ms, bool) or deadline_ms <= 0:
+        raise HTTPException(status_code=400, detail="deadline_ms must be a positive integer")
+    return time.time() + deadline_ms / 1000
+
+def _skipped_stages(results: list) -> list:
+    """Stages skipped in any of the results, in pipeline order"""
+    skipped = []
+    for result in results:
+        for name in result.get("skipped_stages") or []:
+            if name not in skipped:
+                skipped.append(name)
+    return skipped
+
+def _require_admin(admin_token: Optional[str]):
+    """Reject the request unless it carries the configured admin token"""
+    if not (config.ADMIN_TOKEN and admin_token
+            and secrets.compare_digest(admin_token.encode(), config.ADMIN_TOKEN.encode())):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token header is required")
+
+def _start_profile(profile: bool, admin_token: Optional[str]) -> Optional[Profile]:
+    """A profile of the request's transform-lane work if one was asked for (admin only)"""
+    if not profile:
+        return None
+    _require_admin(admin_token)
+    return Profile()
+
+@app.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Download a request profile as collapsed stacks (flamegraph.pl / speedscope input)"""
+    _require_admin(x_admin_token)
+    collapsed = profile_store.get(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(collapsed)
+
+def _validate_blog_request(request: BlogRequest):
+    """Validate a blog request, raising a 400 error on bad input"""
     
     # Validate prompt
     if not request.prompt or len(request.prompt.strip()) < 5:
@@ -101,52 +243,236 @@ async def generate_blog(request: BlogRequest):
             detail="processing_intensity must be 'light', 'medium', 'heavy', 'balanced', 'plagiarism_focused', or 'ai_focused'"
         )
     
-    try:
-        print(f"🔍 Starting blog generation for prompt: {request.prompt[:50]}...")
-        # Generate blog content using Groq service
-        result = groq_service.generate_blog_content(
-            prompt=request.prompt,
-            max_length=request.max_length,
-            style=request.style
+    # Validate generation mode
+    if request.generation_mode and request.generation_mode not in config.GENERATION_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail="generation_mode must be 'two_pass' or 'single_call'"
         )
-        print(f"✅ Blog generation result: {result.get('success', False)}")
-        
-        if not result["success"]:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Blog generation failed: {result.get('error', 'Unknown error')}"
-            )
+    
+    # Validate similarity threshold
+    if request.similarity_threshold is not None and not 0 < request.similarity_threshold <= 1:
+        raise HTTPException(
+            status_code=400,
+            detail="similarity_threshold must be greater than 0 and at most 1"
+        )
+    
+    # Validate variants
+    if request.variants is not None and not 1 <= request.variants <= config.MAX_BLOG_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"variants must be between 1 and {config.MAX_BLOG_VARIANTS}"
+        )
+
+async def _generate_blog(
+    request: BlogRequest,
+    progress: Optional[Callable[[str, int], None]] = None,
+    profile: Optional[Profile] = None
+) -> BlogResponse:
+    """
+    Generate a blog post, or several alternatives processed in parallel,
+    and apply balanced processing if requested
+    
+    Args:
+        request: The validated blog request
+        progress: Optional callback(stage, percent) for reporting progress
+        profile: Optional profile the processing is sampled into
         
-        # Apply balanced processing if requested
-        processing_result = None
-        if request.post_process:
-            processing_result = balanced_processor.process_content(
-                result["content"], 
-                target_balance=request.processing_intensity or "balanced"
-            )
-            
-            if processing_result["success"]:
-                result["content"] = processing_result["processed_content"]
-                print(f"✅ Balanced processing applied: {processing_result['total_changes']} changes made")
-            else:
-                print(f"⚠️ Balanced processing failed: {processing_result.get('error', 'Unknown error')}")
+    Returns:
+        BlogResponse with the final content (of the first variant, with all
+        of them under "variants" when more than one was asked for)
+    """
+    print(f"🔍 Starting blog generation for prompt: {request.prompt[:50]}...")
+    if progress:
+        progress("generating", 10)
+    
+    generation_mode = request.generation_mode or config.DEFAULT_GENERATION_MODE
+    max_length = request.max_length or config.DEFAULT_MAX_LENGTH
+    settings = (request.style, max_length, generation_mode)
+    variants = request.variants or 1
+    
+    # Reuse the draft of a similar earlier prompt if the request accepts one
+    match = None
+    if request.similarity_threshold is not None and variants == 1:
+        match = prompt_index.find(request.prompt, settings, request.similarity_threshold)
+    
+    if match is not None:
+        drafts = [dict(match["draft"])]
+        print(f"♻️ Reusing the draft of a similar prompt ({match['similarity']}): {match['prompt'][:50]}")
+    else:
+        # Generate the drafts on the event loop, so a cancelled request aborts the upstream calls
+        try:
+            responses = await llm_gateway.chat_variants(variants, **groq_service.generation_request(
+                request.prompt, max_length, request.style, generation_mode
+            ))
+        except LLMError as e:
+            print("✅ Blog generation result: False")
+            raise HTTPException(status_code=500, detail=f"Blog generation failed: {e}")
+        drafts = [groq_service.draft_result(response, generation_mode) for response in responses]
+        print(f"✅ Blog generation result: {len(drafts)} draft(s)")
+        prompt_index.add(request.prompt, settings, dict(drafts[0]))
+    
+    # Humanize, trim and apply balanced processing if requested, as one compiled pipeline
+    plan = groq_service.blog_plan(
+        request.style,
+        generation_mode,
+        (request.processing_intensity or "balanced") if request.post_process else None
+    )
+    if progress:
+        progress("processing", 40)
+    processing_results = await asyncio.gather(*(
+        _run_blog_pipeline(plan, draft["content"], request.max_length, profile) for draft in drafts
+    ))
+    
+    for result, processing_result in zip(drafts, processing_results):
+        if processing_result["success"]:
+            result["content"] = processing_result["processed_content"]
+            if processing_result["word_count"] is not None:
+                result["word_count"] = processing_result["word_count"]
+            result["processing_changes"] = processing_result["total_changes"]
+            print(f"✅ Pipeline {plan.name} applied: {processing_result['total_changes']} balanced changes made")
+        else:
+            result["processing_changes"] = 0
+            print(f"⚠️ Pipeline {plan.name} failed: {processing_result.get('error', 'Unknown error')}")
+    
+    result = drafts[0]
+    return BlogResponse(
+        content=result["content"],
+        word_count=result["word_count"],
+        model_used=result["model_used"],
+        post_processing_applied=request.post_process,
+        processing_changes=result["processing_changes"],
+        generation_mode=result.get("generation_mode"),
+        pipeline=plan.to_dict(),
+        similar_prompt={"prompt": match["prompt"], "similarity": match["similarity"]} if match else None,
+        variants=[
+            {name: draft[name] for name in ["content", "word_count", "model_used", "processing_changes"]}
+            for draft in drafts
+        ] if variants > 1 else None,
+        success=True
+    )
+
+async def _run_blog_pipeline(plan: Plan, text: str, max_words: Optional[int],
+                             profile: Optional[Profile] = None) -> dict:
+    """
+    Run a blog plan: local stages on the generate_blog lane, the LLM rewrite on the event loop
+    
+    Returns:
+        The processed content with the word count after trimming and the total
+        balanced changes, or the failed part's result
+    """
+    seed = random.getrandbits(32)
+    result = {"success": True, "processed_content": text, "word_count": None, "total_changes": 0}
+    for part in plan.parts():
+        if part.stages[0].rewrites:
+            try:
+                response = await llm_gateway.chat(**humanizer.rewrite_request(result["processed_content"]))
+                result["processed_content"] = response["content"].strip()
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                print(f"⚠️ Groq enhancement failed: {e}")
+            continue
         
-        # Return successful response
-        return BlogResponse(
-            content=result["content"],
-            word_count=result["word_count"],
-            model_used=result["model_used"],
-            post_processing_applied=request.post_process,
-            processing_changes=processing_result["total_changes"] if processing_result and processing_result["success"] else 0,
-            success=True
+        part_result = await transform_executor.run(
+            "generate_blog",
+            "pipeline",
+            result["processed_content"],
+            part,
+            seed,
+            "counts",
+            max_words,
+            profile=profile,
+            echo=False
         )
+        if not part_result["success"]:
+            return part_result
+        result["processed_content"] = part_result["processed_content"]
+        result["total_changes"] += part_result["total_changes"]
+        if part_result["word_count"] is not None:
+            result["word_count"] = part_result["word_count"]
+    return result
+
+@app.post("/generate-blog", response_model=BlogResponse)
+async def generate_blog(request: BlogRequest, profile: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Generate a blog post based on the given prompt"""
+    _validate_blog_request(request)
+    profiler = _start_profile(profile, x_admin_token)
+    
+    try:
+        response = await _generate_blog(request, profile=profiler)
+        if profiler is not None:
+            response.profile = profiler.report(profile_store)
+        return FastJSONResponse(response)
         
+    except HTTPException:
+        raise
+    except TransformQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"❌ Error in blog generation: {str(e)}")
         import traceback
         print(f"❌ Full traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+async def _run_blog_job(payload: dict, progress: Callable[[str, int], None]) -> dict:
+    """Job queue handler for background blog generation"""
+    response = await _generate_blog(BlogRequest(**payload), progress)
+    return response.model_dump()
+
+job_queue.register("generate_blog", _run_blog_job)
+
+@app.post("/jobs/generate-blog", status_code=202)
+async def submit_blog_job(request: BlogRequest):
+    """
+    Queue a blog generation and return immediately
+    
+    Poll GET /jobs/{job_id} or subscribe to GET /jobs/{job_id}/events for
+    progress; the finished job's result is the usual /generate-blog response.
+    """
+    _validate_blog_request(request)
+    
+    try:
+        job = job_queue.submit("generate_blog", request.model_dump())
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['job_id']}",
+        "events_url": f"/jobs/{job['job_id']}/events"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get a job's status, progress and result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream a job's progress as server-sent events until it finishes"""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async for job in job_queue.events(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/styles")
 async def get_available_styles():
     """Get available writing styles"""
@@ -161,11 +487,17 @@ async def get_available_styles():
     }
 
 @app.post("/post-process")
-async def post_process_content(request: dict):
+async def post_process_content(request: dict, profile: bool = False, x_admin_token: Optional[str] = Header(None)):
     """Post-process existing content to reduce plagiarism and AI detection"""
+    profiler = _start_profile(profile, x_admin_token)
+    
     try:
+        deadline = _deadline(request.get("deadline_ms"))
         content = request.get("content", "")
         intensity = request.get("intensity", "heavy")
+        verbosity = request.get("verbosity", "text")
+        seed = request.get("seed")
+        fields = request.get("fields", "full")
         
         if not content:
             raise HTTPException(status_code=400, detail="Content is required")
@@ -173,7 +505,22 @@ async def post_process_content(request: dict):
         if intensity not in ["light", "medium", "heavy", "balanced", "plagiarism_focused", "ai_focused"]:
             raise HTTPException(status_code=400, detail="Intensity must be 'light', 'medium', 'heavy', 'balanced', 'plagiarism_focused', or 'ai_focused'")
         
-        result = balanced_processor.process_content(content, target_balance=intensity)
+        if verbosity not in VERBOSITY_LEVELS:
+            raise HTTPException(status_code=400, detail="Verbosity must be 'counts', 'spans', or 'text'")
+        
+        if seed is not None and not isinstance(seed, int):
+            raise HTTPException(status_code=400, detail="Seed must be an integer")
+        
+        if fields not in RESPONSE_FIELD_SETS:
+            raise HTTPException(status_code=400, detail="Fields must be 'output', 'stats', or 'full'")
+        
+        if request.get("parallel"):
+            result = await _post_process_parallel(content, intensity, verbosity, seed, profiler, deadline)
+        else:
+            result = await transform_executor.run(
+                "post_process", "post_process", content, intensity, verbosity, seed, deadline,
+                profile=profiler, echo=False
+            )
         
         if not result["success"]:
             raise HTTPException(
@@ -181,446 +528,144 @@ async def post_process_content(request: dict):
                 detail=f"Post-processing failed: {result.get('error', 'Unknown error')}"
             )
         
-        return {
+        response = {
             "success": True,
-            "original_content": result["original_content"],
+            "original_content": content,
             "processed_content": result["processed_content"],
-            "changes_made": result["changes_made"],
-            "total_changes": result["total_changes"],
-            "processing_intensity": result["processing_intensity"]
+            **_change_report(result),
+            "processing_intensity": result.get("target_balance", intensity),
+            "seed": result.get("seed"),
+            "pipeline": result.get("pipeline"),
+            "skipped_stages": result.get("skipped_stages", [])
         }
+        if profiler is not None:
+            response["profile"] = profiler.report(profile_store)
+        return FastJSONResponse(_project(response, fields, POST_PROCESS_FIELDS))
         
+    except HTTPException:
+        raise
+    except TransformQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+async def _post_process_parallel(content: str, intensity: str, verbosity: str, seed: Optional[int],
+                                 profile: Optional[Profile] = None, deadline: Optional[float] = None) -> dict:
+    """
+    Post-process a large document in paragraph groups on the parallel lane
+
+    Every group gets a seed derived from the request seed and its content. The
+    balanced processor collapses all whitespace, so the processed groups are
+    joined with single spaces, as the whole document would have been, and
+    their change reports are merged with spans shifted into the joined text.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    groups = [
+        "\n\n".join(group) for group in group_paragraphs(
+            split_paragraphs(content),
+            transform_executor.lanes["parallel"].workers,
+            config.PARALLEL_MIN_CHUNK_CHARS
+        )
+    ]
+    results = await transform_executor.map("parallel", "post_process", [
+        (group, intensity, verbosity, paragraph_seed(paragraph_digest(group, seed, (intensity,))), deadline)
+        for group in groups
+    ], profile=profile, echo=False)
+
+    for result in results:
+        if not result["success"]:
+            return {**result, "original_content": content, "processed_content": content}
+
+    pieces = []
+    offsets = []
+    position = 0
+    for result in results:
+        processed = result["processed_content"]
+        piece = processed.strip()
+        # Spans point into the unstripped output
+        offsets.append(position - (len(processed) - len(processed.lstrip())))
+        pieces.append(piece)
+        position += len(piece) + 1
+
+    return {
+        "success": True,
+        "original_content": content,
+        "processed_content": " ".join(pieces),
+        **merge_reports(results, offsets),
+        "target_balance": results[0]["target_balance"],
+        "seed": seed,
+        "pipeline": results[0]["pipeline"],
+        "skipped_stages": _skipped_stages(results)
+    }
+
+def _change_report(result: dict) -> dict:
+    """The change report fields of a post-processing result, as requested by its verbosity"""
+    return {
+        field: result[field]
+        for field in ["changes_made", "change_spans", "change_counts", "total_changes"]
+        if field in result
+    }
+
+@app.post("/post-process/batch")
+async def post_process_batch(request: Request, intensity: str = "heavy", verbosity: str = "text"):
+    """
+    Post-process many texts in one request
+
+    Accepts a JSON array, an object with an "items" array, or an NDJSON body.
+    Items are strings or objects with "content" and optional "intensity"/"verbosity".
+    Results are streamed back as NDJSON in completion order, each with its index.
+    """
+    items = parse_batch_items(
+        await request.body(),
+        request.headers.get("content-type", ""),
+        {"intensity": intensity, "verbosity": verbosity}
+    )
+    return StreamingResponse(
+        stream_batch(items, _post_process_batch_item, config.BATCH_CONCURRENCY),
+        media_type="application/x-ndjson"
+    )
+
+async def _post_process_batch_item(item: dict) -> dict:
+    """Post-process a single batch item"""
+    content = item.get("content", item.get("text", ""))
+    intensity = item.get("intensity") or "heavy"
+    verbosity = item.get("verbosity") or "text"
+    
+    if not content:
+        return {"success": False, "error": "Content is required"}
+    
+    if intensity not in config.AVAILABLE_INTENSITIES:
+        return {"success": False, "error": "Intensity must be 'light', 'medium', 'heavy', 'balanced', 'plagiarism_focused', or 'ai_focused'"}
+    
+    if verbosity not in VERBOSITY_LEVELS:
+        return {"success": False, "error": "Verbosity must be 'counts', 'spans', or 'text'"}
+    
+    result = await transform_executor.run(
+        "post_process_batch", "post_process", content, intensity, verbosity, echo=False
+    )
+    
+    if not result["success"]:
+        return {"success": False, "error": f"Post-processing failed: {result.get('error', 'Unknown error')}"}
+    
+    return {
+        "success": True,
+        "processed_content": result["processed_content"],
+        **_change_report(result),
+        "processing_intensity": intensity
+    }
+
 @app.get("/humanizer", response_class=HTMLResponse)
-async def humanizer_ui():
+async def humanizer_ui(request: Request):
     """Serve the humanizer UI"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>AI Text Humanizer</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                padding: 20px;
-            }
-            
-            .container {
-                max-width: 1200px;
-                margin: 0 auto;
-                background: white;
-                border-radius: 15px;
-                box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                overflow: hidden;
-            }
-            
-            .header {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                text-align: center;
-            }
-            
-            .header h1 {
-                font-size: 2.5em;
-                margin-bottom: 10px;
-            }
-            
-            .header p {
-                font-size: 1.1em;
-                opacity: 0.9;
-            }
-            
-            .content {
-                padding: 40px;
-            }
-            
-            .input-section, .output-section {
-                margin-bottom: 30px;
-            }
-            
-            .section-title {
-                font-size: 1.5em;
-                color: #333;
-                margin-bottom: 15px;
-                border-bottom: 2px solid #667eea;
-                padding-bottom: 10px;
-            }
-            
-            .form-group {
-                margin-bottom: 20px;
-            }
-            
-            label {
-                display: block;
-                margin-bottom: 8px;
-                font-weight: 600;
-                color: #555;
-            }
-            
-            textarea {
-                width: 100%;
-                min-height: 200px;
-                padding: 15px;
-                border: 2px solid #e1e5e9;
-                border-radius: 10px;
-                font-size: 16px;
-                font-family: inherit;
-                resize: vertical;
-                transition: border-color 0.3s ease;
-            }
-            
-            textarea:focus {
-                outline: none;
-                border-color: #667eea;
-            }
-            
-            .controls {
-                display: flex;
-                gap: 15px;
-                align-items: center;
-                flex-wrap: wrap;
-            }
-            
-            select, input[type="checkbox"] {
-                padding: 10px 15px;
-                border: 2px solid #e1e5e9;
-                border-radius: 8px;
-                font-size: 14px;
-                background: white;
-            }
-            
-            select:focus {
-                outline: none;
-                border-color: #667eea;
-            }
-            
-            .checkbox-group {
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }
-            
-            .checkbox-group input[type="checkbox"] {
-                width: 18px;
-                height: 18px;
-            }
-            
-            button {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                padding: 12px 30px;
-                border-radius: 8px;
-                font-size: 16px;
-                font-weight: 600;
-                cursor: pointer;
-                transition: transform 0.2s ease, box-shadow 0.2s ease;
-            }
-            
-            button:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 10px 20px rgba(102, 126, 234, 0.3);
-            }
-            
-            button:disabled {
-                opacity: 0.6;
-                cursor: not-allowed;
-                transform: none;
-            }
-            
-            .loading {
-                display: none;
-                text-align: center;
-                padding: 20px;
-                color: #667eea;
-            }
-            
-            .loading.show {
-                display: block;
-            }
-            
-            .spinner {
-                border: 3px solid #f3f3f3;
-                border-top: 3px solid #667eea;
-                border-radius: 50%;
-                width: 30px;
-                height: 30px;
-                animation: spin 1s linear infinite;
-                margin: 0 auto 10px;
-            }
-            
-            @keyframes spin {
-                0% { transform: rotate(0deg); }
-                100% { transform: rotate(360deg); }
-            }
-            
-            .output-box {
-                background: #f8f9fa;
-                border: 2px solid #e1e5e9;
-                border-radius: 10px;
-                padding: 20px;
-                min-height: 200px;
-                white-space: pre-wrap;
-                font-family: inherit;
-                line-height: 1.6;
-            }
-            
-            .stats {
-                display: flex;
-                gap: 20px;
-                margin-top: 15px;
-                flex-wrap: wrap;
-            }
-            
-            .stat-item {
-                background: white;
-                padding: 10px 15px;
-                border-radius: 8px;
-                border: 1px solid #e1e5e9;
-                text-align: center;
-            }
-            
-            .stat-value {
-                font-size: 1.2em;
-                font-weight: 600;
-                color: #667eea;
-            }
-            
-            .stat-label {
-                font-size: 0.9em;
-                color: #666;
-                margin-top: 5px;
-            }
-            
-            .changes-list {
-                margin-top: 15px;
-                padding: 15px;
-                background: #e8f4fd;
-                border-radius: 8px;
-                border-left: 4px solid #667eea;
-            }
-            
-            .changes-list h4 {
-                margin-bottom: 10px;
-                color: #333;
-            }
-            
-            .changes-list ul {
-                list-style: none;
-                padding: 0;
-            }
-            
-            .changes-list li {
-                padding: 5px 0;
-                color: #555;
-            }
-            
-            .changes-list li:before {
-                content: "✓ ";
-                color: #667eea;
-                font-weight: bold;
-            }
-            
-            .error {
-                background: #ffe6e6;
-                border: 1px solid #ff9999;
-                color: #cc0000;
-                padding: 15px;
-                border-radius: 8px;
-                margin-top: 15px;
-            }
-            
-            @media (max-width: 768px) {
-                .content {
-                    padding: 20px;
-                }
-                
-                .controls {
-                    flex-direction: column;
-                    align-items: stretch;
-                }
-                
-                .stats {
-                    flex-direction: column;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🤖 AI Text Humanizer</h1>
-                <p>Transform AI-generated content into natural, human-like text</p>
-            </div>
-            
-            <div class="content">
-                <div class="input-section">
-                    <h2 class="section-title">Input Text</h2>
-                    <div class="form-group">
-                        <label for="inputText">Enter AI-generated text to humanize:</label>
-                        <textarea id="inputText" placeholder="Paste your AI-generated text here..."></textarea>
-                    </div>
-                    
-                    <div class="controls">
-                        <div class="form-group">
-                            <label for="intensity">Humanization Intensity:</label>
-                            <select id="intensity">
-                                <option value="light">Light</option>
-                                <option value="medium">Medium</option>
-                                <option value="heavy" selected>Heavy</option>
-                            </select>
-                        </div>
-                        
-                        <div class="form-group">
-                            <div class="checkbox-group">
-                                <input type="checkbox" id="useGroq">
-                                <label for="useGroq">Use Groq AI Enhancement</label>
-                            </div>
-                        </div>
-                        
-                        <button onclick="humanizeText()" id="humanizeBtn">🚀 Humanize Text</button>
-                    </div>
-                </div>
-                
-                <div class="loading" id="loading">
-                    <div class="spinner"></div>
-                    <p>Processing your text...</p>
-                </div>
-                
-                <div class="output-section">
-                    <h2 class="section-title">Humanized Output</h2>
-                    <div class="output-box" id="outputText">Your humanized text will appear here...</div>
-                    
-                    <div class="stats" id="stats" style="display: none;">
-                        <div class="stat-item">
-                            <div class="stat-value" id="originalWords">0</div>
-                            <div class="stat-label">Original Words</div>
-                        </div>
-                        <div class="stat-item">
-                            <div class="stat-value" id="humanizedWords">0</div>
-                            <div class="stat-label">Humanized Words</div>
-                        </div>
-                        <div class="stat-item">
-                            <div class="stat-value" id="wordChange">0</div>
-                            <div class="stat-label">Word Change</div>
-                        </div>
-                    </div>
-                    
-                    <div class="changes-list" id="changesList" style="display: none;">
-                        <h4>Changes Made:</h4>
-                        <ul id="changesItems"></ul>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <script>
-            async function humanizeText() {
-                const inputText = document.getElementById('inputText').value.trim();
-                const intensity = document.getElementById('intensity').value;
-                const useGroq = document.getElementById('useGroq').checked;
-                
-                if (!inputText) {
-                    alert('Please enter some text to humanize.');
-                    return;
-                }
-                
-                // Show loading
-                document.getElementById('loading').classList.add('show');
-                document.getElementById('humanizeBtn').disabled = true;
-                
-                try {
-                    const response = await fetch('/humanize', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({
-                            text: inputText,
-                            intensity: intensity,
-                            use_groq: useGroq
-                        })
-                    });
-                    
-                    const result = await response.json();
-                    
-                    if (result.success) {
-                        // Display humanized text
-                        document.getElementById('outputText').textContent = result.humanized;
-                        
-                        // Show stats
-                        document.getElementById('stats').style.display = 'flex';
-                        document.getElementById('originalWords').textContent = result.word_count_original;
-                        document.getElementById('humanizedWords').textContent = result.word_count_humanized;
-                        document.getElementById('wordChange').textContent = result.word_count_humanized - result.word_count_original;
-                        
-                        // Show changes
-                        if (result.changes_made && result.changes_made.length > 0) {
-                            document.getElementById('changesList').style.display = 'block';
-                            const changesList = document.getElementById('changesItems');
-                            changesList.innerHTML = '';
-                            result.changes_made.forEach(change => {
-                                const li = document.createElement('li');
-                                li.textContent = change;
-                                changesList.appendChild(li);
-                            });
-                        } else {
-                            document.getElementById('changesList').style.display = 'none';
-                        }
-                        
-                        // Clear any previous errors
-                        const errorDiv = document.querySelector('.error');
-                        if (errorDiv) errorDiv.remove();
-                        
-                    } else {
-                        throw new Error(result.error || 'Humanization failed');
-                    }
-                    
-                } catch (error) {
-                    console.error('Error:', error);
-                    
-                    // Show error
-                    const errorDiv = document.createElement('div');
-                    errorDiv.className = 'error';
-                    errorDiv.textContent = `Error: ${error.message}`;
-                    document.getElementById('outputText').parentNode.insertBefore(errorDiv, document.getElementById('outputText'));
-                    
-                    document.getElementById('outputText').textContent = 'An error occurred while processing your text.';
-                } finally {
-                    // Hide loading
-                    document.getElementById('loading').classList.remove('show');
-                    document.getElementById('humanizeBtn').disabled = false;
-                }
-            }
-            
-            // Allow Enter key to submit
-            document.getElementById('inputText').addEventListener('keydown', function(e) {
-                if (e.ctrlKey && e.key === 'Enter') {
-                    humanizeText();
-                }
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content)
+    return static_assets.response("humanizer.html", request)
 
 @app.post("/humanize", response_model=HumanizeResponse)
-async def humanize_text(request: HumanizeRequest):
+async def humanize_text(request: HumanizeRequest, profile: bool = False, x_admin_token: Optional[str] = Header(None)):
     """Humanize AI-generated text"""
+    profiler = _start_profile(profile, x_admin_token)
     
     # Validate text
     if not request.text or len(request.text.strip()) < 5:
@@ -636,411 +681,322 @@ async def humanize_text(request: HumanizeRequest):
             detail="Intensity must be 'light', 'medium', or 'heavy'"
         )
     
+    if request.fields not in RESPONSE_FIELD_SETS:
+        raise HTTPException(status_code=400, detail="Fields must be 'output', 'stats', or 'full'")
+    
+    deadline = _deadline(request.deadline_ms)
+    
     try:
-        # Use the humanizer service
-        result = humanizer.humanize_text(
-            text=request.text,
-            intensity=request.intensity,
-            use_groq=request.use_groq or False
+        if request.incremental or request.parallel:
+            values = await _humanize_by_paragraph(request, profiler, deadline)
+        else:
+            # Use the humanizer service; the input is not sent back from the worker
+            result = await transform_executor.run(
+                "humanize",
+                "humanize",
+                request.text,
+                request.intensity,
+                request.use_groq or False,
+                request.seed,
+                deadline,
+                profile=profiler,
+                echo=False
+            )
+            
+            if not result["success"]:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Humanization failed: {result.get('error', 'Unknown error')}"
+                )
+            
+            values = {
+                "original": request.text,
+                "humanized": result["humanized"],
+                "changes_made": result["changes_made"],
+                "success": True,
+                "word_count_original": result["word_count_original"],
+                "word_count_humanized": result["word_count_humanized"],
+                "seed": result["seed"],
+                "pipeline": result["pipeline"],
+                "skipped_stages": result["skipped_stages"]
+            }
+        
+        if profiler is not None:
+            values["profile"] = profiler.report(profile_store)
+        
+        return FastJSONResponse(
+            HumanizeResponse(**_project(values, request.fields, HUMANIZE_FIELDS)),
+            exclude_unset=request.fields != "full"
         )
         
-        if not result["success"]:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Humanization failed: {result.get('error', 'Unknown error')}"
+    except HTTPException:
+        raise
+    except TransformQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+async def _humanize_by_paragraph(request: HumanizeRequest, profile: Optional[Profile] = None,
+                                 deadline: Optional[float] = None) -> dict:
+    """
+    Humanize a document paragraph by paragraph
+
+    Each paragraph's seed is derived from the request seed and its content, so
+    a paragraph gets the same output wherever it appears. With incremental,
+    processed paragraphs are cached and resubmitting an edited document with
+    the same seed only processes the paragraphs that changed; with parallel,
+    the paragraphs are spread over the parallel lane's workers. Paragraphs are
+    joined with blank lines. Paragraphs that had passes skipped to meet the
+    deadline are not cached.
+    
+    Returns:
+        The HumanizeResponse values
+    """
+    seed = request.seed if request.seed is not None else random.getrandbits(32)
+    use_groq = request.use_groq or False
+    settings = (request.intensity, use_groq)
+
+    paragraphs = split_paragraphs(request.text)
+    digests = [paragraph_digest(paragraph, seed, settings) for paragraph in paragraphs]
+    if request.incremental:
+        entries = [paragraph_cache.get(digest) for digest in digests]
+    else:
+        entries = [None] * len(paragraphs)
+    reused = [index for index, entry in enumerate(entries) if entry is not None]
+
+    # Paragraphs repeated within the document are only processed once
+    pending = {}
+    for index, entry in enumerate(entries):
+        if entry is None:
+            pending.setdefault(digests[index], paragraphs[index])
+
+    if pending:
+        texts = list(pending.values())
+        seeds = [paragraph_seed(digest) for digest in pending]
+        if request.parallel:
+            groups = group_paragraphs(
+                texts,
+                transform_executor.lanes["parallel"].workers,
+                config.PARALLEL_MIN_CHUNK_CHARS
             )
-        
-        return HumanizeResponse(
-            original=result["original"],
-            humanized=result["humanized"],
-            changes_made=result["changes_made"],
-            success=True,
-            word_count_original=result["word_count_original"],
-            word_count_humanized=result["word_count_humanized"]
+            arg_lists = []
+            position = 0
+            for group in groups:
+                arg_lists.append((group, request.intensity, use_groq, seeds[position:position + len(group)], deadline))
+                position += len(group)
+            chunks = await transform_executor.map("parallel", "humanize_paragraphs", arg_lists, profile=profile)
+            results = [result for chunk in chunks for result in chunk]
+        else:
+            results = await transform_executor.run(
+                "humanize", "humanize_paragraphs", texts, request.intensity, use_groq, seeds, deadline,
+                profile=profile
+            )
+
+        for digest, result in zip(pending, results):
+            if not result["success"]:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Humanization failed: {result.get('error', 'Unknown error')}"
+                )
+            if request.incremental and not result["skipped_stages"]:
+                paragraph_cache.put(digest, result)
+            pending[digest] = result
+        entries = [entry if entry is not None else pending[digest] for entry, digest in zip(entries, digests)]
+
+    humanized = "\n\n".join(entry["humanized"] for entry in entries)
+    # Every paragraph goes through the same passes, so any one reports them
+    changes_made = entries[0]["changes_made"] if entries else []
+
+    return {
+        "original": request.text,
+        "humanized": humanized,
+        "changes_made": changes_made,
+        "success": True,
+        "word_count_original": len(request.text.split()),
+        "word_count_humanized": len(humanized.split()),
+        "seed": seed,
+        "paragraph_count": len(paragraphs),
+        "reused_paragraphs": reused if request.incremental else None,
+        "pipeline": compile_pipeline(
+            pipeline_name("humanize", request.intensity),
+            llm_rewrite=bool(request.use_groq) and llm_gateway.available
+        ).to_dict(),
+        "skipped_stages": _skipped_stages(entries)
+    }
+
+@app.post("/humanize/upload", openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"]
+        }}}
+    }
+})
+async def humanize_upload(
+    request: Request,
+    intensity: str = "heavy",
+    use_groq: bool = False,
+    seed: Optional[int] = None
+):
+    """
+    Humanize an uploaded .txt or .md file
+
+    The multipart body is parsed as it arrives instead of being spooled to a
+    temporary file first, so paragraphs are humanized while the rest of the
+    file is still uploading, and the output is streamed back in document
+    order. Settings are query parameters because form fields after the file
+    would only be seen once it had been read. Paragraph seeds are derived the
+    same way as for /humanize with incremental or parallel, so the same seed
+    gives the same text.
+    """
+    if intensity not in ["light", "medium", "heavy"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Intensity must be 'light', 'medium', or 'heavy'"
+        )
+    
+    try:
+        upload = MultipartFile(request.headers.get("content-type"), request.stream())
+        filename = await upload.open()
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type = upload_media_type(filename)
+    if media_type is None:
+        raise HTTPException(status_code=400, detail="Only .txt and .md files are supported")
+    
+    if seed is None:
+        seed = random.getrandbits(32)
+    settings = (intensity, use_groq)
+    
+    async def process(paragraphs: list) -> list:
+        seeds = [paragraph_seed(paragraph_digest(paragraph, seed, settings)) for paragraph in paragraphs]
+        results = await transform_executor.run(
+            "humanize_upload", "humanize_paragraphs", paragraphs, intensity, use_groq, seeds
         )
+        for result in results:
+            if not result["success"]:
+                raise UploadError(f"Humanization failed: {result.get('error', 'Unknown error')}")
+        return [result["humanized"] for result in results]
+    
+    output = stream_groups(read_pieces(upload.read), process)
+    
+    # Wait for the first block so unreadable files and a full queue still get a proper status
+    try:
+        first = await output.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="File contains no text")
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TransformQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    
+    async def body():
+        try:
+            yield first
+            async for block in output:
+                yield block
+        except ClientDisconnect:
+            # The client went away mid-upload; the groups in flight are cancelled
+            pass
+        finally:
+            await output.aclose()
+    
+    extension = os.path.splitext(filename)[1].lower()
+    return UploadResponse(
+        body(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="humanized{extension}"',
+            "X-Humanize-Seed": str(seed)
+        }
+    )
+
+@app.post("/humanize/batch")
+async def humanize_batch(request: Request, intensity: str = "heavy", use_groq: bool = False):
+    """
+    Humanize many texts in one request
+
+    Accepts a JSON array, an object with an "items" array, or an NDJSON body.
+    Items are strings or objects with "text" and optional "intensity"/"use_groq".
+    Results are streamed back as NDJSON in completion order, each with its index.
+    """
+    items = parse_batch_items(
+        await request.body(),
+        request.headers.get("content-type", ""),
+        {"intensity": intensity, "use_groq": use_groq}
+    )
+    return StreamingResponse(
+        stream_batch(items, _humanize_batch_item, config.BATCH_CONCURRENCY),
+        media_type="application/x-ndjson"
+    )
+
+async def _humanize_batch_item(item: dict) -> dict:
+    """Humanize a single batch item"""
+    text = item.get("text") or ""
+    intensity = item.get("intensity") or "heavy"
+    
+    if len(text.strip()) < 5:
+        return {"success": False, "error": "Text must be at least 5 characters long"}
+    
+    if intensity not in ["light", "medium", "heavy"]:
+        return {"success": False, "error": "Intensity must be 'light', 'medium', or 'heavy'"}
+    
+    result = await transform_executor.run(
+        "humanize_batch",
+        "humanize",
+        text,
+        intensity,
+        bool(item.get("use_groq")),
+        echo=False
+    )
+    
+    if not result["success"]:
+        return {"success": False, "error": f"Humanization failed: {result.get('error', 'Unknown error')}"}
+    
+    return {
+        "success": True,
+        "humanized": result["humanized"],
+        "changes_made": result["changes_made"],
+        "word_count_original": result["word_count_original"],
+        "word_count_humanized": result["word_count_humanized"]
+    }
+
+@app.post("/analyze")
+async def analyze_text(request: AnalyzeRequest):
+    """Word-level diff of an original text and its humanized or post-processed version"""
+    
+    if not request.original.strip() or not request.revised.strip():
+        raise HTTPException(status_code=400, detail="Both original and revised text are required")
+    
+    try:
+        analysis = await transform_executor.run(
+            "analyze",
+            "analyze",
+            request.original,
+            request.revised,
+            request.include_spans
+        )
+        return FastJSONResponse({"success": True, **analysis})
         
+    except TransformQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 @app.get("/blog-generator", response_class=HTMLResponse)
-async def blog_generator_ui():
+async def blog_generator_ui(request: Request):
     """Serve the blog generator UI"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Blog Generator</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                padding: 20px;
-            }
-            
-            .container {
-                max-width: 1000px;
-                margin: 0 auto;
-                background: white;
-                border-radius: 15px;
-                box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                overflow: hidden;
-            }
-            
-            .header {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                text-align: center;
-            }
-            
-            .header h1 {
-                font-size: 2.5em;
-                margin-bottom: 10px;
-            }
-            
-            .header p {
-                font-size: 1.1em;
-                opacity: 0.9;
-            }
-            
-            .content {
-                padding: 40px;
-            }
-            
-            .input-section, .output-section {
-                margin-bottom: 30px;
-            }
-            
-            .section-title {
-                font-size: 1.5em;
-                color: #333;
-                margin-bottom: 15px;
-                border-bottom: 2px solid #667eea;
-                padding-bottom: 10px;
-            }
-            
-            .form-group {
-                margin-bottom: 20px;
-            }
-            
-            label {
-                display: block;
-                margin-bottom: 8px;
-                font-weight: 600;
-                color: #555;
-            }
-            
-            input[type="text"], select {
-                width: 100%;
-                padding: 15px;
-                border: 2px solid #e1e5e9;
-                border-radius: 10px;
-                font-size: 16px;
-                font-family: inherit;
-                transition: border-color 0.3s ease;
-            }
-            
-            input[type="text"]:focus, select:focus {
-                outline: none;
-                border-color: #667eea;
-            }
-            
-            .controls {
-                display: flex;
-                gap: 15px;
-                align-items: center;
-                flex-wrap: wrap;
-            }
-            
-            .checkbox-group {
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }
-            
-            .checkbox-group input[type="checkbox"] {
-                width: 18px;
-                height: 18px;
-            }
-            
-            button {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                padding: 12px 30px;
-                border-radius: 8px;
-                font-size: 16px;
-                font-weight: 600;
-                cursor: pointer;
-                transition: transform 0.2s ease, box-shadow 0.2s ease;
-            }
-            
-            button:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 10px 20px rgba(102, 126, 234, 0.3);
-            }
-            
-            button:disabled {
-                opacity: 0.6;
-                cursor: not-allowed;
-                transform: none;
-            }
-            
-            .loading {
-                display: none;
-                text-align: center;
-                padding: 20px;
-                color: #667eea;
-            }
-            
-            .loading.show {
-                display: block;
-            }
-            
-            .spinner {
-                border: 3px solid #f3f3f3;
-                border-top: 3px solid #667eea;
-                border-radius: 50%;
-                width: 30px;
-                height: 30px;
-                animation: spin 1s linear infinite;
-                margin: 0 auto 10px;
-            }
-            
-            @keyframes spin {
-                0% { transform: rotate(0deg); }
-                100% { transform: rotate(360deg); }
-            }
-            
-            .output-box {
-                background: #f8f9fa;
-                border: 2px solid #e1e5e9;
-                border-radius: 10px;
-                padding: 20px;
-                min-height: 300px;
-                white-space: pre-wrap;
-                font-family: inherit;
-                line-height: 1.6;
-                max-height: 600px;
-                overflow-y: auto;
-            }
-            
-            .stats {
-                display: flex;
-                gap: 20px;
-                margin-top: 15px;
-                flex-wrap: wrap;
-            }
-            
-            .stat-item {
-                background: white;
-                padding: 10px 15px;
-                border-radius: 8px;
-                border: 1px solid #e1e5e9;
-                text-align: center;
-            }
-            
-            .stat-value {
-                font-size: 1.2em;
-                font-weight: 600;
-                color: #667eea;
-            }
-            
-            .stat-label {
-                font-size: 0.9em;
-                color: #666;
-                margin-top: 5px;
-            }
-            
-            .error {
-                background: #ffe6e6;
-                border: 1px solid #ff9999;
-                color: #cc0000;
-                padding: 15px;
-                border-radius: 8px;
-                margin-top: 15px;
-            }
-            
-            @media (max-width: 768px) {
-                .content {
-                    padding: 20px;
-                }
-                
-                .controls {
-                    flex-direction: column;
-                    align-items: stretch;
-                }
-                
-                .stats {
-                    flex-direction: column;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>📝 Blog Generator</h1>
-                <p>Generate high-quality blog posts on any topic</p>
-            </div>
-            
-            <div class="content">
-                <div class="input-section">
-                    <h2 class="section-title">Blog Topic</h2>
-                    <div class="form-group">
-                        <label for="topic">Enter your blog topic:</label>
-                        <input type="text" id="topic" placeholder="e.g., The benefits of meditation, How to cook pasta, etc.">
-                    </div>
-                    
-                    <div class="controls">
-                        <div class="form-group">
-                            <label for="style">Writing Style:</label>
-                            <select id="style">
-                                <option value="informative">Informative</option>
-                                <option value="casual">Casual</option>
-                                <option value="professional">Professional</option>
-                                <option value="engaging">Engaging</option>
-                                <option value="factual">Factual</option>
-                            </select>
-                        </div>
-                        <div class="form-group">
-                            <label for="maxLength">Word Count:</label>
-                            <select id="maxLength">
-                                <option value="300">300 words</option>
-                                <option value="500">500 words</option>
-                                <option value="800" selected>800 words</option>
-                                <option value="1000">1000 words</option>
-                                <option value="1200">1200 words</option>
-                                <option value="1500">1500 words</option>
-                            </select>
-                        </div>
-                        <div class="form-group">
-                            <div class="checkbox-group">
-                                <input type="checkbox" id="postProcess">
-                                <label for="postProcess">Apply humanization</label>
-                            </div>
-                        </div>
-                        
-                        <button onclick="generateBlog()" id="generateBtn">🚀 Generate Blog</button>
-                    </div>
-                </div>
-                
-                <div class="loading" id="loading">
-                    <div class="spinner"></div>
-                    <p>Generating your blog post...</p>
-                </div>
-                
-                <div class="output-section">
-                    <h2 class="section-title">Generated Blog</h2>
-                    <div class="output-box" id="outputText">Your generated blog will appear here...</div>
-                    
-                    <div class="stats" id="stats" style="display: none;">
-                        <div class="stat-item">
-                            <div class="stat-value" id="wordCount">0</div>
-                            <div class="stat-label">Words</div>
-                        </div>
-                        <div class="stat-item">
-                            <div class="stat-value" id="modelUsed">-</div>
-                            <div class="stat-label">Model Used</div>
-                        </div>
-                        <div class="stat-item">
-                            <div class="stat-value" id="processingChanges">0</div>
-                            <div class="stat-label">Processing Changes</div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <script>
-            async function generateBlog() {
-                const topic = document.getElementById('topic').value.trim();
-                const style = document.getElementById('style').value;
-                const maxLength = parseInt(document.getElementById('maxLength').value);
-                const postProcess = document.getElementById('postProcess').checked;
-                
-                if (!topic) {
-                    alert('Please enter a blog topic.');
-                    return;
-                }
-                
-                // Show loading
-                document.getElementById('loading').classList.add('show');
-                document.getElementById('generateBtn').disabled = true;
-                
-                try {
-                    const response = await fetch('/generate-blog', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({
-                            prompt: topic,
-                            style: style,
-                            max_length: maxLength,
-                            post_process: postProcess,
-                            processing_intensity: "heavy"
-                        })
-                    });
-                    
-                    const result = await response.json();
-                    
-                    if (result.success) {
-                        // Display generated blog
-                        document.getElementById('outputText').textContent = result.content;
-                        
-                        // Show stats
-                        document.getElementById('stats').style.display = 'flex';
-                        document.getElementById('wordCount').textContent = result.word_count;
-                        document.getElementById('modelUsed').textContent = result.model_used;
-                        document.getElementById('processingChanges').textContent = result.processing_changes || 0;
-                        
-                        // Clear any previous errors
-                        const errorDiv = document.querySelector('.error');
-                        if (errorDiv) errorDiv.remove();
-                        
-                    } else {
-                        throw new Error(result.error || 'Blog generation failed');
-                    }
-                    
-                } catch (error) {
-                    console.error('Error:', error);
-                    
-                    // Show error
-                    const errorDiv = document.createElement('div');
-                    errorDiv.className = 'error';
-                    errorDiv.textContent = `Error: ${error.message}`;
-                    document.getElementById('outputText').parentNode.insertBefore(errorDiv, document.getElementById('outputText'));
-                    
-                    document.getElementById('outputText').textContent = 'An error occurred while generating your blog.';
-                } finally {
-                    // Hide loading
-                    document.getElementById('loading').classList.remove('show');
-                    document.getElementById('generateBtn').disabled = false;
-                }
-            }
-            
-            // Allow Enter key to submit
-            document.getElementById('topic').addEventListener('keydown', function(e) {
-                if (e.key === 'Enter') {
-                    generateBlog();
-                }
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content)
+    return static_assets.response("blog_generator.html", request)
 
 if __name__ == "__main__":
     import uvicorn
-uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
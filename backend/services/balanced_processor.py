@@ -10,11 +10,33 @@ import re
 import random
 import string
 import json
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Callable
 from pathlib import Path
 import hashlib
 import time
 
+from .change_log import ChangeLog, Edit
+from .sampling import DecisionSampler
+from .deadline import DeadlineExceeded, check_deadline
+from .pipeline import BALANCED_POLISH_RULES, PolishRule, Stage, compile_pipeline, pipeline_name, schedule
+
+# Rule name -> human-readable message; a rule's position is its ID in span records
+CHANGE_RULES = {
+    "balanced_phrase": "Replaced '{original}' with '{replacement}'",
+    "natural_starter": "Added natural human starter",
+    "opinion_phrase": "Added personal opinion phrase",
+    "synonym": "Replaced '{original}' with '{replacement}'",
+    "natural_break": "Added natural break phrase",
+    "experience_phrase": "Added personal experience reference",
+    "contraction": "Added contraction: '{original}' to '{replacement}'",
+    "casual_transition": "Added casual transition",
+    "final_polish": "Applied final polish and formatting"
+}
+
+# Sentence decorations: given the sentence count, returns sentence index -> (rule, prefix, suffix)
+# for the sentences a pass decorates
+SentenceDecorations = Callable[[int], Dict[int, Tuple[str, str, str]]]
+
 class BalancedProcessor:
     """
     Advanced processor that intelligently balances plagiarism reduction and AI detection avoidance
@@ -172,62 +194,47 @@ class BalancedProcessor:
             ]
         }
     
-    def process_content(self, content: str, target_balance: str = "balanced") -> Dict[str, Any]:
+    def process_content(self, content: str, target_balance: str = "balanced", verbosity: str = "text",
+                        seed: Optional[int] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
         """
         Process content with intelligent balance between plagiarism and AI detection
         
         Args:
             content: The original content to process
             target_balance: Target balance ("plagiarism_focused", "ai_focused", "balanced")
+            verbosity: How changes are reported: "counts", "spans" or "text"
+            seed: Seed for the random choices (a random seed is picked if omitted)
+            deadline: time.time() to finish by; optional steps that would not fit are skipped
             
         Returns:
             Dict containing processed content and metadata
         """
+        if seed is None:
+            seed = random.getrandbits(32)
+        sampler = DecisionSampler(seed)
+        
         try:
             original_content = content
             processed_content = content
-            changes_made = []
-            
-            # Step 1: Apply balanced phrase replacement
-            processed_content, phrase_changes = self._apply_balanced_phrases(processed_content)
-            changes_made.extend(phrase_changes)
+            changes = ChangeLog(CHANGE_RULES, verbosity)
             
-            # Step 2: Add natural human elements
-            processed_content, human_changes = self._add_natural_human_elements(processed_content)
-            changes_made.extend(human_changes)
-            
-            # Step 3: Apply intelligent synonym replacement
-            processed_content, synonym_changes = self._apply_intelligent_synonyms(processed_content)
-            changes_made.extend(synonym_changes)
-            
-            # Step 4: Add unique but natural content variations
-            processed_content, variation_changes = self._add_unique_variations(processed_content)
-            changes_made.extend(variation_changes)
-            
-            # Step 5: Apply target-specific optimizations
-            if target_balance == "plagiarism_focused":
-                processed_content, opt_changes = self._optimize_for_plagiarism(processed_content)
-                changes_made.extend(opt_changes)
-            elif target_balance == "ai_focused":
-                processed_content, opt_changes = self._optimize_for_ai_detection(processed_content)
-                changes_made.extend(opt_changes)
-            else:  # balanced
-                processed_content, opt_changes = self._optimize_balanced(processed_content)
-                changes_made.extend(opt_changes)
-            
-            # Step 6: Final polish
-            processed_content, polish_changes = self._final_polish(processed_content)
-            changes_made.extend(polish_changes)
+            plan = compile_pipeline(pipeline_name("post_process", target_balance))
+            stages, skipped = schedule(plan.stages, len(content.split()), deadline)
+            processed_content = self.run_stages(processed_content, stages, changes, sampler)
             
             return {
                 "success": True,
                 "original_content": original_content,
                 "processed_content": processed_content,
-                "changes_made": changes_made,
-                "total_changes": len(changes_made),
-                "target_balance": target_balance
+                **changes.export(),
+                "target_balance": target_balance,
+                "seed": seed,
+                "pipeline": plan.to_dict(),
+                "skipped_stages": skipped
             }
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {
                 "success": False,
@@ -236,110 +243,160 @@ class BalancedProcessor:
                 "processed_content": content
             }
     
-    def _apply_balanced_phrases(self, content: str) -> Tuple[str, List[str]]:
+    def run_stages(self, content: str, stages: List[Stage], changes: ChangeLog, sampler: DecisionSampler) -> str:
+        """
+        Run pipeline stages on content, checking the request deadline before each one
+        
+        Args:
+            content: The current content
+            stages: Balanced processor stages of a compiled plan, in order
+            changes: Change log the stages record their edits in
+            sampler: Source of the random decisions
+            
+        Returns:
+            The processed content
+        """
+        passes = {
+            "balanced_phrases": lambda text: self._apply_balanced_phrases(text, changes, sampler),
+            "natural_elements": lambda text: self._add_natural_human_elements(text, changes, sampler),
+            "synonyms": lambda text: self._apply_intelligent_synonyms(text, changes, sampler),
+            "unique_variations": lambda text: self._add_unique_variations(text, changes, sampler),
+            "optimize_plagiarism": lambda text: self._optimize_for_plagiarism(text, changes, sampler),
+            "ai_contractions": lambda text: self._optimize_for_ai_detection(text, changes),
+            "optimize_balanced": lambda text: self._optimize_balanced(text, changes, sampler)
+        }
+        
+        for stage in stages:
+            check_deadline()
+            if stage.is_polish:
+                content = self._final_polish(content, changes, stage.rules)
+            else:
+                content = passes[stage.name](content)
+        return content
+    
+    def _sentence_edits(self, content: str, decorations: SentenceDecorations) -> List[Edit]:
+        """
+        Edits for a sentence-level pass
+        
+        Sentences are split on runs of .!? and joined back with ". "; every
+        decorated sentence is stripped and gets its prefix and suffix. The pass
+        picks all its sentences up front, so only those are visited.
+        """
+        spans = [delimiter.span() for delimiter in re.finditer(r'[.!?]+', content)]
+        edits = [(start, end, ". ", None) for start, end in spans]
+        # Sentence i runs from the end of delimiter i - 1 to the start of delimiter i
+        starts = [0] + [end for _, end in spans]
+        ends = [start for start, _ in spans] + [len(content)]
+        
+        for index, (rule, prefix, suffix) in decorations(len(starts)).items():
+            start, end = starts[index], ends[index]
+            sentence = content[start:end]
+            if not sentence.strip():
+                continue
+            leading = len(sentence) - len(sentence.lstrip())
+            trailing = len(sentence) - len(sentence.rstrip())
+            if prefix or leading:
+                edits.append((start, start + leading, prefix, rule if prefix else None))
+            if suffix or trailing:
+                edits.append((end - trailing, end, suffix, rule if suffix else None))
+        
+        # Insertions at a delimiter go before it
+        edits.sort(key=lambda edit: (edit[0], edit[1]))
+        return edits
+    
+    def _apply_balanced_phrases(self, content: str, changes: ChangeLog, sampler: DecisionSampler) -> str:
         """Apply balanced phrase replacement"""
-        changes = []
+        phrases = self.balanced_patterns["balanced_phrases"]
+        pattern = re.compile("|".join(re.escape(phrase) for phrase in phrases), re.IGNORECASE)
         
-        for phrase, alternatives in self.balanced_patterns["balanced_phrases"].items():
-            if phrase.lower() in content.lower():
-                replacement = random.choice(alternatives)
-                pattern = re.compile(re.escape(phrase), re.IGNORECASE)
-                if pattern.search(content):
-                    content = pattern.sub(replacement, content)
-                    changes.append(f"Replaced '{phrase}' with '{replacement}'")
+        # Every occurrence of a phrase gets the same replacement and counts as
+        # one change, as it always has; each occurrence still gets its span
+        chosen = {}
+        edits = []
+        repeats = set()
+        for match in pattern.finditer(content):
+            phrase = match.group().lower()
+            if phrase in chosen:
+                repeats.add(len(edits))
+            else:
+                chosen[phrase] = sampler.choice(phrases[phrase])
+            edits.append((match.start(), match.end(), chosen[phrase], "balanced_phrase"))
         
-        return content, changes
+        return changes.apply(content, edits, repeats)
     
-    def _add_natural_human_elements(self, content: str) -> Tuple[str, List[str]]:
+    def _add_natural_human_elements(self, content: str, changes: ChangeLog, sampler: DecisionSampler) -> str:
         """Add natural human elements without making it too common"""
-        changes = []
+        starters = self.balanced_patterns["natural_starters"]
+        opinions = self.human_natural_phrases["opinion_phrases"]
         
-        sentences = re.split(r'[.!?]+', content)
-        modified_sentences = []
+        # 25% of sentences get a natural human element, half a starter and half an opinion
+        elements = (
+            [("natural_starter", f"{starter} ", "") for starter in starters] +
+            [("opinion_phrase", "", f", {opinion}.") for opinion in opinions]
+        )
+        weights = [0.5 / len(starters)] * len(starters) + [0.5 / len(opinions)] * len(opinions)
         
-        for sentence in sentences:
-            if sentence.strip() and random.random() < 0.25:  # 25% chance
-                # Add a natural human element
-                if random.random() < 0.5:
-                    starter = random.choice(self.balanced_patterns["natural_starters"])
-                    sentence = f"{starter} {sentence.strip()}"
-                    changes.append("Added natural human starter")
-                else:
-                    opinion = random.choice(self.human_natural_phrases["opinion_phrases"])
-                    sentence = f"{sentence.strip()}, {opinion}."
-                    changes.append("Added personal opinion phrase")
-            
-            modified_sentences.append(sentence)
+        def decorations(count):
+            return sampler.pick(count, 0.25, elements, weights)
         
-        content = '. '.join(modified_sentences)
-        return content, changes
+        return changes.apply(content, self._sentence_edits(content, decorations))
     
-    def _apply_intelligent_synonyms(self, content: str) -> Tuple[str, List[str]]:
+    def _apply_intelligent_synonyms(self, content: str, changes: ChangeLog, sampler: DecisionSampler) -> str:
         """Apply intelligent synonym replacement"""
-        changes = []
+        edits = []
         
-        words = content.split()
-        for i, word in enumerate(words):
+        # Words are re-joined with single spaces
+        position = 0
+        for word_match in re.finditer(r'\S+', content):
+            start = word_match.start()
+            if content[position:start] != (" " if position else ""):
+                edits.append((position, start, " " if position else "", None))
+            position = word_match.end()
+            
+            word = word_match.group()
             word_lower = word.lower().strip(string.punctuation)
-            if word_lower in self.plagiarism_safe_alternatives and random.random() < 0.15:  # 15% chance
-                synonym = random.choice(self.plagiarism_safe_alternatives[word_lower])
+            if word_lower in self.plagiarism_safe_alternatives and sampler.random() < 0.15:  # 15% chance
+                synonym = sampler.choice(self.plagiarism_safe_alternatives[word_lower])
                 
                 # Preserve original case
                 if word[0].isupper():
                     synonym = synonym.capitalize()
                 
-                words[i] = word.replace(word_lower, synonym)
-                changes.append(f"Replaced '{word_lower}' with '{synonym}'")
+                index = word.find(word_lower)
+                if index >= 0:
+                    edits.append((start + index, start + index + len(word_lower), synonym, "synonym"))
+        
+        if position < len(content):
+            edits.append((position, len(content), "", None))
         
-        content = ' '.join(words)
-        return content, changes
+        return changes.apply(content, edits)
     
-    def _add_unique_variations(self, content: str) -> Tuple[str, List[str]]:
+    def _add_unique_variations(self, content: str, changes: ChangeLog, sampler: DecisionSampler) -> str:
         """Add unique content variations"""
-        changes = []
+        # Add a natural break to 20% of sentences
+        breaks = [("natural_break", f"{break_phrase} ", "") for break_phrase in self.ai_safe_patterns["natural_breaks"]]
         
-        # Add some unique but natural sentence structures
-        sentences = re.split(r'[.!?]+', content)
-        modified_sentences = []
+        def decorations(count):
+            return sampler.pick(count, 0.2, breaks)
         
-        for sentence in sentences:
-            if sentence.strip() and random.random() < 0.2:  # 20% chance
-                # Add a natural break
-                break_phrase = random.choice(self.ai_safe_patterns["natural_breaks"])
-                sentence = f"{break_phrase} {sentence.strip()}"
-                changes.append("Added natural break phrase")
-            
-            modified_sentences.append(sentence)
-        
-        content = '. '.join(modified_sentences)
-        return content, changes
+        return changes.apply(content, self._sentence_edits(content, decorations))
     
-    def _optimize_for_plagiarism(self, content: str) -> Tuple[str, List[str]]:
+    def _optimize_for_plagiarism(self, content: str, changes: ChangeLog, sampler: DecisionSampler) -> str:
         """Optimize specifically for plagiarism reduction"""
-        changes = []
-        
         # Use more unique phrases and structures
         # Add more personal experiences and specific examples
-        experience_phrases = self.human_natural_phrases["experience_phrases"]
+        experiences = [
+            ("experience_phrase", "", f" {experience}.")
+            for experience in self.human_natural_phrases["experience_phrases"]
+        ]
         
-        sentences = re.split(r'[.!?]+', content)
-        modified_sentences = []
+        def decorations(count):
+            return sampler.pick(count, 0.3, experiences)  # 30% chance
         
-        for sentence in sentences:
-            if sentence.strip() and random.random() < 0.3:  # 30% chance
-                experience = random.choice(experience_phrases)
-                sentence = f"{sentence.strip()} {experience}."
-                changes.append("Added personal experience reference")
-            
-            modified_sentences.append(sentence)
-        
-        content = '. '.join(modified_sentences)
-        return content, changes
+        return changes.apply(content, self._sentence_edits(content, decorations))
     
-    def _optimize_for_ai_detection(self, content: str) -> Tuple[str, List[str]]:
+    def _optimize_for_ai_detection(self, content: str, changes: ChangeLog) -> str:
         """Optimize specifically for AI detection avoidance"""
-        changes = []
-        
         # Use more casual, imperfect language
         # Add more contractions and informal expressions
         contractions = {
@@ -356,55 +413,44 @@ class BalancedProcessor:
             "will not": "won't"
         }
         
-        for formal, casual in contractions.items():
-            if formal in content.lower():
-                pattern = re.compile(re.escape(formal), re.IGNORECASE)
-                if pattern.search(content):
-                    content = pattern.sub(casual, content)
-                    changes.append(f"Added contraction: '{formal}' to '{casual}'")
+        casual_forms = {formal.lower(): casual for formal, casual in contractions.items()}
+        pattern = re.compile("|".join(re.escape(formal) for formal in contractions), re.IGNORECASE)
+        edits = [
+            (match.start(), match.end(), casual_forms[match.group().lower()], "contraction")
+            for match in pattern.finditer(content)
+        ]
         
-        return content, changes
+        return changes.apply(content, edits)
     
-    def _optimize_balanced(self, content: str) -> Tuple[str, List[str]]:
+    def _optimize_balanced(self, content: str, changes: ChangeLog, sampler: DecisionSampler) -> str:
         """Optimize for balanced approach"""
-        changes = []
-        
         # Apply moderate changes that address both issues
         # Use a mix of unique phrases and natural language
         
         # Add some casual transitions
-        casual_transitions = self.human_natural_phrases["casual_transitions"]
+        casual_transitions = [
+            ("casual_transition", f"{transition}, ", "")
+            for transition in self.human_natural_phrases["casual_transitions"]
+        ]
         
-        sentences = re.split(r'[.!?]+', content)
-        modified_sentences = []
+        def decorations(count):
+            return sampler.pick(count, 0.2, casual_transitions)  # 20% chance
         
-        for sentence in sentences:
-            if sentence.strip() and random.random() < 0.2:  # 20% chance
-                transition = random.choice(casual_transitions)
-                sentence = f"{transition}, {sentence.strip()}"
-                changes.append("Added casual transition")
-            
-            modified_sentences.append(sentence)
-        
-        content = '. '.join(modified_sentences)
-        return content, changes
+        return changes.apply(content, self._sentence_edits(content, decorations))
     
-    def _final_polish(self, content: str) -> Tuple[str, List[str]]:
-        """Final polish and validation"""
-        changes = []
-        
-        # Clean up multiple spaces
-        content = re.sub(r'\s+', ' ', content)
-        
-        # Fix punctuation
-        content = re.sub(r'\s+([.!?])', r'\1', content)
-        
-        # Ensure proper spacing after periods
-        content = re.sub(r'\.([A-Z])', r'. \1', content)
+    def _final_polish(self, content: str, changes: ChangeLog, rules: List[PolishRule] = BALANCED_POLISH_RULES) -> str:
+        """Final polish and validation, one rule after another"""
+        for pattern, replacement in rules:
+            edits = []
+            for match in re.finditer(pattern, content):
+                expanded = match.expand(replacement)
+                if expanded != match.group():
+                    edits.append((match.start(), match.end(), expanded, None))
+            content = changes.apply(content, edits)
         
-        changes.append("Applied final polish and formatting")
+        changes.note("final_polish")
         
-        return content, changes
+        return content
     
     def batch_process(self, contents: List[str], target_balance: str = "balanced") -> List[Dict[str, Any]]:
         """Process multiple contents in batch"""
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Batch Service - Concurrent batch processing with NDJSON streaming
+
+Parses batch request bodies (a JSON array, an object with an "items" array, or
+NDJSON with one item per line), runs the items concurrently and streams one
+NDJSON result line per item back in completion order, tagged with its index.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Iterator, Tuple
+
+from pydantic_core import to_json
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+NDJSON_MEDIA_TYPES = ["application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"]
+
+
+class BatchItemError(Exception):
+    """An item that could not be parsed; reported on its own result line"""
+
+
+def is_ndjson(content_type: str) -> bool:
+    """Check whether a Content-Type header announces an NDJSON body"""
+    return content_type.split(";")[0].strip().lower() in NDJSON_MEDIA_TYPES
+
+
+def parse_batch_items(body: bytes, content_type: str, defaults: Dict[str, Any]) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (index, item) pairs from a batch request body
+
+    The body must be read before the streaming response starts, since the
+    response listens on the same channel for client disconnects. Items that
+    cannot be parsed are yielded as BatchItemError.
+
+    Args:
+        body: The raw request body
+        content_type: The request's Content-Type header
+        defaults: Options applied to every item that does not set them itself
+
+    Yields:
+        Tuples of item index and item dictionary (or BatchItemError)
+    """
+    if is_ndjson(content_type):
+        index = 0
+        for line in body.splitlines():
+            if line.strip():
+                yield index, _parse_item(line, defaults)
+                index += 1
+        return
+
+    try:
+        parsed = json.loads(body)
+    except ValueError as e:
+        yield 0, BatchItemError(f"Invalid JSON body: {e}")
+        return
+
+    if isinstance(parsed, dict):
+        defaults = {**defaults, **{k: v for k, v in parsed.items() if k != "items"}}
+        parsed = parsed.get("items", [])
+
+    if not isinstance(parsed, list):
+        yield 0, BatchItemError("Batch body must be a JSON array, an object with 'items', or NDJSON")
+        return
+
+    for index, item in enumerate(parsed):
+        yield index, _normalize_item(item, defaults)
+
+
+def _parse_item(line: bytes, defaults: Dict[str, Any]) -> Any:
+    """Parse one NDJSON line"""
+    try:
+        return _normalize_item(json.loads(line), defaults)
+    except ValueError as e:
+        return BatchItemError(f"Invalid JSON line: {e}")
+
+
+def _normalize_item(item: Any, defaults: Dict[str, Any]) -> Any:
+    """Turn a bare string or an object into an item dictionary with defaults applied"""
+    if isinstance(item, str):
+        return {**defaults, "text": item}
+    if isinstance(item, dict):
+        return {**defaults, **item}
+    return BatchItemError("Each item must be a string or an object")
+
+
+async def stream_batch(
+    items: Iterator[Tuple[int, Any]],
+    process: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    concurrency: int
+) -> AsyncIterator[bytes]:
+    """
+    Process batch items concurrently and yield NDJSON result lines as they finish
+
+    Args:
+        items: Iterator of (index, item) pairs
+        process: Coroutine function that processes one item and returns its result
+        concurrency: Maximum number of items processed at the same time
+
+    Yields:
+        One encoded NDJSON line per item, in completion order
+    """
+    results: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    tasks = set()
+
+    async def run_item(index: int, item: Any):
+        try:
+            if isinstance(item, BatchItemError):
+                result = {"success": False, "error": str(item)}
+            else:
+                result = await process(item)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            slots.release()
+        await results.put({"index": index, **result})
+
+    async def feed():
+        count = 0
+        try:
+            for index, item in items:
+                if count >= config.BATCH_MAX_ITEMS:
+                    await slots.acquire()
+                    tasks.add(asyncio.create_task(run_item(
+                        index, BatchItemError(f"Batch limit of {config.BATCH_MAX_ITEMS} items exceeded")
+                    )))
+                    break
+                await slots.acquire()
+                tasks.add(asyncio.create_task(run_item(index, item)))
+                count += 1
+            await asyncio.gather(*tasks)
+        finally:
+            await results.put(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            yield to_json(result) + b"\n"
+        await feeder
+    finally:
+        # The client went away or the stream was closed early
+        feeder.cancel()
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Change Log - Compact span records of the edits made to a text
+
+Every recorded edit is four integers kept in parallel arrays: its offset and
+length in the current text, the ID of the rule that made it and an interned
+ID for the text it inserted. Passes describe their work as a sorted list of
+edits; applying the list rewrites the text with a single join and shifts the
+spans recorded by earlier passes. A later edit that rewrites part of a span
+splits it, keeping only the pieces still in the text, so at the end the
+replacement recorded for every span is exactly the output text at its offset
+and UIs can highlight it without diffing the two texts.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+VERBOSITY_LEVELS = ["counts", "spans", "text"]
+
+# (start, end, replacement, rule) in the coordinates of the text the edit applies to;
+# rule is None for formatting edits that are applied but not reported
+Edit = Tuple[int, int, str, Optional[str]]
+
+
+class ChangeLog:
+    """Records the changes made by a sequence of edit passes"""
+
+    def __init__(self, rules: Dict[str, str], verbosity: str = "counts"):
+        """
+        Args:
+            rules: Rule name -> message template; a rule's ID is its position.
+                Templates may use {original} and {replacement}.
+            verbosity: "counts" (per-rule totals only), "spans" (span arrays)
+                or "text" (one human-readable message per change)
+        """
+        if verbosity not in VERBOSITY_LEVELS:
+            raise ValueError(f"verbosity must be one of {', '.join(VERBOSITY_LEVELS)}")
+
+        self.verbosity = verbosity
+        self.rules = rules
+        self._rule_ids = {name: rule_id for rule_id, name in enumerate(rules)}
+        self.counts: Dict[str, int] = {}
+
+        # Span records, only kept at "spans" verbosity
+        self.offsets = array("q")
+        self.lengths = array("q")
+        self.rule_ids = array("H")
+        self.replacement_ids = array("L")
+        self.replacements: List[str] = []
+        self._replacement_index: Dict[str, int] = {}
+
+        # Messages, only kept at "text" verbosity
+        self.messages: List[str] = []
+
+    @property
+    def total(self) -> int:
+        """Total number of changes recorded"""
+        return sum(self.counts.values())
+
+    def note(self, rule: str, **details):
+        """Record a change that has no span, such as a formatting pass"""
+        self.counts[rule] = self.counts.get(rule, 0) + 1
+        if self.verbosity == "text":
+            self.messages.append(self.rules[rule].format(**details))
+
+    def apply(self, text: str, edits: List[Edit], uncounted: Optional[Set[int]] = None) -> str:
+        """
+        Apply a pass's edits and record the reported ones
+
+        Args:
+            text: The current text
+            edits: Non-overlapping edits sorted by position
+            uncounted: Indexes of edits that repeat a change already reported
+                by an earlier edit: their spans are recorded, but they add no
+                count or message
+
+        Returns:
+            The edited text
+        """
+        if not edits:
+            return text
+
+        track_spans = self.verbosity == "spans"
+        if track_spans:
+            self._remap(text, edits)
+
+        parts = []
+        position = 0
+        shift = 0
+        for index, (start, end, replacement, rule) in enumerate(edits):
+            parts.append(text[position:start])
+            parts.append(replacement)
+            position = end
+
+            if rule is not None:
+                counted = not uncounted or index not in uncounted
+                if counted:
+                    self.counts[rule] = self.counts.get(rule, 0) + 1
+                if track_spans:
+                    self._record_span(start + shift, rule, replacement)
+                elif self.verbosity == "text" and counted:
+                    self.messages.append(self.rules[rule].format(
+                        original=text[start:end],
+                        replacement=replacement
+                    ))
+            shift += len(replacement) - (end - start)
+
+        parts.append(text[position:])
+        return "".join(parts)
+
+    def _intern(self, replacement: str) -> int:
+        """ID of a replacement text in the replacement table"""
+        replacement_id = self._replacement_index.get(replacement)
+        if replacement_id is None:
+            replacement_id = len(self.replacements)
+            self._replacement_index[replacement] = replacement_id
+            self.replacements.append(replacement)
+        return replacement_id
+
+    def _record_span(self, offset: int, rule: str, replacement: str):
+        """Append one span record, interning its replacement text"""
+        self.offsets.append(offset)
+        self.lengths.append(len(replacement))
+        self.rule_ids.append(self._rule_ids[rule])
+        self.replacement_ids.append(self._intern(replacement))
+
+    def _remap(self, text: str, edits: List[Edit]):
+        """
+        Move the recorded spans into the coordinates of the edited text
+
+        A span that an edit rewrites part of is split around the edit: only
+        the pieces of its text that survive are kept, each recorded with the
+        text it now covers.
+        """
+        if not self.offsets:
+            return
+
+        starts = [edit[0] for edit in edits]
+        # cumulative[i]: total length change of the edits before edit i
+        cumulative = [0]
+        for start, end, replacement, _ in edits:
+            cumulative.append(cumulative[-1] + len(replacement) - (end - start))
+
+        def map_position(position: int) -> int:
+            # Edits starting at or before the position come before it, so an
+            # insertion right at a span start lands before the span. Positions
+            # inside replaced text never get here.
+            return position + cumulative[bisect_right(starts, position)]
+
+        offsets, lengths, rule_ids, replacement_ids = array("q"), array("q"), array("H"), array("L")
+        for index in range(len(self.offsets)):
+            span_start = self.offsets[index]
+            span_end = span_start + self.lengths[index]
+
+            # Edits that replace text of the span or insert strictly inside it
+            first = max(0, bisect_right(starts, span_start) - 1)
+            touching = [edit for edit in edits[first:bisect_left(starts, span_end)] if edit[1] > span_start]
+            if not touching:
+                pieces = [(span_start, span_end)]
+            elif span_start == span_end:
+                # An empty span (a deletion) inside replaced text is gone
+                pieces = []
+            else:
+                pieces = []
+                position = span_start
+                for start, end, _, _ in touching:
+                    if start > position:
+                        pieces.append((position, start))
+                    position = max(position, end)
+                if position < span_end:
+                    pieces.append((position, span_end))
+
+            for piece_start, piece_end in pieces:
+                offsets.append(map_position(piece_start))
+                lengths.append(piece_end - piece_start)
+                rule_ids.append(self.rule_ids[index])
+                replacement_ids.append(
+                    self._intern(text[piece_start:piece_end]) if touching else self.replacement_ids[index]
+                )
+
+        self.offsets, self.lengths, self.rule_ids, self.replacement_ids = offsets, lengths, rule_ids, replacement_ids
+
+    def export(self) -> Dict[str, Any]:
+        """
+        The change report for the configured verbosity
+
+        Returns:
+            total_changes and change_counts, plus changes_made (messages) at
+            "text" verbosity or change_spans (column arrays with the rule and
+            replacement tables their IDs index into) at "spans" verbosity.
+            Span offsets are character offsets into the final text.
+        """
+        report: Dict[str, Any] = {
+            "total_changes": self.total,
+            "change_counts": dict(self.counts)
+        }
+
+        if self.verbosity == "text":
+            report["changes_made"] = self.messages
+        elif self.verbosity == "spans":
+            report["change_spans"] = {
+                "rules": list(self.rules),
+                "replacements": self.replacements,
+                "offset": self.offsets.tolist(),
+                "length": self.lengths.tolist(),
+                "rule": self.rule_ids.tolist(),
+                "replacement": self.replacement_ids.tolist()
+            }
+
+        return report
+
+
+def merge_reports(reports: List[Dict[str, Any]], offsets: List[int]) -> Dict[str, Any]:
+    """
+    Combine the change reports of consecutive pieces of one text
+
+    Args:
+        reports: Exported reports of the pieces, all made with the same rules
+            and verbosity
+        offsets: Where each piece's output starts in the combined output
+
+    Returns:
+        One report whose spans point into the combined output
+    """
+    counts: Dict[str, int] = {}
+    for report in reports:
+        for rule, count in report["change_counts"].items():
+            counts[rule] = counts.get(rule, 0) + count
+
+    merged: Dict[str, Any] = {
+        "total_changes": sum(counts.values()),
+        "change_counts": counts
+    }
+    if not reports:
+        return merged
+
+    if "changes_made" in reports[0]:
+        merged["changes_made"] = [message for report in reports for message in report["changes_made"]]
+
+    if "change_spans" in reports[0]:
+        replacements: List[str] = []
+        replacement_index: Dict[str, int] = {}
+        columns: Dict[str, List[int]] = {"offset": [], "length": [], "rule": [], "replacement": []}
+        for report, base in zip(reports, offsets):
+            spans = report["change_spans"]
+            # Re-intern each piece's replacements into the combined table
+            ids = []
+            for replacement in spans["replacements"]:
+                if replacement not in replacement_index:
+                    replacement_index[replacement] = len(replacements)
+                    replacements.append(replacement)
+                ids.append(replacement_index[replacement])
+            columns["offset"].extend(offset + base for offset in spans["offset"])
+            columns["length"].extend(spans["length"])
+            columns["rule"].extend(spans["rule"])
+            columns["replacement"].extend(ids[replacement_id] for replacement_id in spans["replacement"])
+        merged["change_spans"] = {
+            "rules": reports[0]["change_spans"]["rules"],
+            "replacements": replacements,
+            **columns
+        }
+
+    return merged
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Compression helpers - Content-Encoding negotiation, encoders and middleware
+
+brotli and zstd come from the `brotli` and `zstandard` packages in
+requirements.txt; on an install without them only gzip is served.
+"""
+
+import gzip
+from typing import Dict, List, Optional
+
+# Try to import optional libraries
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Content types worth compressing; everything else (images, archives) is sent as-is
+COMPRESSIBLE_TYPES = ["text/", "application/json", "application/javascript", "application/xml"]
+
+# Maximum levels, used for bodies compressed once and served many times
+MAX_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+
+
+def available_encodings() -> List[str]:
+    """Encodings this server can produce, in order of preference"""
+    encodings = []
+    if HAS_BROTLI:
+        encodings.append("br")
+    if HAS_ZSTD:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into encoding -> q-value
+
+    Args:
+        header: e.g. "gzip;q=0.8, br, *;q=0"
+
+    Returns:
+        Dictionary of lower-cased codings and their q-values
+    """
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str], offered: List[str]) -> Optional[str]:
+    """
+    Pick the best encoding the client accepts
+
+    Args:
+        header: The request's Accept-Encoding header
+        offered: Encodings we can send, in order of server preference
+
+    Returns:
+        The chosen encoding, or None to send the body unencoded
+    """
+    if not header:
+        return None
+
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compress data with the given content coding
+
+    Args:
+        data: The body to compress
+        encoding: "gzip", "br" or "zstd"
+        level: Compression level (gzip 1-9, brotli quality 0-11, zstd 1-22); defaults to maximum
+
+    Returns:
+        The compressed body
+    """
+    if level is None:
+        level = MAX_LEVELS.get(encoding, 0)
+
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br" and HAS_BROTLI:
+        return brotli.compress(data, quality=level)
+    if encoding == "zstd" and HAS_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check whether a Content-Type is worth compressing"""
+    content_type = content_type.lower()
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses large single-body responses
+
+    The encoding is negotiated from Accept-Encoding. Only responses sent in one
+    body message are compressed: streamed responses (NDJSON batches, job events)
+    pass through untouched so their lines still reach the client as they are
+    produced. Responses that already carry a Content-Encoding, such as the
+    precompressed UI pages, are left alone.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, levels: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            app: The wrapped ASGI application
+            minimum_size: Bodies smaller than this many bytes are sent as-is
+            levels: Compression level per encoding for on-the-fly compression
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or {}
+        self.offered = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = negotiate_encoding(accept_encoding, self.offered)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                # Hold the headers back until we know whether the body is compressed
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._should_compress(start["headers"], body):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding, self.levels.get(encoding))
+            headers = [
+                (name, value) for name, value in start["headers"]
+                if name not in (b"content-length", b"vary")
+            ]
+            vary = [value for name, value in start["headers"] if name == b"vary"]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, headers, body: bytes) -> bool:
+        """Only compress large bodies of compressible types that are not encoded yet"""
+        if len(body) < self.minimum_size:
+            return False
+
+        content_type = ""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1")
+        return is_compressible(content_type)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Deadlines - Request deadlines carried from the HTTP layer to every stage
+
+DeadlineMiddleware gives each request a deadline: the X-Request-Timeout-Ms
+header sent by the caller (the Flask UI sends the time it will wait), capped
+by config.REQUEST_TIMEOUT_SECONDS. The deadline is kept in a context variable,
+so it follows the request into asyncio tasks and asyncio.to_thread. The
+transform executor passes it on to worker threads and processes, where the
+pipeline checks it between stages, and the LLM gateway shortens its timeouts
+and retries to fit in it. Work past the deadline raises DeadlineExceeded.
+
+The middleware also cancels the request as soon as the client disconnects or
+the deadline passes before the response has started. Cancelling drops the
+request's queued transform tasks and aborts its in-flight LLM calls; a stage
+already running in a worker finishes and the next stage check stops the rest.
+"""
+
+import asyncio
+import contextvars
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# time.time() the current request has to be done by, None without a deadline
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+DEADLINE_HEADER = b"x-request-timeout-ms"
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work continues past its request's deadline"""
+
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message)
+
+
+def current_deadline() -> Optional[float]:
+    """The deadline of the current request, if it has one"""
+    return _deadline.get()
+
+
+def remaining(deadline: Optional[float] = None) -> Optional[float]:
+    """Seconds left before a deadline (the current request's by default), None without one"""
+    deadline = deadline if deadline is not None else _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def check_deadline():
+    """Raise DeadlineExceeded if the current request's deadline has passed"""
+    deadline = _deadline.get()
+    if deadline is not None and time.time() >= deadline:
+        raise DeadlineExceeded()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[None]:
+    """Make a deadline the current one for the duration of the block"""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class DeadlineMetrics:
+    """Requests that were cut short, by cause"""
+
+    def __init__(self):
+        self.disconnected = 0
+        self.deadline_exceeded = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"disconnected": self.disconnected, "deadline_exceeded": self.deadline_exceeded}
+
+deadline_metrics = DeadlineMetrics()
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that sets each request's deadline and cancels abandoned requests
+
+    A request is cancelled when the client disconnects before the response is
+    complete, or when the deadline passes before the response has started, in
+    which case a 504 is sent. Streamed responses are not cut off by the
+    deadline once they have started, but work they start later still checks it.
+    """
+
+    def __init__(self, app, timeout_seconds: float):
+        """
+        Args:
+            app: The wrapped ASGI application
+            timeout_seconds: Longest deadline a request gets, and the deadline
+                of requests without the header
+        """
+        self.app = app
+        self.timeout_seconds = timeout_seconds
+
+    def _timeout(self, scope) -> float:
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER:
+                try:
+                    milliseconds = int(value)
+                except ValueError:
+                    break
+                if milliseconds > 0:
+                    return min(milliseconds / 1000, self.timeout_seconds)
+                break
+        return self.timeout_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = self._timeout(scope)
+        has_body = self._has_body(scope)
+        body_received = asyncio.Event()
+        response_started = False
+        response_complete = False
+        # An empty request body read by the watcher before the app asked for it
+        unread: list = []
+
+        async def receive_tracked():
+            message = unread.pop() if unread else await receive()
+            if message["type"] == "http.request" and not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        async def send_tracked(message):
+            nonlocal response_started, response_complete
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        async def wait_for_disconnect():
+            # Once the body has been read, the only message left is the disconnect.
+            # Requests without a body are watched from the start, since the app
+            # may never read it.
+            if has_body:
+                await body_received.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                if message["type"] == "http.request" and not body_received.is_set():
+                    unread.append(message)
+
+        with deadline_scope(time.time() + timeout):
+            app_task = asyncio.ensure_future(self.app(scope, receive_tracked, send_tracked))
+        watcher = asyncio.ensure_future(wait_for_disconnect())
+
+        try:
+            done, _ = await asyncio.wait({app_task, watcher}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if not response_started:
+                    deadline_metrics.deadline_exceeded += 1
+                    await self._cancel(app_task)
+                    await self._send_timeout(send)
+                    return
+                done, _ = await asyncio.wait({app_task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if app_task not in done and not response_complete:
+                deadline_metrics.disconnected += 1
+                await self._cancel(app_task)
+                return
+            await app_task
+        finally:
+            watcher.cancel()
+            if not app_task.done():
+                app_task.cancel()
+
+    def _has_body(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"transfer-encoding" or (name == b"content-length" and value.strip() not in [b"", b"0"]):
+                return True
+        return False
+
+    async def _cancel(self, task: asyncio.Task):
+        task.cancel()
+        try:
+            await task
+        except BaseException:
+            pass
+
+    async def _send_timeout(self, send):
+        body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Diff Engine - Word-level diff between an original and a rewritten text
+
+Both texts are split into word tokens which are interned to integers, so every
+comparison is an int compare. Common prefixes and suffixes are stripped first,
+then patience diff anchors the texts on words that occur exactly once in both
+(or, failing that, on matching occurrences of equally frequent words) and the
+gaps between anchors are diffed with linear-space Myers (middle snake
+divide and conquer). Regions whose edit distance exceeds a cap are reported as
+one replacement instead, which keeps the worst case bounded on texts that
+share almost nothing.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+# Myers regions costing more edits than this are reported as a single replacement
+DEFAULT_MAX_COST = 1000
+
+WORD_PATTERN = re.compile(r'\S+')
+SENTENCE_END_PATTERN = re.compile(r'[.!?]+')
+
+# (tag, a_start, a_end, b_start, b_end) in token indices; tag is
+# "equal", "insert", "delete" or "replace"
+Opcode = Tuple[str, int, int, int, int]
+
+
+def tokenize(text: str) -> Tuple[List[str], List[int], List[int]]:
+    """
+    Split text into word tokens with their character offsets
+
+    Returns:
+        Tokens, start offsets and end offsets
+    """
+    tokens, starts, ends = [], [], []
+    for match in WORD_PATTERN.finditer(text):
+        tokens.append(match.group())
+        starts.append(match.start())
+        ends.append(match.end())
+    return tokens, starts, ends
+
+
+def _intern(a_tokens: List[str], b_tokens: List[str]) -> Tuple[List[int], List[int]]:
+    """Map tokens of both texts to shared integer IDs"""
+    ids: Dict[str, int] = {}
+    a = [ids.setdefault(token, len(ids)) for token in a_tokens]
+    b = [ids.setdefault(token, len(ids)) for token in b_tokens]
+    return a, b
+
+
+def _longest_increasing(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Longest subsequence of (i, j) pairs (sorted by i) that is increasing in j"""
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[position] = j
+            tail_index[position] = index
+        previous[index] = tail_index[position - 1] if position else -1
+
+    sequence = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        sequence.append(pairs[index])
+        index = previous[index]
+    sequence.reverse()
+    return sequence
+
+
+def _middle_snake(a: List[int], a0: int, a1: int, b: List[int], b0: int, b1: int,
+                  max_cost: int) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the middle snake of the shortest edit script for a[a0:a1] -> b[b0:b1]
+
+    Returns:
+        (x_start, y_start, x_end, y_end) relative to (a0, b0), or None when the
+        edit distance exceeds max_cost
+    """
+    n, m = a1 - a0, b1 - b0
+    delta = n - m
+    odd = delta & 1
+    limit = (n + m + 1) // 2 + 1
+    offset = limit + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+
+    for d in range(limit):
+        if 2 * d > max_cost:
+            return None
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and delta - (d - 1) <= k <= delta + (d - 1):
+                if x + backward[offset + delta - k] >= n:
+                    return x_start, y_start, x, y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a1 - 1 - x] == b[b1 - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d:
+                if x + forward[offset + delta - k] >= n:
+                    return n - x, m - y, n - x_start, m - y_start
+
+    return None
+
+
+def matching_blocks(a: List[int], b: List[int], max_cost: int = DEFAULT_MAX_COST) -> List[Tuple[int, int, int]]:
+    """
+    Find the runs of equal tokens between two token ID sequences
+
+    Args:
+        a: Token IDs of the original text
+        b: Token IDs of the new text
+        max_cost: Edit distance above which a Myers region is given up as a replacement
+
+    Returns:
+        Sorted (a_index, b_index, length) blocks, like difflib's get_matching_blocks
+        without the sentinel
+    """
+    blocks: List[Tuple[int, int, int]] = []
+    # Work stack of (a0, a1, b0, b1, try_patience) regions still to be diffed
+    stack = [(0, len(a), 0, len(b), True)]
+
+    while stack:
+        a0, a1, b0, b1, try_patience = stack.pop()
+
+        # Common prefix and suffix
+        start = 0
+        while a0 + start < a1 and b0 + start < b1 and a[a0 + start] == b[b0 + start]:
+            start += 1
+        if start:
+            blocks.append((a0, b0, start))
+            a0 += start
+            b0 += start
+        end = 0
+        while a1 - end > a0 and b1 - end > b0 and a[a1 - 1 - end] == b[b1 - 1 - end]:
+            end += 1
+        if end:
+            blocks.append((a1 - end, b1 - end, end))
+            a1 -= end
+            b1 -= end
+
+        if a0 == a1 or b0 == b1:
+            continue
+
+        if try_patience:
+            # Myers is exact and cheap on regions it is guaranteed to finish
+            anchors = _anchors(a, a0, a1, b, b0, b1, repeated=(a1 - a0) + (b1 - b0) > max_cost)
+            if anchors:
+                # Diff the gaps between anchors; each anchor extends into its gaps
+                # through the prefix/suffix step
+                previous_a, previous_b = a0, b0
+                for i, j in anchors:
+                    stack.append((previous_a, i, previous_b, j, True))
+                    blocks.append((i, j, 1))
+                    previous_a, previous_b = i + 1, j + 1
+                stack.append((previous_a, a1, previous_b, b1, True))
+                continue
+
+        snake = _middle_snake(a, a0, a1, b, b0, b1, max_cost)
+        if snake is None:
+            continue
+        x_start, y_start, x_end, y_end = snake
+        if (x_start, y_start) == (0, 0) and (x_end, y_end) == (a1 - a0, b1 - b0):
+            continue
+        if x_end > x_start:
+            blocks.append((a0 + x_start, b0 + y_start, x_end - x_start))
+        stack.append((a0, a0 + x_start, b0, b0 + y_start, False))
+        stack.append((a0 + x_end, a1, b0 + y_end, b1, False))
+
+    blocks.sort()
+
+    # Merge adjacent blocks
+    merged: List[Tuple[int, int, int]] = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+def _anchors(a: List[int], a0: int, a1: int, b: List[int], b0: int, b1: int,
+             repeated: bool) -> List[Tuple[int, int]]:
+    """
+    Patience anchors of a region, in common order
+
+    Tokens occurring exactly once in both regions are used when there are any.
+    Otherwise, if `repeated` is set, the k-th occurrences of tokens that occur
+    equally often in both regions are paired up, which still finds the shared
+    structure of texts in which every word repeats (long documents, pasted
+    sections) where Myers alone would exceed its cost cap.
+    """
+    a_positions: Dict[int, List[int]] = {}
+    for i in range(a0, a1):
+        a_positions.setdefault(a[i], []).append(i)
+
+    b_positions: Dict[int, List[int]] = {}
+    for j in range(b0, b1):
+        if b[j] in a_positions:
+            b_positions.setdefault(b[j], []).append(j)
+
+    pairs = [
+        (a_positions[token][0], positions[0])
+        for token, positions in b_positions.items()
+        if len(positions) == 1 and len(a_positions[token]) == 1
+    ]
+    if not pairs and repeated:
+        pairs = [
+            pair
+            for token, positions in b_positions.items()
+            if len(positions) == len(a_positions[token])
+            for pair in zip(a_positions[token], positions)
+        ]
+
+    pairs.sort()
+    return _longest_increasing(pairs)
+
+
+def get_opcodes(blocks: List[Tuple[int, int, int]], a_length: int, b_length: int) -> List[Opcode]:
+    """Turn matching blocks into equal/insert/delete/replace opcodes"""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for block_i, block_j, size in blocks + [(a_length, b_length, 0)]:
+        if i < block_i and j < block_j:
+            opcodes.append(("replace", i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(("delete", i, block_i, j, j))
+        elif j < block_j:
+            opcodes.append(("insert", i, i, j, block_j))
+        if size:
+            opcodes.append(("equal", block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+    return opcodes
+
+
+def diff_texts(original: str, revised: str, include_spans: bool = True,
+               max_cost: int = DEFAULT_MAX_COST) -> Dict[str, Any]:
+    """
+    Word-level diff of two texts
+
+    Args:
+        original: The original text
+        revised: The rewritten text
+        include_spans: Whether to return the changed spans or only statistics
+        max_cost: Edit distance cap per Myers region
+
+    Returns:
+        Dictionary with "stats" and, if requested, "spans": a list of
+        [op, original_start, original_end, revised_start, revised_end] character
+        ranges for every inserted, deleted or replaced run of words
+    """
+    a_tokens, a_starts, a_ends = tokenize(original)
+    b_tokens, b_starts, b_ends = tokenize(revised)
+    a, b = _intern(a_tokens, b_tokens)
+    opcodes = get_opcodes(matching_blocks(a, b, max_cost), len(a), len(b))
+
+    def char_range(starts: List[int], ends: List[int], i0: int, i1: int, text_length: int) -> Tuple[int, int]:
+        if i0 < i1:
+            return starts[i0], ends[i1 - 1]
+        # Empty range: the position between the neighbouring words
+        position = starts[i0] if i0 < len(starts) else text_length
+        return position, position
+
+    counts = {"equal": 0, "insert": 0, "delete": 0, "replace_original": 0, "replace_revised": 0}
+    changed_runs = {"insert": 0, "delete": 0, "replace": 0}
+    spans = []
+    for tag, i0, i1, j0, j1 in opcodes:
+        if tag == "equal":
+            counts["equal"] += i1 - i0
+            continue
+
+        changed_runs[tag] += 1
+        if tag == "insert":
+            counts["insert"] += j1 - j0
+        elif tag == "delete":
+            counts["delete"] += i1 - i0
+        else:
+            counts["replace_original"] += i1 - i0
+            counts["replace_revised"] += j1 - j0
+
+        if include_spans:
+            spans.append([
+                tag,
+                *char_range(a_starts, a_ends, i0, i1, len(original)),
+                *char_range(b_starts, b_ends, j0, j1, len(revised))
+            ])
+
+    total = len(a) + len(b)
+    result: Dict[str, Any] = {
+        "stats": {
+            "words_original": len(a),
+            "words_revised": len(b),
+            "words_unchanged": counts["equal"],
+            "words_inserted": counts["insert"],
+            "words_deleted": counts["delete"],
+            "words_replaced": counts["replace_original"],
+            "words_replacing": counts["replace_revised"],
+            "inserted_runs": changed_runs["insert"],
+            "deleted_runs": changed_runs["delete"],
+            "replaced_runs": changed_runs["replace"],
+            "similarity": round(2 * counts["equal"] / total, 4) if total else 1.0
+        }
+    }
+    if include_spans:
+        result["spans"] = spans
+    return result
+
+
+def count_touched_sentences(original: str, spans: List[List[Any]]) -> int:
+    """Count the sentences of the original text that contain a changed span"""
+    boundaries = [match.end() for match in SENTENCE_END_PATTERN.finditer(original)]
+    touched = set()
+    for _, start, end, _, _ in spans:
+        first = bisect_right(boundaries, start)
+        last = bisect_right(boundaries, max(start, end - 1))
+        touched.update(range(first, last + 1))
+    return len(touched)
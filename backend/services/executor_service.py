@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Transform Executor - Offloading for CPU-heavy text transforms
+
+This service runs the regex-heavy humanization and post-processing passes
+outside the event loop. Every endpoint gets its own lane: a dedicated thread
+or process pool behind a bounded queue, so a huge document on one endpoint
+never delays small requests on another.
+
+Tasks carry their request's deadline into the worker: a task that is still
+queued when the deadline passes is never started, and a running pipeline
+stops at its next stage.
+"""
+
+import asyncio
+import time
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Executor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple, List
+from multiprocessing.shared_memory import SharedMemory
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+from .shared_text import SharedText, share_text, allocate_text, read_segment, read_text, write_text, release
+from .profiler import Profile, profile_call
+from .deadline import DeadlineExceeded, current_deadline, deadline_scope
+
+
+class TransformQueueFull(Exception):
+    """Raised when a lane already has as many requests waiting as it allows"""
+
+
+# Transform tasks - module level so they can be pickled into worker processes
+
+def _humanize_task(text: str, intensity: str, use_groq: bool, seed: Optional[int] = None,
+                   deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Run the humanizer on a single text"""
+    from .humanizer_service import humanizer
+    return humanizer.humanize_text(text, intensity=intensity, use_groq=use_groq, seed=seed, deadline=deadline)
+
+def _humanize_paragraphs_task(paragraphs: List[str], intensity: str, use_groq: bool, seeds: List[int],
+                              deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Run the humanizer on each paragraph with its own seed"""
+    from .humanizer_service import humanizer
+    return humanizer.humanize_paragraphs(paragraphs, intensity, use_groq, seeds, deadline=deadline)
+
+def _post_process_task(content: str, target_balance: str, verbosity: str = "text",
+                       seed: Optional[int] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Run the balanced processor on a single text"""
+    from .balanced_processor import balanced_processor
+    return balanced_processor.process_content(
+        content, target_balance=target_balance, verbosity=verbosity, seed=seed, deadline=deadline
+    )
+
+def _pipeline_task(text: str, plan, seed: int, verbosity: str = "counts",
+                   max_words: Optional[int] = None) -> Dict[str, Any]:
+    """Run a compiled pipeline plan on a single text"""
+    from .pipeline import run_pipeline
+    return run_pipeline(plan, text, seed, verbosity=verbosity, max_words=max_words)
+
+def _analyze_task(original: str, revised: str, include_spans: bool) -> Dict[str, Any]:
+    """Diff an original text against its rewritten version"""
+    from .humanizer_service import humanizer
+    return humanizer.analyze_changes(original, revised, include_spans=include_spans)
+
+TASKS = {
+    "humanize": _humanize_task,
+    "humanize_paragraphs": _humanize_paragraphs_task,
+    "post_process": _post_process_task,
+    "pipeline": _pipeline_task,
+    "analyze": _analyze_task
+}
+
+# (echoed input field, output field) of each task's result dictionary
+TASK_FIELDS = {
+    "humanize": ("original", "humanized"),
+    "post_process": ("original_content", "processed_content"),
+    "pipeline": ("original_content", "processed_content")
+}
+
+def _timed_call(
+    task: str,
+    args: tuple,
+    output: Optional[SharedText] = None,
+    profile_interval: Optional[float] = None,
+    echo: bool = True,
+    deadline: Optional[float] = None
+) -> Tuple[float, float, Any, Optional[tuple]]:
+    """
+    Run a task in the worker and report when it actually started and finished
+
+    Arguments passed as SharedText handles are read from shared memory. When an
+    output handle is given, the task's output text is written into it and the
+    echoed input is dropped, so only small values are pickled back. Without
+    echo the echoed input is dropped in every case. With a profile interval the
+    task runs under a sampling profiler and its (stacks, seconds) are returned
+    as well. The task runs with the request's deadline as the current one and
+    is not started at all once the deadline has passed.
+    """
+    started_at = time.time()
+    if deadline is not None and started_at >= deadline:
+        raise DeadlineExceeded()
+    shared_input = bool(args) and isinstance(args[0], SharedText)
+    args = tuple(read_text(arg) if isinstance(arg, SharedText) else arg for arg in args)
+
+    samples = None
+    with deadline_scope(deadline):
+        if profile_interval is None:
+            result = TASKS[task](*args)
+        else:
+            result, stacks, duration = profile_call(profile_interval, TASKS[task], *args)
+            samples = (stacks, duration)
+
+    if not echo and isinstance(result, dict) and task in TASK_FIELDS:
+        result.pop(TASK_FIELDS[task][0], None)
+
+    if output is not None and isinstance(result, dict):
+        echo_field, output_field = TASK_FIELDS[task]
+        if shared_input and echo_field in result:
+            # The parent still has the input, no need to send it back
+            del result[echo_field]
+            result["_shared_echo"] = True
+        if isinstance(result.get(output_field), str):
+            written = write_text(output, result[output_field])
+            if written is not None:
+                result[output_field] = None
+                result["_shared_output_length"] = written
+
+    return started_at, time.time(), result, samples
+
+
+class TransformLane:
+    """A worker pool with a bounded queue and queue-wait metrics for one endpoint"""
+
+    def __init__(self, name: str, workers: int, queue_size: int, mode: str):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.capacity = self.workers + self.queue_size
+        self.mode = mode
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.total_run = 0.0
+        self.shared_bytes = 0
+
+    def _get_executor(self) -> Executor:
+        """Create the pool lazily so importing the service never forks or spawns"""
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix=f"transform-{self.name}"
+                )
+        return self._executor
+
+    @property
+    def free_slots(self) -> int:
+        """Number of requests the lane can still accept"""
+        return max(0, self.capacity - self._pending)
+
+    async def submit(self, task: str, *args, profile: Optional[Profile] = None, echo: bool = True) -> Any:
+        """
+        Run a task on this lane's pool
+
+        Args:
+            task: Name of the task in TASKS
+            *args: Arguments passed to the task
+            profile: Request profile the task's samples are merged into
+            echo: Whether the result keeps the echoed input text; callers that
+                still have the input skip sending it back from the worker
+
+        Returns:
+            The task's return value
+
+        Raises:
+            TransformQueueFull: If the lane is already at capacity
+        """
+        if self._pending >= self.capacity:
+            self.rejected += 1
+            raise TransformQueueFull(
+                f"The {self.name} queue is full ({self.queue_size} requests waiting), please retry shortly"
+            )
+
+        self._pending += 1
+        self.submitted += 1
+        submitted_at = time.time()
+        loop = asyncio.get_running_loop()
+        segments: List[SharedMemory] = []
+        outcome = loop.create_future()
+
+        try:
+            call_args, output_segment, output = self._share_args(task, args, segments)
+            future = self._get_executor().submit(
+                _timed_call, task, call_args, output,
+                profile.interval if profile is not None else None, echo, current_deadline()
+            )
+        except BaseException as e:
+            self._pending -= 1
+            self.failed += 1
+            if isinstance(e, BrokenProcessPool):
+                self._executor = None
+            for segment in segments:
+                release(segment)
+            raise
+
+        def finished(future):
+            try:
+                loop.call_soon_threadsafe(
+                    self._finish, future, outcome, task, args, output_segment, segments, submitted_at, profile
+                )
+            except RuntimeError:
+                # The event loop is gone (shutdown); nobody is waiting any more
+                pass
+
+        # The lane slot and shared memory are held until the worker is done
+        # with the task, not just until the caller stops waiting for it
+        future.add_done_callback(finished)
+        try:
+            return await outcome
+        except asyncio.CancelledError:
+            # The client went away: drop the task if it is still queued
+            self.cancelled += 1
+            future.cancel()
+            raise
+
+    def _finish(self, future, outcome: asyncio.Future, task: str, args: tuple,
+                output_segment: Optional[SharedMemory], segments: List[SharedMemory],
+                submitted_at: float, profile: Optional[Profile]):
+        """Settle a task once its worker is done: free the slot, record metrics, deliver the result"""
+        self._pending -= 1
+        try:
+            if future.cancelled():
+                if not outcome.done():
+                    outcome.cancel()
+                return
+            error = future.exception()
+            if error is not None:
+                self.failed += 1
+                if isinstance(error, BrokenProcessPool):
+                    # A worker died; drop the pool so the next request gets a fresh one
+                    self._executor = None
+                if not outcome.done():
+                    outcome.set_exception(error)
+                return
+
+            started_at, finished_at, result, samples = future.result()
+            wait = max(0.0, started_at - submitted_at)
+            self.completed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.last_wait = wait
+            self.total_run += max(0.0, finished_at - started_at)
+            if outcome.done():
+                return
+
+            if samples is not None:
+                profile.add(*samples, label=f"{self.name}:{task}")
+            if output_segment is not None:
+                result = self._restore_result(task, result, args[0], output_segment)
+            outcome.set_result(result)
+        except Exception as e:
+            if not outcome.done():
+                outcome.set_exception(e)
+        finally:
+            for segment in segments:
+                release(segment)
+
+    def _share_args(
+        self,
+        task: str,
+        args: tuple,
+        segments: List[SharedMemory]
+    ) -> Tuple[tuple, Optional[SharedMemory], Optional[SharedText]]:
+        """Move large text arguments into shared memory when crossing a process boundary"""
+        if self.mode != "process":
+            return args, None, None
+
+        call_args = []
+        for arg in args:
+            if isinstance(arg, str) and len(arg) >= config.SHARED_MEMORY_THRESHOLD:
+                segment, handle = share_text(arg)
+                segments.append(segment)
+                self.shared_bytes += handle.length
+                call_args.append(handle)
+            else:
+                call_args.append(arg)
+
+        output_segment, output = None, None
+        if task in TASK_FIELDS and call_args and isinstance(call_args[0], SharedText):
+            capacity = int(call_args[0].length * config.SHARED_MEMORY_OUTPUT_FACTOR) + 64 * 1024
+            output_segment, output = allocate_text(capacity)
+            segments.append(output_segment)
+
+        return tuple(call_args), output_segment, output
+
+    def _restore_result(self, task: str, result: Any, text: str, output_segment: SharedMemory) -> Any:
+        """Put the echoed input and the shared output back into a task result"""
+        if not isinstance(result, dict):
+            return result
+
+        echo_field, output_field = TASK_FIELDS[task]
+        if result.pop("_shared_echo", False):
+            result[echo_field] = text
+        length = result.pop("_shared_output_length", None)
+        if length is not None:
+            result[output_field] = read_segment(output_segment, length)
+            self.shared_bytes += length
+        return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue depth and queue-wait statistics for this lane"""
+        completed = self.completed or 1
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": min(self._pending, self.workers),
+            "queued": max(0, self._pending - self.workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "queue_wait_ms": {
+                "avg": round(self.total_wait / completed * 1000, 2),
+                "max": round(self.max_wait * 1000, 2),
+                "last": round(self.last_wait * 1000, 2)
+            },
+            "run_ms_avg": round(self.total_run / completed * 1000, 2),
+            "shared_memory_bytes": self.shared_bytes
+        }
+
+    def shutdown(self):
+        """Stop the pool without waiting for queued work"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class TransformExecutor:
+    """Routes transform tasks to per-endpoint lanes"""
+
+    def __init__(self, mode: Optional[str] = None, lanes: Optional[Dict[str, Dict[str, int]]] = None):
+        """
+        Initialize the executor lanes
+
+        Args:
+            mode: "process" or "thread" (defaults to config.TRANSFORM_EXECUTOR)
+            lanes: Lane name to {"workers", "queue_size"} (defaults to config.TRANSFORM_LANES)
+        """
+        self.mode = mode or config.TRANSFORM_EXECUTOR
+        if self.mode not in ["process", "thread"]:
+            raise ValueError("TRANSFORM_EXECUTOR must be 'process' or 'thread'")
+
+        lanes = lanes or config.TRANSFORM_LANES
+        self.lanes = {
+            name: TransformLane(name, settings["workers"], settings["queue_size"], self.mode)
+            for name, settings in lanes.items()
+        }
+
+    async def run(self, lane: str, task: str, *args, profile: Optional[Profile] = None, echo: bool = True) -> Any:
+        """
+        Run a transform task on the given endpoint lane
+
+        Args:
+            lane: Lane name (usually the endpoint, e.g. "humanize")
+            task: Task name ("humanize", "post_process" or "analyze")
+            *args: Task arguments
+            profile: Request profile the task's samples are merged into
+            echo: Whether the result keeps the echoed input text
+
+        Returns:
+            The task's result dictionary
+        """
+        if task not in TASKS:
+            raise ValueError(f"Unknown transform task: {task}")
+        return await self.lanes[lane].submit(task, *args, profile=profile, echo=echo)
+
+    async def map(self, lane: str, task: str, arg_lists: List[tuple],
+                  profile: Optional[Profile] = None, echo: bool = True) -> List[Any]:
+        """
+        Run one task per argument tuple concurrently on a lane
+
+        All pieces are admitted together or not at all, and if one fails the
+        rest are cancelled.
+
+        Args:
+            lane: Lane name
+            task: Task name
+            arg_lists: Arguments of each call
+            profile: Request profile the pieces' samples are merged into
+            echo: Whether the results keep the echoed input text
+
+        Returns:
+            The results, in the order of arg_lists
+
+        Raises:
+            TransformQueueFull: If the lane cannot take every piece right now
+        """
+        if task not in TASKS:
+            raise ValueError(f"Unknown transform task: {task}")
+        target = self.lanes[lane]
+        if target.free_slots < len(arg_lists):
+            target.rejected += 1
+            raise TransformQueueFull(
+                f"The {lane} queue cannot take {len(arg_lists)} more pieces right now, please retry shortly"
+            )
+
+        pending = [asyncio.ensure_future(target.submit(task, *args, profile=profile, echo=echo)) for args in arg_lists]
+        try:
+            return await asyncio.gather(*pending)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get metrics for all lanes"""
+        return {name: lane.get_metrics() for name, lane in self.lanes.items()}
+
+    def shutdown(self):
+        """Shut down every lane"""
+        for lane in self.lanes.values():
+            lane.shutdown()
+
+# Create global instance
+transform_executor = TransformExecutor()
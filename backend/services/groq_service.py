@@ -1,5 +1,4 @@
 import os
-from groq import Groq
 from typing import Optional
 import sys
 from pathlib import Path
@@ -12,116 +11,79 @@ except ImportError:
     sys.path.append(str(Path(__file__).parent.parent))
     from config import config
 
+from .llm_gateway import llm_gateway
+from .pipeline import compile_pipeline, pipeline_name
+
 class GroqService:
     """Service for generating blog content using Groq API"""
     
     def __init__(self):
-        """Initialize the Groq client"""
-        if not config.GROQ_API_KEY:
+        """Check that generation calls can be answered"""
+        # Replaying recorded completions needs no key
+        if not config.GROQ_API_KEY and config.LLM_CACHE_MODE != "replay":
             raise ValueError("GROQ_API_KEY is required")
-        
-        self.client = Groq(api_key=config.GROQ_API_KEY)
-        self.model = config.GROQ_MODEL
     
-    def generate_blog_content(
-        self, 
-        prompt: str, 
-        max_length: Optional[int] = None,
-        style: Optional[str] = "informative"
-    ) -> dict:
+    def generation_request(self, prompt: str, max_length: int, style: Optional[str],
+                           generation_mode: str) -> dict:
+        """LLM gateway chat arguments for generating a draft"""
+        # Create a comprehensive system prompt for blog generation
+        system_prompt = self._create_system_prompt(style, max_length)
+        if generation_mode == "single_call" and style not in ["factual", "professional"]:
+            system_prompt += self._create_voice_instructions()
+        
+        # Create the user prompt
+        user_prompt = self._create_user_prompt(prompt, max_length, style)
+        
+        # Generate content using Groq with higher randomness for human-like output
+        # The router picks the model from the length and style
+        return {
+            "purpose": "generate_blog",
+            "words": max_length,
+            "style": style,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.9,  # Higher temperature for more creative, human-like output
+            "max_tokens": max_length * 2,  # Allow more tokens for better generation
+            "top_p": 0.95,  # Higher top_p for more variation
+            "frequency_penalty": 0.1,  # Slight penalty to avoid repetition
+            "presence_penalty": 0.1,  # Encourage diverse vocabulary
+            "stream": False
+        }
+    
+    def draft_result(self, response: dict, generation_mode: str) -> dict:
+        """The unprocessed draft from a generation response"""
+        # Extract the generated content
+        content = response["content"].strip()
+        
+        # Remove meta-response lines (like "I'm not going to follow the given instructions...")
+        content = self._remove_meta_responses(content)
+        
+        return {
+            "content": content,
+            "word_count": len(content.split()),
+            "model_used": response["model"],
+            "generation_mode": generation_mode,
+            "success": True
+        }
+    
+    def blog_plan(self, style: Optional[str], generation_mode: Optional[str] = None,
+                  post_process: Optional[str] = None):
         """
-        Generate blog content based on the given prompt
+        The compiled pipeline a blog post in this style goes through
         
         Args:
-            prompt: The topic or brief description for the blog
-            max_length: Maximum length of the blog content
-            style: Writing style (informative, casual, professional, etc.)
-            
-        Returns:
-            dict: Contains generated content and metadata
+            style: Writing style
+            generation_mode: "two_pass" includes the LLM rewrite when an API key is set
+            post_process: Post-processing intensity, or None to leave it out
         """
-        try:
-            # Set default max_length if not provided
-            if max_length is None:
-                max_length = config.DEFAULT_MAX_LENGTH
-            
-            # Create a comprehensive system prompt for blog generation
-            system_prompt = self._create_system_prompt(style, max_length)
-            
-            # Create the user prompt
-            user_prompt = self._create_user_prompt(prompt, max_length, style)
-            
-            # Generate content using Groq with higher randomness for human-like output
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.9,  # Higher temperature for more creative, human-like output
-                max_tokens=max_length * 2,  # Allow more tokens for better generation
-                top_p=0.95,  # Higher top_p for more variation
-                frequency_penalty=0.1,  # Slight penalty to avoid repetition
-                presence_penalty=0.1,  # Encourage diverse vocabulary
-                stream=False
-            )
-            
-            # Extract the generated content
-            content = response.choices[0].message.content.strip()
-            
-            # Remove meta-response lines (like "I'm not going to follow the given instructions...")
-            content = self._remove_meta_responses(content)
-            
-            # Apply comprehensive humanization (skip for factual and professional styles to maintain objectivity)
-            if style not in ["factual", "professional"]:
-                try:
-                    from .humanizer_service import humanizer
-                    humanization_result = humanizer.humanize_text(
-                        content, 
-                        intensity="heavy", 
-                        use_groq=True if config.GROQ_API_KEY else False
-                    )
-                    
-                    if humanization_result['success']:
-                        content = humanization_result['humanized']
-                        print(f"✅ Humanization applied: {len(humanization_result['changes_made'])} changes made")
-                    else:
-                        print(f"⚠️ Humanization failed: {humanization_result.get('error', 'Unknown error')}")
-                        # Fall back to simple humanization
-                        content = self._humanize_content(content)
-                        
-                except Exception as e:
-                    print(f"⚠️ Advanced humanization failed: {e}")
-                    # Fall back to simple humanization
-                    content = self._humanize_content(content)
-            else:
-                print(f"✅ Skipping humanization for {style} style to maintain objectivity")
-            
-            # Calculate word count and trim to exact length if needed
-            words = content.split()
-            word_count = len(words)
-            
-            # If content is longer than requested, trim it to exact word count
-            if max_length and word_count > max_length:
-                content = ' '.join(words[:max_length])
-                word_count = max_length
-                print(f"✅ Content trimmed to exact {max_length} words")
-            
-            return {
-                "content": content,
-                "word_count": word_count,
-                "model_used": self.model,
-                "success": True
-            }
-            
-        except Exception as e:
-            return {
-                "content": "",
-                "word_count": 0,
-                "model_used": self.model,
-                "success": False,
-                "error": str(e)
-            }
+        generation_mode = generation_mode or config.DEFAULT_GENERATION_MODE
+        return compile_pipeline(
+            pipeline_name("blog", style),
+            post_process,
+            llm_rewrite=generation_mode == "two_pass" and llm_gateway.available
+        )
     
     def _create_system_prompt(self, style: str, max_length: int) -> str:
         """Create a comprehensive system prompt for blog generation"""
@@ -198,6 +160,15 @@ AVOID AI-LIKE PATTERNS:
 
 Write as if you're genuinely passionate about this topic and sharing your personal insights."""
     
+    def _create_voice_instructions(self) -> str:
+        """Instructions that fold the two-pass rewrite into the first completion"""
+        return """
+
+FINAL VOICE (this draft is published without a separate rewrite, so write it in its final form):
+- Sound like a real person wrote it naturally, not an editor or an assistant
+- Keep it conversational with personal touches and contractions throughout
+- Leave out any formal or AI-like phrasing ("It is important to note", "Furthermore", "In conclusion")"""
+    
     def _create_user_prompt(self, prompt: str, max_length: int, style: str = "informative") -> str:
         """Create the user prompt for blog generation"""
         
@@ -230,88 +201,6 @@ Topic: {prompt}
 
 Write away!"""
     
-    def _humanize_content(self, content: str) -> str:
-        """Post-process content to make it more human-like and less AI-detectable"""
-        import re
-        import random
-        
-        # Add some human-like imperfections and variations
-        humanizations = [
-            # Add contractions
-            (r"\bis not\b", "isn't"),
-            (r"\bdo not\b", "don't"),
-            (r"\bcan not\b", "can't"),
-            (r"\bwill not\b", "won't"),
-            (r"\bshould not\b", "shouldn't"),
-            (r"\bwould not\b", "wouldn't"),
-            (r"\byou are\b", "you're"),
-            (r"\bwe are\b", "we're"),
-            (r"\bthey are\b", "they're"),
-            (r"\bit is\b", "it's"),
-            (r"\bthat is\b", "that's"),
-            (r"\bI will\b", "I'll"),
-            (r"\bI would\b", "I'd"),
-            (r"\bI have\b", "I've"),
-            
-            # Add some human-like transition phrases randomly
-            (r"\bMoreover,\b", random.choice(["Plus,", "Also,", "On top of that,", "What's more,"])),
-            (r"\bFurthermore,\b", random.choice(["Besides,", "Also,", "And another thing,", "Not to mention,"])),
-            (r"\bHowever,\b", random.choice(["But,", "Though,", "That said,", "On the flip side,"])),
-            (r"\bIn conclusion,\b", random.choice(["So,", "All in all,", "At the end of the day,", "To wrap things up,"])),
-            (r"\bAdditionally,\b", random.choice(["Plus,", "Also,", "And,", "What's more,"])),
-        ]
-        
-        # Apply random humanizations
-        for pattern, replacement in humanizations:
-            if random.random() < 0.4:  # 40% chance to apply each humanization
-                content = re.sub(pattern, replacement, content, flags=re.IGNORECASE)
-        
-        # Add some personal touches randomly
-        personal_phrases = [
-            "I think",
-            "In my experience",
-            "I've noticed",
-            "From what I've seen",
-            "I believe",
-            "It seems to me",
-            "I find that",
-            "I've found that"
-        ]
-        
-        # Sometimes add a personal phrase at the beginning of paragraphs
-        paragraphs = content.split('\n\n')
-        for i, paragraph in enumerate(paragraphs):
-            if random.random() < 0.2 and not paragraph.startswith('#'):  # 20% chance, not for headings
-                personal_phrase = random.choice(personal_phrases)
-                # Add to beginning of paragraph if it doesn't already have one
-                if not any(phrase in paragraph[:50] for phrase in personal_phrases):
-                    paragraphs[i] = f"{personal_phrase}, {paragraph.lower()}"
-        
-        content = '\n\n'.join(paragraphs)
-        
-        # Add some variety to sentence starters
-        sentence_starters = [
-            "Now, ",
-            "Well, ",
-            "So, ",
-            "Actually, ",
-            "Honestly, ",
-            "Look, ",
-            "Here's the thing: ",
-            "You know what? "
-        ]
-        
-        # Sometimes add casual starters to sentences
-        sentences = content.split('. ')
-        for i, sentence in enumerate(sentences):
-            if random.random() < 0.1 and i > 0:  # 10% chance, not for first sentence
-                starter = random.choice(sentence_starters)
-                sentences[i] = f"{starter}{sentence}"
-        
-        content = '. '.join(sentences)
-        
-        return content
-    
     def _remove_meta_responses(self, text: str) -> str:
         """Remove meta-response lines from the generated content"""
         import re
@@ -13,13 +13,17 @@ import json
 from typing import List, Dict, Tuple, Optional, Any
 from pathlib import Path
 
-# Try to import optional libraries
-try:
-    import requests
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
+from .diff_engine import diff_texts, count_touched_sentences
+from .text_buffer import TextBuffer, ReplacementTable
+from .sampling import DecisionSampler
+from .llm_gateway import LLMGateway, llm_gateway
+from .deadline import DeadlineExceeded, check_deadline
+from .pipeline import HUMANIZER_POLISH_RULES, PolishRule, Stage, compile_pipeline, pipeline_name, schedule
 
+# Sentence boundary used by the sentence-level passes
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+# Try to import optional libraries
 try:
     import nltk
     HAS_NLTK = True
@@ -37,10 +41,11 @@ class HybridHumanizer:
         Initialize the humanizer with all necessary patterns and data.
         
         Args:
-            groq_api_key: Optional Groq API key for enhanced humanization
+            groq_api_key: Groq API key for enhanced humanization (defaults to
+                the shared LLM gateway's key)
         """
         self.groq_api_key = groq_api_key
-        self.groq_api_url = "https://api.groq.com/openai/v1/chat/completions"
+        self.gateway = LLMGateway(api_key=groq_api_key) if groq_api_key else llm_gateway
         
         # Initialize NLTK if available
         if HAS_NLTK:
@@ -58,6 +63,7 @@ class HybridHumanizer:
         self._load_statistical_patterns()
         self._load_ai_detection_markers()
         self._load_human_templates()
+        self._compile_replacement_tables()
         
         print("🤖 HybridHumanizer initialized successfully!")
     
@@ -509,6 +515,15 @@ class HybridHumanizer:
             ]
         }
     
+    def _compile_replacement_tables(self):
+        """Compile the replacement tables so each is applied in a few scans instead of one per entry"""
+        self.ai_phrase_table = ReplacementTable(self.human_replacements, word_boundaries=False)
+        self.contraction_table = ReplacementTable(self.contractions)
+        self.vocabulary_table = ReplacementTable(self.vocabulary_replacements)
+        self.formal_structure_patterns = [
+            re.compile(pattern, re.IGNORECASE) for pattern in self.ai_detection_markers['formal_structures']
+        ]
+    
     def _load_human_templates(self):
         """Load human-like templates for different content types"""
         self.human_templates = {
@@ -569,7 +584,8 @@ class HybridHumanizer:
             ]
         }
     
-    def humanize_text(self, text: str, intensity: str = "heavy", use_groq: bool = False) -> Dict[str, Any]:
+    def humanize_text(self, text: str, intensity: str = "heavy", use_groq: bool = False,
+                      seed: Optional[int] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
         """
         Main method to humanize AI-generated text using multiple techniques.
         
@@ -577,9 +593,14 @@ class HybridHumanizer:
             text: The AI-generated text to humanize
             intensity: How much to humanize ("light", "medium", "heavy")
             use_groq: Whether to use Groq API for additional humanization
+            seed: Seed for the random choices; the same text, settings and seed
+                always give the same result (a random seed is picked if omitted)
+            deadline: time.time() to finish by; optional passes that would not
+                fit are skipped
             
         Returns:
-            Dictionary containing original text, humanized text, and changes made
+            Dictionary containing original text, humanized text, changes made, the
+            seed used and the passes skipped to meet the deadline
         """
         if not text or not text.strip():
             return {
@@ -590,54 +611,25 @@ class HybridHumanizer:
                 'error': 'Empty text provided'
             }
         
+        if seed is None:
+            seed = random.getrandbits(32)
+        sampler = DecisionSampler(seed)
+        
         try:
             original_text = text
             changes_made = []
+            buffer = TextBuffer(text)
+            plan = compile_pipeline(
+                pipeline_name("humanize", intensity),
+                llm_rewrite=use_groq and self.gateway.available
+            )
+            
+            stages, skipped = schedule(plan.stages, len(text.split()), deadline)
             
             # Multi-pass processing for maximum effectiveness
             print(f"🔄 Starting {intensity} humanization...")
-            
-            # Pass 1: Apply core transformations
-            if intensity in ["medium", "heavy"]:
-                text = self._replace_ai_phrases(text)
-                changes_made.append("Replaced AI phrases")
-                
-                text = self._add_contractions(text)
-                changes_made.append("Added contractions")
-                
-                text = self._adjust_vocabulary(text)
-                changes_made.append("Simplified vocabulary")
-            
-            # Pass 2: Add human characteristics
-            if intensity == "heavy":
-                text = self._add_personal_touches(text)
-                changes_made.append("Added personal touches")
-                
-                text = self._add_human_imperfections(text)
-                changes_made.append("Added human imperfections")
-                
-                text = self._vary_sentence_structure(text)
-                changes_made.append("Varied sentence structure")
-            
-            # Pass 3: Break AI detection patterns
-            text = self._break_ai_detection_patterns(text)
-            changes_made.append("Broke AI detection patterns")
-            
-            # Pass 4: Apply statistical conformity
-            text = self._apply_statistical_patterns(text)
-            changes_made.append("Applied human writing patterns")
-            
-            # Pass 5: Add final polish
-            text = self._final_polish(text)
-            changes_made.append("Final polish applied")
-            
-            # Optional: Use Groq API for additional humanization
-            if use_groq and self.groq_api_key:
-                try:
-                    text = self._humanize_with_groq(text)
-                    changes_made.append("Applied Groq AI enhancement")
-                except Exception as e:
-                    print(f"⚠️ Groq enhancement failed: {e}")
+            self.run_stages(buffer, stages, sampler, changes_made)
+            text = buffer.text
             
             return {
                 'original': original_text,
@@ -646,9 +638,14 @@ class HybridHumanizer:
                 'success': True,
                 'word_count_original': len(original_text.split()),
                 'word_count_humanized': len(text.split()),
-                'transformation_intensity': intensity
+                'transformation_intensity': intensity,
+                'seed': seed,
+                'pipeline': plan.to_dict(),
+                'skipped_stages': skipped
             }
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {
                 'original': text,
@@ -658,170 +655,225 @@ class HybridHumanizer:
                 'error': str(e)
             }
     
-    def _replace_ai_phrases(self, text: str) -> str:
-        """Replace AI phrases with human alternatives"""
-        for ai_phrase, replacements in self.human_replacements.items():
-            if ai_phrase.lower() in text.lower():
-                replacement = random.choice(replacements)
-                # Use case-insensitive replacement
-                pattern = re.compile(re.escape(ai_phrase), re.IGNORECASE)
-                text = pattern.sub(replacement, text, count=1)
-        return text
+    def run_stages(self, buffer: TextBuffer, stages: List[Stage], sampler: DecisionSampler,
+                   changes_made: List[str]):
+        """
+        Run pipeline stages on a buffer, checking the request deadline before each one
+        
+        Args:
+            buffer: The text buffer to edit
+            stages: Humanizer stages of a compiled plan, in order
+            sampler: Source of the random decisions
+            changes_made: List the passes' messages are appended to
+        """
+        passes = {
+            "ai_phrases": (lambda: self._replace_ai_phrases(buffer, sampler), "Replaced AI phrases"),
+            "contractions": (lambda: self._add_contractions(buffer), "Added contractions"),
+            "vocabulary": (lambda: self._adjust_vocabulary(buffer), "Simplified vocabulary"),
+            "personal_touches": (lambda: self._add_personal_touches(buffer, sampler), "Added personal touches"),
+            "imperfections": (lambda: self._add_human_imperfections(buffer, sampler), "Added human imperfections"),
+            "sentence_structure": (lambda: self._vary_sentence_structure(buffer, sampler), "Varied sentence structure"),
+            "break_ai_patterns": (lambda: self._break_ai_detection_patterns(buffer, sampler), "Broke AI detection patterns"),
+            "statistical_patterns": (lambda: self._apply_statistical_patterns(buffer, sampler), "Applied human writing patterns")
+        }
+        
+        for stage in stages:
+            check_deadline()
+            if stage.is_polish:
+                self._final_polish(buffer, stage.rules)
+                changes_made.append("Final polish applied")
+            elif stage.name == "llm_rewrite":
+                # Optional: Use Groq API for additional humanization
+                try:
+                    text = buffer.text
+                    buffer.apply([(0, len(text), self._humanize_with_groq(text))])
+                    changes_made.append("Applied Groq AI enhancement")
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Groq enhancement failed: {e}")
+            else:
+                run, message = passes[stage.name]
+                run()
+                changes_made.append(message)
+    
+    def _replace_ai_phrases(self, buffer: TextBuffer, sampler: DecisionSampler):
+        """Replace the first occurrence of each AI phrase with a human alternative"""
+        replaced = set()
+        
+        def choose(ai_phrase, replacements):
+            if ai_phrase in replaced:
+                return None
+            replaced.add(ai_phrase)
+            return sampler.choice(replacements)
+        
+        self.ai_phrase_table.apply(buffer, choose)
     
-    def _add_contractions(self, text: str) -> str:
+    def _add_contractions(self, buffer: TextBuffer):
         """Add contractions to make text more casual"""
-        for formal, casual in self.contractions.items():
-            pattern = r'\b' + re.escape(formal) + r'\b'
-            text = re.sub(pattern, casual, text, flags=re.IGNORECASE)
-        return text
+        self.contraction_table.apply(buffer)
     
-    def _adjust_vocabulary(self, text: str) -> str:
+    def _adjust_vocabulary(self, buffer: TextBuffer):
         """Replace complex words with simpler alternatives"""
-        for complex_word, simple_word in self.vocabulary_replacements.items():
-            pattern = r'\b' + re.escape(complex_word) + r'\b'
-            text = re.sub(pattern, simple_word, text, flags=re.IGNORECASE)
-        return text
+        self.vocabulary_table.apply(buffer)
     
-    def _add_personal_touches(self, text: str) -> str:
+    def _add_personal_touches(self, buffer: TextBuffer, sampler: DecisionSampler):
         """Add personal opinions and experiences"""
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        starters = {}
+        
+        def select(count):
+            starters.update(sampler.pick(count, 0.15, self.human_templates['personal_starters']))
+            return starters
         
-        for i, sentence in enumerate(sentences):
-            if random.random() < 0.15 and not sentence.strip().startswith('#'):
-                personal_starter = random.choice(self.human_templates['personal_starters'])
-                # Restructure sentence to include personal touch
-                sentence = sentence.strip()
-                if sentence:
-                    sentences[i] = f"{personal_starter}, {sentence.lower()}"
+        def rewrite(i, sentence):
+            # Restructure sentence to include personal touch
+            sentence = sentence.strip()
+            if sentence and not sentence.startswith('#'):
+                return f"{starters[i]}, {sentence.lower()}"
+            return None
         
-        return ' '.join(sentences)
+        buffer.rewrite_segments(SENTENCE_SPLIT, ' ', rewrite, select)
     
-    def _add_human_imperfections(self, text: str) -> str:
+    def _add_human_imperfections(self, buffer: TextBuffer, sampler: DecisionSampler):
         """Add natural human speech patterns and imperfections"""
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        for i, sentence in enumerate(sentences):
-            # Add filler words
-            if random.random() < 0.1:
-                filler = random.choice(self.human_templates['filler_phrases'])
-                words = sentence.split()
-                if len(words) > 3:
-                    insert_pos = random.randint(1, len(words) - 1)
-                    words.insert(insert_pos, filler)
-                    sentences[i] = ' '.join(words)
+        fillers = {}
+        positions = {}
+        interjections = {}
+        
+        def select(count):
+            # Filler words, with where in the sentence they go
+            fillers.update(sampler.pick(count, 0.1, self.human_templates['filler_phrases']))
+            positions.update(zip(fillers, sampler.uniform(len(fillers))))
+            # Casual interjections
+            interjections.update(sampler.pick(count, 0.05, ["you know", "I mean", "right", "yeah"]))
+            return sorted(fillers.keys() | interjections.keys())
+        
+        def rewrite(i, sentence):
+            # An interjection replaces the filler edit
+            if i in interjections:
+                return f"{sentence.rstrip('.')} - {interjections[i]}."
             
-            # Add casual interjections
-            if random.random() < 0.05:
-                interjection = random.choice(["you know", "I mean", "right", "yeah"])
-                sentences[i] = f"{sentence.rstrip('.')} - {interjection}."
+            words = sentence.split()
+            if len(words) > 3:
+                insert_pos = 1 + int(positions[i] * (len(words) - 1))
+                words.insert(insert_pos, fillers[i])
+                return ' '.join(words)
+            return None
         
-        return ' '.join(sentences)
+        buffer.rewrite_segments(SENTENCE_SPLIT, ' ', rewrite, select)
     
-    def _vary_sentence_structure(self, text: str) -> str:
+    def _vary_sentence_structure(self, buffer: TextBuffer, sampler: DecisionSampler):
         """Change sentence patterns to be less predictable"""
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        the_replacements = ["When you look at", "If you consider", "Looking at"]
+        this_replacements = ["When you think about this", "If you consider this", "Looking at this"]
+        starters = {}
+        fragments = {}
         
-        for i, sentence in enumerate(sentences):
+        def select(count):
+            # Index into the replacements for whichever formal starter the sentence has
+            starters.update(sampler.pick(count, 0.2, range(len(the_replacements))))
+            # Add sentence fragments occasionally, never after the first sentence
+            fragments.update(sampler.pick(count, 0.1, ["Simple as that.", "Period.", "End of story.", "That's it."]))
+            fragments.pop(0, None)
+            return sorted(starters.keys() | fragments.keys())
+        
+        def rewrite(i, sentence):
+            rewritten = sentence
+            
             # Replace formal starters
-            if random.random() < 0.2:
+            if i in starters:
                 if sentence.strip().startswith('The '):
-                    replacements = ["When you look at", "If you consider", "Looking at"]
-                    replacement = random.choice(replacements)
-                    sentences[i] = sentence.replace('The ', f"{replacement} the ", 1)
+                    rewritten = sentence.replace('The ', f"{the_replacements[starters[i]]} the ", 1)
                 elif sentence.strip().startswith('This '):
-                    replacements = ["When you think about this", "If you consider this", "Looking at this"]
-                    replacement = random.choice(replacements)
-                    sentences[i] = sentence.replace('This ', f"{replacement} ", 1)
+                    rewritten = sentence.replace('This ', f"{this_replacements[starters[i]]} ", 1)
+            
+            if i in fragments:
+                rewritten = f"{sentence} {fragments[i]}"
             
-            # Add sentence fragments occasionally
-            if random.random() < 0.1 and i > 0:
-                fragments = ["Simple as that.", "Period.", "End of story.", "That's it."]
-                fragment = random.choice(fragments)
-                sentences[i] = f"{sentence} {fragment}"
+            return rewritten
         
-        return ' '.join(sentences)
+        buffer.rewrite_segments(SENTENCE_SPLIT, ' ', rewrite, select)
     
-    def _break_ai_detection_patterns(self, text: str) -> str:
+    def _break_ai_detection_patterns(self, buffer: TextBuffer, sampler: DecisionSampler):
         """Break patterns that AI detectors commonly look for"""
         # Remove or replace formal transitions
-        for pattern in self.ai_detection_markers['formal_structures']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                casual_replacement = random.choice(self.human_templates['casual_transitions'])
-                text = text.replace(match, casual_replacement, 1)
-        
-        return text
+        for pattern in self.formal_structure_patterns:
+            buffer.sub(pattern, lambda match: sampler.choice(self.human_templates['casual_transitions']))
     
-    def _apply_statistical_patterns(self, text: str) -> str:
+    def _apply_statistical_patterns(self, buffer: TextBuffer, sampler: DecisionSampler):
         """Apply statistical patterns to match human writing"""
         # This is a simplified version - in a full implementation,
         # we'd analyze and adjust sentence lengths, paragraph sizes, etc.
         
-        # Add some variation to sentence endings
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        # Add some variation to sentence endings: 5% of sentences are considered,
+        # 30% of those end in '!' and 20% of the rest in '?'
+        endings = {}
         
-        for i, sentence in enumerate(sentences):
-            if random.random() < 0.05:  # 5% chance to add variation
-                if sentence.endswith('.'):
-                    if random.random() < 0.3:
-                        sentences[i] = sentence[:-1] + '!'
-                    elif random.random() < 0.2:
-                        sentences[i] = sentence[:-1] + '?'
+        def select(count):
+            endings.update(sampler.pick(count, 0.05, ['!', '?', None], weights=[0.3, 0.14, 0.56]))
+            return [i for i, ending in endings.items() if ending]
         
-        return ' '.join(sentences)
-    
-    def _final_polish(self, text: str) -> str:
-        """Apply final polish and cleanup"""
-        # Fix multiple spaces
-        text = re.sub(r'\s+', ' ', text)
+        def rewrite(i, sentence):
+            if sentence.endswith('.'):
+                return sentence[:-1] + endings[i]
+            return None
         
-        # Fix punctuation spacing
-        text = re.sub(r'\s+([,.!?])', r'\1', text)
-        
-        # Ensure proper sentence spacing
-        text = re.sub(r'([.!?])\s*([A-Z])', r'\1 \2', text)
-        
-        return text.strip()
+        buffer.rewrite_segments(SENTENCE_SPLIT, ' ', rewrite, select)
     
-    def _humanize_with_groq(self, text: str) -> str:
-        """Use Groq API for additional humanization"""
-        if not HAS_REQUESTS or not self.groq_api_key:
-            return text
-        
-        try:
-            headers = {
-                'Authorization': f'Bearer {self.groq_api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            prompt = f"""Please rewrite this text to sound more human and natural. Make it conversational, add personal touches, use contractions, and remove any formal or AI-like language:
+    def _final_polish(self, buffer: TextBuffer, rules: List[PolishRule] = HUMANIZER_POLISH_RULES):
+        """Apply final polish and cleanup, one rule after another"""
+        for pattern, replacement in rules:
+            buffer.sub(pattern, replacement)
+    
+    def rewrite_request(self, text: str) -> Dict[str, Any]:
+        """LLM gateway chat arguments for the Groq rewrite of a text"""
+        prompt = f"""Please rewrite this text to sound more human and natural. Make it conversational, add personal touches, use contractions, and remove any formal or AI-like language:
 
 {text}
 
 Make it sound like a real person wrote it naturally."""
+        
+        return {
+            'purpose': "humanize",
+            'words': len(text.split()),
+            'messages': [
+                {'role': 'system', 'content': 'You are a skilled editor who makes text sound more human and natural.'},
+                {'role': 'user', 'content': prompt}
+            ],
+            'temperature': 0.9,
+            'max_tokens': len(text.split()) * 2
+        }
+    
+    def _humanize_with_groq(self, text: str) -> str:
+        """Use Groq API for additional humanization (raises LLMError if the call fails)"""
+        return self.gateway.chat_sync(**self.rewrite_request(text))['content'].strip()
+    
+    def humanize_paragraphs(self, paragraphs: List[str], intensity: str, use_groq: bool,
+                            seeds: List[int], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Humanize paragraphs independently, each with its own seed.
+        
+        Args:
+            paragraphs: Paragraphs to humanize
+            intensity: Humanization intensity
+            use_groq: Whether to use Groq API
+            seeds: One seed per paragraph
+            deadline: time.time() to finish all paragraphs by
             
-            data = {
-                'model': 'llama-3.3-70b-versatile',
-                'messages': [
-                    {'role': 'system', 'content': 'You are a skilled editor who makes text sound more human and natural.'},
-                    {'role': 'user', 'content': prompt}
-                ],
-                'temperature': 0.9,
-                'max_tokens': len(text.split()) * 2
-            }
-            
-            response = requests.post(self.groq_api_url, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content'].strip()
-            else:
-                print(f"⚠️ Groq API error: {response.status_code}")
-                return text
-                
-        except Exception as e:
-            print(f"⚠️ Groq humanization failed: {e}")
-            return text
+        Returns:
+            One result per paragraph with the humanized text, changes made and skipped passes
+        """
+        results = []
+        for paragraph, seed in zip(paragraphs, seeds):
+            result = self.humanize_text(paragraph, intensity, use_groq, seed=seed, deadline=deadline)
+            results.append({
+                'humanized': result['humanized'],
+                'changes_made': result['changes_made'],
+                'success': result['success'],
+                'error': result.get('error'),
+                'skipped_stages': result.get('skipped_stages', [])
+            })
+        return results
     
     def batch_humanize(self, texts: List[str], intensity: str = "heavy", use_groq: bool = False) -> List[Dict[str, Any]]:
         """
@@ -844,38 +896,39 @@ Make it sound like a real person wrote it naturally."""
         
         return results
     
-    def analyze_changes(self, original: str, humanized: str) -> Dict[str, Any]:
+    def analyze_changes(self, original: str, humanized: str, include_spans: bool = False) -> Dict[str, Any]:
         """
         Analyze changes made during humanization.
         
         Args:
             original: Original text
             humanized: Humanized text
+            include_spans: Whether to include the changed word spans
             
         Returns:
-            Analysis of changes made
+            Analysis of changes made, with word-level diff statistics
         """
+        diff = diff_texts(original, humanized)
+        
         analysis = {
-            'word_count_change': len(humanized.split()) - len(original.split()),
+            'word_count_change': diff['stats']['words_revised'] - diff['stats']['words_original'],
             'contractions_added': humanized.count("'") - original.count("'"),
             'character_count_change': len(humanized) - len(original),
-            'sentences_modified': 0,
-            'ai_phrases_replaced': 0
+            'sentences_modified': count_touched_sentences(original, diff['spans']),
+            'ai_phrases_replaced': 0,
+            'diff': diff['stats']
         }
         
         # Count AI phrases replaced
+        original_lower = original.lower()
+        humanized_lower = humanized.lower()
         for ai_phrase in self.ai_phrases:
-            if ai_phrase.lower() in original.lower() and ai_phrase.lower() not in humanized.lower():
+            phrase = ai_phrase.lower()
+            if phrase in original_lower and phrase not in humanized_lower:
                 analysis['ai_phrases_replaced'] += 1
         
-        # Count sentences modified (simplified check)
-        original_sentences = re.split(r'[.!?]', original)
-        humanized_sentences = re.split(r'[.!?]', humanized)
-        
-        if len(original_sentences) == len(humanized_sentences):
-            for orig, human in zip(original_sentences, humanized_sentences):
-                if orig.strip() != human.strip():
-                    analysis['sentences_modified'] += 1
+        if include_spans:
+            analysis['spans'] = diff['spans']
         
         return analysis
 
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Job Queue - Persistent background jobs for long-running generations
+
+Jobs are stored in a local SQLite database so they survive restarts. A bounded
+pool of asyncio workers claims queued jobs and runs the registered handler for
+their kind, recording progress as it goes. Clients poll a job or subscribe to
+its progress events instead of holding an HTTP connection open. A job that
+runs longer than config.JOB_TIMEOUT_SECONDS is cancelled and marked failed;
+the timeout is also the deadline its transform tasks and LLM calls see.
+
+Several server processes can share the database. A claimed job records its
+owner (host, pid and a per-process token) and a lease that the owner renews
+every few seconds. A job is only claimed again once its lease has lapsed or,
+on startup, once its owner is a process on this host that no longer exists,
+so a job is never run by two live processes at once. Claims run in a
+BEGIN IMMEDIATE transaction, and database errors (such as a lock another
+process holds too long) are logged and retried with backoff instead of
+stopping a worker.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import sys
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+from .deadline import DeadlineExceeded, deadline_scope
+
+# A handler receives the job payload and a progress callback(stage, percent)
+ProgressCallback = Callable[[str, int], None]
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]]
+
+TERMINAL_STATUSES = ["completed", "failed"]
+
+# Longest wait between attempts while the database keeps failing (e.g. locked)
+MAX_RETRY_SECONDS = 30.0
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class JobQueue:
+    """SQLite-backed job queue with a bounded asyncio worker pool"""
+
+    def __init__(self, db_path: Optional[str] = None, workers: Optional[int] = None):
+        """
+        Open (or create) the job database
+
+        Args:
+            db_path: Path of the SQLite file (defaults to config.JOB_DB_PATH)
+            workers: Number of jobs run at the same time (defaults to config.JOB_WORKERS)
+        """
+        self.db_path = db_path or config.JOB_DB_PATH
+        self.workers = workers or config.JOB_WORKERS
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    stage TEXT,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner TEXT,
+                    lease_until REAL
+                )
+            """)
+            # Databases created before leases were added
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in [("owner", "TEXT"), ("lease_until", "REAL")]:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the coroutine function that runs jobs of the given kind"""
+        self._handlers[kind] = handler
+
+    async def start(self):
+        """Requeue jobs whose process on this host has died and start the workers"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+        with self._lock:
+            now = time.time()
+            running = self._conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+            orphaned = [(now, row["id"], row["owner"]) for row in running if self._owner_gone(row["owner"])]
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', owner = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE id = ? AND owner IS ? AND status = 'running'",
+                orphaned
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                (now - config.JOB_RETENTION_HOURS * 3600,)
+            )
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        print(f"📋 Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers and hand this process's running jobs back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', owner = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE owner = ? AND status = 'running'",
+                (time.time(), self.owner)
+            )
+
+    def _owner_gone(self, owner: Optional[str]) -> bool:
+        """Whether a job's owner is known to have exited: a missing process on this host, or an earlier one with our pid"""
+        if not owner:
+            return True
+        host, _, rest = owner.partition(":")
+        pid = rest.partition(":")[0]
+        if host != self.host or not pid.isdigit():
+            # Another machine; only its lease tells
+            return False
+        if int(pid) == os.getpid():
+            return owner != self.owner
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    async def _heartbeat(self):
+        """Renew the leases of this process's running jobs until cancelled"""
+        while True:
+            await asyncio.sleep(config.JOB_LEASE_SECONDS / 3)
+            now = time.time()
+            try:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                        (now + config.JOB_LEASE_SECONDS, self.owner)
+                    )
+            except sqlite3.Error as e:
+                # Try again at the next beat, well before the leases lapse
+                print(f"⚠️ Job queue could not renew leases: {e}")
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a new job and wake a worker
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serializable job parameters
+
+        Returns:
+            The stored job
+
+        Raises:
+            JobQueueFull: If config.JOB_MAX_QUEUED jobs are already waiting
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            queued = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= config.JOB_MAX_QUEUED:
+                raise JobQueueFull(f"Too many jobs waiting ({queued}), please retry later")
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, stage, progress, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, 'queued', 0, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now)
+            )
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status, progress and (once finished) result"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "progress": row["progress"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    async def events(self, job_id: str, keepalive: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield a job snapshot every time it changes, until it finishes
+
+        Yields None when nothing changed for `keepalive` seconds so that
+        streaming callers can send a keep-alive.
+        """
+        last_seen = None
+        while True:
+            changed = self._changed.setdefault(job_id, asyncio.Event())
+            job = self.get(job_id)
+            if job is None:
+                return
+
+            if job["updated_at"] != last_seen:
+                last_seen = job["updated_at"]
+                yield job
+            if job["status"] in TERMINAL_STATUSES:
+                return
+
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield None
+
+    def _update(self, job_id: str, **fields):
+        """Write fields of a job this process owns and wake any subscribers"""
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND owner = ?", (*fields.values(), job_id, self.owner)
+            )
+
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._notify, job_id)
+
+    def _notify(self, job_id: str):
+        """Wake subscribers of a job (event loop thread only)"""
+        changed = self._changed.pop(job_id, None)
+        if changed is not None:
+            changed.set()
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        """Atomically mark the oldest queued job, or running job with a lapsed lease, as running here"""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so no other process
+            # can claim the selected job between the SELECT and the UPDATE
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND COALESCE(lease_until, 0) < ?) ORDER BY created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', stage = 'started', owner = ?, lease_until = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (self.owner, now + config.JOB_LEASE_SECONDS, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    async def _worker(self):
+        """Claim and run jobs until cancelled"""
+        retry = 1.0
+        while True:
+            try:
+                row = self._claim_next()
+            except sqlite3.Error as e:
+                # The database is failing (e.g. locked by another process for too long)
+                print(f"⚠️ Job queue could not claim a job, retrying in {retry:g}s: {e}")
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, MAX_RETRY_SECONDS)
+                continue
+            retry = 1.0
+
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(row)
+
+    async def _run(self, row: sqlite3.Row):
+        """Run a claimed job and record its outcome"""
+        job_id = row["id"]
+        self._notify(job_id)
+        handler = self._handlers.get(row["kind"])
+
+        def progress(stage: str, percent: int):
+            try:
+                self._update(job_id, stage=stage, progress=max(0, min(100, int(percent))))
+            except sqlite3.Error as e:
+                # Progress is advisory; the outcome is written with retries
+                print(f"⚠️ Job {job_id} progress not saved: {e}")
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind '{row['kind']}'")
+            with deadline_scope(time.time() + config.JOB_TIMEOUT_SECONDS):
+                try:
+                    result = await asyncio.wait_for(
+                        handler(json.loads(row["payload"]), progress), config.JOB_TIMEOUT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(f"Job exceeded {config.JOB_TIMEOUT_SECONDS:g} seconds")
+        except asyncio.CancelledError:
+            # Shutting down; stop() hands the job back to the queue
+            raise
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            await self._finish(job_id, status="failed", stage="failed", error=str(error))
+            print(f"❌ Job {job_id} failed: {error}")
+            return
+
+        await self._finish(job_id, status="completed", stage="completed", progress=100, result=json.dumps(result))
+        print(f"✅ Job {job_id} completed")
+
+    async def _finish(self, job_id: str, **fields):
+        """Record a job's outcome, retrying while the database is failing"""
+        retry = 1.0
+        while True:
+            try:
+                self._update(job_id, **fields)
+                return
+            except sqlite3.Error as e:
+                print(f"⚠️ Job {job_id} outcome not saved, retrying in {retry:g}s: {e}")
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, MAX_RETRY_SECONDS)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Count jobs by status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {"workers": self.workers, **{status: count for status, count in rows}}
+
+# Create global instance
+job_queue = JobQueue()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+JSON Response - Fast JSON encoding for large API responses
+
+Responses are encoded by pydantic-core's Rust serializer instead of the
+standard library encoder. Endpoints that return a FastJSONResponse directly
+also skip FastAPI's jsonable_encoder pass, which walks every string and list
+in the result before encoding it and dominates the cost for large documents.
+"""
+
+from typing import Any, Mapping, Optional
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse
+
+
+def dump_json(content: Any, exclude_unset: bool = False) -> bytes:
+    """Encode a model or plain JSON-compatible value to UTF-8 JSON bytes"""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json(exclude_unset=exclude_unset).encode("utf-8")
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with pydantic-core; accepts models as content"""
+
+    # The parameters are spelled out because FastAPI reads the default
+    # status_code from this signature when it builds the OpenAPI schema
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None,
+                 media_type: Optional[str] = None, background: Optional[BackgroundTask] = None,
+                 exclude_unset: bool = False):
+        # Models built from a field projection leave out the fields that were never set
+        self.exclude_unset = exclude_unset
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content, exclude_unset=self.exclude_unset)
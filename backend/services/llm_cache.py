@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+LLM Cache - Disk-backed, content-addressed cache of chat completions
+
+Completions are stored in a local SQLite file under a key derived from the
+model, the normalized messages and every sampling parameter, so only an
+identical request gets a stored answer. Modes (config.LLM_CACHE_MODE):
+
+- off: every call goes upstream (the default)
+- read_write: stored answers are reused, misses go upstream and are stored
+- record: every call goes upstream and its answer replaces the stored one
+- replay: only stored answers are used; a miss fails without touching the
+  network, so benchmarks and regression tests run offline against real
+  completions recorded earlier
+
+The file is trimmed to config.LLM_CACHE_MAX_MB by evicting the least recently
+used answers. Each process opens its own connection; SQLite serializes writers.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+CACHE_MODES = ["off", "read_write", "record", "replay"]
+
+# Parameters that change how a response is delivered, not what it says
+_IGNORED_PARAMS = {"stream"}
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Messages with line endings and trailing whitespace normalized"""
+    normalized = []
+    for message in messages:
+        content = message.get("content") or ""
+        lines = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        normalized.append({
+            **message,
+            "content": "\n".join(line.rstrip() for line in lines).strip()
+        })
+    return normalized
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """Content address of a chat completion request"""
+    request = {
+        "model": model,
+        "messages": normalize_messages(messages),
+        "params": {name: value for name, value in params.items() if name not in _IGNORED_PARAMS}
+    }
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite store of chat completion results keyed by request content"""
+
+    def __init__(self, mode: Optional[str] = None, path: Optional[str] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        Args:
+            mode: "off", "read_write", "record" or "replay" (defaults to config.LLM_CACHE_MODE)
+            path: Path of the SQLite file (defaults to config.LLM_CACHE_PATH)
+            max_bytes: Size the stored answers are trimmed to (defaults to config.LLM_CACHE_MAX_MB)
+        """
+        self.mode = mode or config.LLM_CACHE_MODE
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(CACHE_MODES)}")
+        self.path = path or config.LLM_CACHE_PATH
+        self.max_bytes = max_bytes if max_bytes is not None else int(config.LLM_CACHE_MAX_MB * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._size = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def reads(self) -> bool:
+        """Whether stored answers are served"""
+        return self.mode in ["read_write", "replay"]
+
+    @property
+    def writes(self) -> bool:
+        """Whether upstream answers are stored"""
+        return self.mode in ["read_write", "record"]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily, once per process (call with the lock held)"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used_at)")
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored result for a key, or None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, result: Dict[str, Any]):
+        """Store a result, replacing any earlier one, and evict old answers past the size limit"""
+        encoded = json.dumps(result, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, encoded, size, now, now)
+            )
+            self._size += size - (previous[0] if previous else 0)
+            self.stores += 1
+            if self._size > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete the least recently used answers until the store is back under 90% of its limit"""
+        target = self.max_bytes * 0.9
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY used_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Mode, hit counts and size of the cache in this process"""
+        metrics = {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions
+        }
+        if self.mode != "off":
+            with self._lock:
+                conn = self._connection()
+                metrics["entries"] = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            metrics["bytes"] = self._size
+            metrics["max_bytes"] = self.max_bytes
+        return metrics
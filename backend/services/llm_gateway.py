@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+LLM Gateway - Shared, pooled client for every Groq chat completion
+
+All LLM calls go through one httpx.AsyncClient per process with keep-alive
+connections over HTTP/2 (the httpx[http2] extra in requirements.txt; without
+h2 it falls back to HTTP/1.1, reported as "http2" in the metrics), so a rewrite
+reuses an open TLS connection instead of paying a new handshake. The client lives on a
+background event loop thread owned by the gateway: coroutines on the server's
+event loop await it through `chat`, and code running in worker threads or
+worker processes blocks on it through `chat_sync`, so both share the same
+connection pool.
+
+Model selection (through the model router), timeouts, retries and metrics are
+handled here and nowhere else. Calls made for a request with a deadline get
+attempt timeouts, retries and a routing budget that fit in the time left, and
+fail with DeadlineExceeded rather than outlive it. With the completion cache
+on (config.LLM_CACHE_MODE), identical requests are answered from disk before
+any of that happens. Alternative completions of one request come from a single
+call with several choices where the API supports it, else from concurrent
+calls. Metrics are per process; worker processes keep their own gateway.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+from .model_router import ModelRouter, Route
+from .deadline import DeadlineExceeded, current_deadline
+from .llm_cache import LLMCache, cache_key
+
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Responses worth another attempt: timeouts, rate limits and server errors
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when a chat completion fails after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PurposeMetrics:
+    """Request counters for one purpose (the kind of call, e.g. "humanize")"""
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_latency_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens
+        }
+
+
+class LLMGateway:
+    """Pooled chat-completion client shared by all Groq callers of a process"""
+
+    def __init__(self, api_key: Optional[str] = None, api_url: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, cache: Optional[LLMCache] = None):
+        """
+        Args:
+            api_key: Groq API key (defaults to config.GROQ_API_KEY)
+            api_url: Chat completions endpoint (defaults to config.GROQ_API_URL)
+            transport: httpx transport to send requests through instead of the
+                network, e.g. a simulated API in benchmarks
+            cache: Completion cache (defaults to one in config.LLM_CACHE_MODE)
+        """
+        self.api_key = api_key if api_key is not None else config.GROQ_API_KEY
+        self.api_url = api_url or config.GROQ_API_URL
+        self.transport = transport
+        self.cache = cache or LLMCache()
+        self.metrics: Dict[str, PurposeMetrics] = {}
+        self.router = ModelRouter()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether calls can be answered: an API key is configured, or recorded answers are replayed"""
+        return bool(self.api_key) or self.cache.mode == "replay"
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the gateway's event loop thread and client lazily, once per process"""
+        with self._lock:
+            # A forked worker inherits the object but not the loop thread
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True)
+                thread.start()
+                self._client = httpx.AsyncClient(
+                    http2=HAS_HTTP2,
+                    transport=self.transport,
+                    timeout=httpx.Timeout(config.LLM_TIMEOUT_SECONDS, connect=config.LLM_CONNECT_TIMEOUT_SECONDS),
+                    limits=httpx.Limits(
+                        max_connections=config.LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=config.LLM_MAX_CONNECTIONS,
+                        keepalive_expiry=config.LLM_KEEPALIVE_SECONDS
+                    ),
+                    headers={"Authorization": f"Bearer {self.api_key}"}
+                )
+                self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            return self._loop
+
+    async def chat(self, messages: List[Dict[str, str]], purpose: str = "default",
+                   model: Optional[str] = None, timeout: Optional[float] = None,
+                   words: Optional[int] = None, style: Optional[str] = None,
+                   budget: Optional[float] = None, **params) -> Dict[str, Any]:
+        """
+        Run a chat completion from a coroutine
+
+        Args:
+            messages: Chat messages ({"role": ..., "content": ...})
+            purpose: Kind of call, used for model selection and metrics
+            model: Model to use instead of routing the call
+            timeout: Seconds allowed for each attempt (defaults to config.LLM_TIMEOUT_SECONDS)
+            words: Words the call is expected to produce, for routing
+            style: Writing style of a generation, for routing
+            budget: Seconds the call may take, for routing (the time left
+                before the request's deadline if that is shorter)
+            **params: Other completion parameters (temperature, max_tokens, ...)
+
+        Returns:
+            dict: content, model, usage and finish_reason of the first choice (and
+                every choice under "choices" when there are several), the route
+                (tier and reason) the model was chosen by and whether the answer
+                came from the cache
+
+        Raises:
+            LLMError: If no API key is configured, every attempt failed or a
+                replayed request was never recorded
+            DeadlineExceeded: If the request's deadline passed first
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._complete(messages, purpose, model, timeout, (words, style, budget), params, current_deadline()),
+            self._get_loop()
+        )
+        return await asyncio.wrap_future(future)
+
+    def chat_sync(self, messages: List[Dict[str, str]], purpose: str = "default",
+                  model: Optional[str] = None, timeout: Optional[float] = None,
+                  words: Optional[int] = None, style: Optional[str] = None,
+                  budget: Optional[float] = None, **params) -> Dict[str, Any]:
+        """Blocking version of chat for worker threads and processes (never call it from an event loop)"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._complete(messages, purpose, model, timeout, (words, style, budget), params, current_deadline()),
+            self._get_loop()
+        )
+        return future.result()
+
+    async def chat_variants(self, n: int, messages: List[Dict[str, str]], purpose: str = "default",
+                            model: Optional[str] = None, timeout: Optional[float] = None,
+                            words: Optional[int] = None, style: Optional[str] = None,
+                            budget: Optional[float] = None, **params) -> List[Dict[str, Any]]:
+        """
+        Run n alternative chat completions of the same request from a coroutine
+
+        With config.LLM_SUPPORTS_N the API is asked for n choices in one call;
+        otherwise, and for any choices it did not return, the rest are separate
+        concurrent calls. Each variant has its own cache entry.
+
+        Args:
+            n: Number of alternatives
+            (the other arguments are those of chat)
+
+        Returns:
+            list: n results as returned by chat; variants from one call share its usage
+        """
+        loop = self._get_loop()
+        hints, deadline = (words, style, budget), current_deadline()
+
+        def submit(call_params: Dict[str, Any], variant: int = 0):
+            return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+                self._complete(messages, purpose, model, timeout, hints, call_params, deadline, variant), loop
+            ))
+
+        results: List[Dict[str, Any]] = []
+        if n > 1 and config.LLM_SUPPORTS_N:
+            response = await submit({**params, "n": n})
+            shared = {name: value for name, value in response.items() if name != "choices"}
+            results = [{**shared, **choice} for choice in response.get("choices", [response])[:n]]
+        results += await asyncio.gather(*(submit(params, variant) for variant in range(len(results), n)))
+        return results
+
+    async def _complete(self, messages: List[Dict[str, str]], purpose: str, model: Optional[str],
+                        timeout: Optional[float], hints: tuple, params: Dict[str, Any],
+                        deadline: Optional[float] = None, variant: int = 0) -> Dict[str, Any]:
+        """Send the request on the gateway loop, retrying transient failures until the deadline"""
+        if not self.available:
+            raise LLMError("GROQ_API_KEY is required")
+
+        if model:
+            route = Route(model, None, "explicit")
+        else:
+            words, style, budget = hints
+            if deadline is not None:
+                left = deadline - time.time()
+                budget = left if budget is None else min(budget, left)
+            route = self.router.route(purpose, words, style, params.get("max_tokens"), budget)
+        model = route.model
+        metrics = self.metrics.setdefault(purpose, PurposeMetrics())
+
+        # Alternatives of the same request are stored apart from the first one
+        key = None
+        if self.cache.mode != "off":
+            key = cache_key(model, messages, {**params, "variant": variant} if variant else params)
+        if self.cache.reads:
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.cache_hits += 1
+                return {**cached, "route": route._asdict(), "cached": True}
+            if self.cache.mode == "replay":
+                raise LLMError(f"No recorded {purpose} response for this request (LLM_CACHE_MODE=replay)")
+
+        model_stats = self.router.stats(model)
+        payload = {"model": model, "messages": messages, **params}
+        request_timeout = timeout if timeout is not None else config.LLM_TIMEOUT_SECONDS
+        started = time.perf_counter()
+        metrics.requests += 1
+        model_stats.requests += 1
+        model_stats.in_flight += 1
+
+        try:
+            for attempt in range(config.LLM_MAX_RETRIES + 1):
+                last_attempt = attempt == config.LLM_MAX_RETRIES
+                retry_after = None
+                attempt_started = time.perf_counter()
+                attempt_timeout = request_timeout
+                if deadline is not None:
+                    left = deadline - time.time()
+                    if left <= 0:
+                        raise DeadlineExceeded()
+                    attempt_timeout = min(request_timeout, left)
+                try:
+                    response = await self._client.post(self.api_url, json=payload, timeout=attempt_timeout)
+                except httpx.TransportError as e:
+                    if deadline is not None and time.time() >= deadline:
+                        raise DeadlineExceeded()
+                    if last_attempt:
+                        raise LLMError(f"Groq request failed: {e.__class__.__name__}: {e}")
+                else:
+                    if response.status_code == 200:
+                        result = self._result(response.json(), model, metrics)
+                        model_stats.observe(
+                            time.perf_counter() - attempt_started, result["usage"].get("completion_tokens", 0)
+                        )
+                        if self.cache.writes:
+                            self.cache.put(key, model, result)
+                        return {**result, "route": route._asdict(), "cached": False}
+                    if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                        raise LLMError(
+                            f"Groq API error {response.status_code}: {response.text[:200]}",
+                            status_code=response.status_code
+                        )
+                    retry_after = response.headers.get("retry-after")
+
+                backoff = self._backoff(attempt, retry_after)
+                if deadline is not None and time.time() + backoff >= deadline:
+                    raise DeadlineExceeded()
+                metrics.retries += 1
+                await asyncio.sleep(backoff)
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            model_stats.in_flight -= 1
+            latency = time.perf_counter() - started
+            metrics.total_latency += latency
+            metrics.max_latency = max(metrics.max_latency, latency)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Seconds to wait before the next attempt: the server's Retry-After, else exponential with jitter"""
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), config.LLM_MAX_BACKOFF_SECONDS)
+        except ValueError:
+            pass
+        delay = config.LLM_BACKOFF_SECONDS * (2 ** attempt)
+        return min(delay * random.uniform(0.5, 1.5), config.LLM_MAX_BACKOFF_SECONDS)
+
+    def _result(self, body: Dict[str, Any], model: str, metrics: PurposeMetrics) -> Dict[str, Any]:
+        try:
+            choices = [
+                {"content": choice["message"]["content"] or "", "finish_reason": choice.get("finish_reason")}
+                for choice in body["choices"]
+            ]
+            choice = choices[0]
+        except (KeyError, IndexError, TypeError):
+            raise LLMError("Groq API returned no choices")
+
+        usage = body.get("usage") or {}
+        metrics.prompt_tokens += usage.get("prompt_tokens", 0)
+        metrics.completion_tokens += usage.get("completion_tokens", 0)
+        result = {
+            "content": choice["content"],
+            "model": body.get("model", model),
+            "usage": usage,
+            "finish_reason": choice["finish_reason"]
+        }
+        if len(choices) > 1:
+            result["choices"] = choices
+        return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get the connection settings and per-purpose request metrics of this process"""
+        return {
+            "http2": HAS_HTTP2,
+            "max_connections": config.LLM_MAX_CONNECTIONS,
+            "purposes": {purpose: metrics.to_dict() for purpose, metrics in self.metrics.items()},
+            "routing": self.router.get_metrics(),
+            "cache": self.cache.get_metrics()
+        }
+
+    def close(self):
+        """Close the pooled connections and stop the loop thread"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            loop, client = self._loop, self._client
+            self._loop = self._client = self._thread = None
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+# Create global instance
+llm_gateway = LLMGateway()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Model Router - Picks the model for each LLM call
+
+Models are grouped into tiers (config.LLM_MODEL_TIERS): a fast, cheap model
+and a slower, higher-quality one. Each call is routed by what it is for: the
+mechanical rewrite and short posts go to the fast tier, long posts and styles
+that need the stronger model go to the quality tier. The choice is then
+checked against what the gateway has observed: a model with too many calls in
+flight, or too slow per generated token, sends the call to the other tier when
+that one is not in the same state, and a call with a latency budget moves to
+the fast tier when the chosen model is not expected to finish in time.
+
+A purpose pinned to a model in config.LLM_MODELS is never routed. All state
+lives on the gateway's event loop thread, so no locking is needed.
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+
+class Route(NamedTuple):
+    """The model chosen for a call and why"""
+    model: str
+    tier: Optional[str]
+    reason: str
+
+
+class ModelStats:
+    """What the gateway has observed of one model"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = 0
+        # Moving average of the seconds per completion token, None before the first response
+        self.seconds_per_token: Optional[float] = None
+
+    def observe(self, seconds: float, completion_tokens: int):
+        if completion_tokens <= 0:
+            return
+        sample = seconds / completion_tokens
+        if self.seconds_per_token is None:
+            self.seconds_per_token = sample
+        else:
+            weight = config.LLM_ROUTER_SMOOTHING
+            self.seconds_per_token = weight * sample + (1 - weight) * self.seconds_per_token
+
+    def overloaded(self) -> bool:
+        """Whether new calls should go elsewhere"""
+        return (
+            self.in_flight >= config.LLM_ROUTER_MAX_IN_FLIGHT
+            or (self.seconds_per_token or 0.0) * 1000 > config.LLM_ROUTER_SLOW_MS_PER_TOKEN
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "ms_per_token": round(self.seconds_per_token * 1000, 2) if self.seconds_per_token is not None else None
+        }
+
+
+class ModelRouter:
+    """Routes calls between the configured model tiers"""
+
+    def __init__(self):
+        self.models: Dict[str, ModelStats] = {}
+        # purpose -> "tier:reason" (or "pinned") -> calls
+        self.decisions: Dict[str, Dict[str, int]] = {}
+
+    def stats(self, model: str) -> ModelStats:
+        return self.models.setdefault(model, ModelStats())
+
+    def _tier_for(self, purpose: str, words: Optional[int], style: Optional[str]) -> Route:
+        """The tier a call gets before load and budget are considered"""
+        if purpose == "humanize":
+            tier, reason = "fast", "rewrite"
+        elif style in config.LLM_ROUTER_QUALITY_STYLES:
+            tier, reason = "quality", "style"
+        elif words is not None and words <= config.LLM_ROUTER_SHORT_WORDS:
+            tier, reason = "fast", "short"
+        else:
+            tier, reason = "quality", "long"
+        return Route(config.LLM_MODEL_TIERS[tier], tier, reason)
+
+    def route(self, purpose: str, words: Optional[int] = None, style: Optional[str] = None,
+              max_tokens: Optional[int] = None, budget: Optional[float] = None) -> Route:
+        """
+        Choose the model for a call
+
+        Args:
+            purpose: Kind of call ("generate_blog", "humanize", ...)
+            words: Words the call is expected to produce
+            style: Writing style of a generation
+            max_tokens: Completion token limit, used to estimate the call's duration
+            budget: Seconds the call may take, or None
+
+        Returns:
+            Route: the model, its tier (None when pinned) and the reason
+        """
+        pinned = config.LLM_MODELS.get(purpose)
+        if pinned:
+            route = Route(pinned, None, "pinned")
+        else:
+            route = self._tier_for(purpose, words, style)
+            other = "quality" if route.tier == "fast" else "fast"
+            other_model = config.LLM_MODEL_TIERS[other]
+            if self.stats(route.model).overloaded() and not self.stats(other_model).overloaded():
+                route = Route(other_model, other, "overloaded")
+            elif (
+                budget is not None and route.tier == "quality" and max_tokens
+                and (self.stats(route.model).seconds_per_token or 0.0) * max_tokens > budget
+            ):
+                route = Route(other_model, other, "budget")
+
+        counts = self.decisions.setdefault(purpose, {})
+        key = f"{route.tier}:{route.reason}" if route.tier else route.reason
+        counts[key] = counts.get(key, 0) + 1
+        return route
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Routing decisions per purpose and the observed state of each model"""
+        return {
+            "tiers": dict(config.LLM_MODEL_TIERS),
+            "decisions": {purpose: dict(counts) for purpose, counts in self.decisions.items()},
+            "models": {model: stats.to_dict() for model, stats in self.models.items()}
+        }
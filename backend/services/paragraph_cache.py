@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Paragraph Cache - Memoized humanization of unchanged paragraphs
+
+Documents are humanized paragraph by paragraph, each with a seed derived from
+the request seed and the paragraph's own content, so a paragraph always gets
+the same output no matter where it sits in the document. Outputs are cached
+under a hash of the paragraph, the seed and the settings; when an edited
+document is resubmitted with the same seed only the changed paragraphs are
+processed again.
+"""
+
+import hashlib
+import re
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text on blank lines into non-empty, stripped paragraphs"""
+    return [paragraph.strip() for paragraph in PARAGRAPH_SPLIT.split(text) if paragraph.strip()]
+
+
+def group_paragraphs(paragraphs: List[str], parts: int, min_chars: int = 0) -> List[List[str]]:
+    """
+    Split paragraphs into contiguous groups of roughly equal length
+
+    Args:
+        paragraphs: Paragraphs in document order
+        parts: Maximum number of groups
+        min_chars: Smallest worthwhile group; fewer groups are made for short texts
+
+    Returns:
+        Non-empty groups that concatenate back to the paragraphs in order
+    """
+    total = sum(len(paragraph) for paragraph in paragraphs)
+    if min_chars > 0:
+        parts = min(parts, total // min_chars)
+    parts = max(1, min(parts, len(paragraphs)))
+
+    groups: List[List[str]] = [[]]
+    size = 0
+    for paragraph in paragraphs:
+        # Start a new group once this one has reached its share of the text
+        if groups[-1] and len(groups) < parts and size >= total * len(groups) / parts:
+            groups.append([])
+        groups[-1].append(paragraph)
+        size += len(paragraph)
+    return groups
+
+
+def paragraph_digest(paragraph: str, seed: int, settings: Tuple) -> bytes:
+    """Cache key of a paragraph processed with the given seed and settings"""
+    digest = hashlib.sha256(repr((seed, settings)).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(paragraph.encode("utf-8"))
+    return digest.digest()
+
+
+def paragraph_seed(digest: bytes) -> int:
+    """Seed for a paragraph, derived from its cache key"""
+    return int.from_bytes(digest[:4], "big")
+
+
+class ParagraphCache:
+    """LRU cache of processed paragraphs (used from the event loop only)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Get a cached paragraph result and mark it recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: bytes, entry: Dict[str, Any]):
+        """Store a paragraph result, evicting the least recently used ones"""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache size and hit statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# Create global instance
+paragraph_cache = ParagraphCache(config.PARAGRAPH_CACHE_SIZE)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Pipeline - Declarative stage sequences compiled into execution plans
+
+Which passes run, and in what order, is declared per intensity and per blog
+style in config.PIPELINES as lists of stage names. An entry "@name" includes
+another pipeline, and "@post_process" includes the post-processing pipeline
+chosen by the request. A spec is compiled into a Plan once:
+
+- stages the request turned off (the LLM rewrite) are dropped
+- an idempotent stage repeated right after itself is removed (a stage in
+  between could add text the repeat would still change)
+
+Polish stages are never removed: each one cleans up the text the stages after
+it see, so a compiled plan gives the same output as running its spec stage by
+stage.
+
+The humanizer and the balanced processor run the stages that belong to them;
+run_pipeline runs a plan that spans both, such as a blog post. Every response
+reports the plan it used.
+
+Each stage has a cost per word, measured by benchmarks/bench_stage_costs.py
+and stored in config.STAGE_COSTS_FILE. A request with a deadline gets its
+plan scheduled: optional stages are skipped, most expensive first, until the
+estimated run time fits in the time left.
+"""
+
+import json
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+from .change_log import ChangeLog
+from .sampling import DecisionSampler
+from .text_buffer import TextBuffer
+
+# (pattern, replacement template) applied one after another by a polish stage
+PolishRule = Tuple[str, str]
+
+HUMANIZER_POLISH_RULES: List[PolishRule] = [
+    (r'\s+', ' '),                      # Fix multiple spaces
+    (r'\s+([,.!?])', r'\1'),            # Fix punctuation spacing
+    (r'([.!?])\s*([A-Z])', r'\1 \2'),   # Ensure proper sentence spacing
+    (r'^ | $', '')                      # Strip the ends (at most one space is left on each side)
+]
+
+BALANCED_POLISH_RULES: List[PolishRule] = [
+    (r'\s+', ' '),                      # Clean up multiple spaces
+    (r'\s+([.!?])', r'\1'),             # Fix punctuation
+    (r'\.([A-Z])', r'. \1')             # Ensure proper spacing after periods
+]
+
+
+class Stage:
+    """One pass of a pipeline and what the compiler may assume about it"""
+
+    def __init__(self, name: str, processor: str, idempotent: bool = False,
+                 rewrites: bool = False, rules: Optional[List[PolishRule]] = None, optional: bool = False):
+        """
+        Args:
+            name: Stage name used in pipeline specs
+            processor: "humanizer", "balanced" or "text" (run by run_pipeline itself)
+            idempotent: Running the stage twice gives the same text as running it once
+            rewrites: The stage produces arbitrary text (an LLM call), so plans
+                run it as a part of its own
+            rules: Cleanup rules of a polish stage
+            optional: The scheduler may skip the stage to meet a deadline
+        """
+        self.name = name
+        self.processor = processor
+        self.idempotent = idempotent
+        self.rewrites = rewrites
+        self.rules = rules
+        self.optional = optional
+
+    @property
+    def is_polish(self) -> bool:
+        return self.rules is not None
+
+
+STAGES = {stage.name: stage for stage in [
+    # Humanizer passes
+    Stage("ai_phrases", "humanizer", optional=True),
+    Stage("contractions", "humanizer", idempotent=True, optional=True),
+    Stage("vocabulary", "humanizer", optional=True),
+    Stage("personal_touches", "humanizer", optional=True),
+    Stage("imperfections", "humanizer", optional=True),
+    Stage("sentence_structure", "humanizer", optional=True),
+    Stage("break_ai_patterns", "humanizer", optional=True),
+    Stage("statistical_patterns", "humanizer", optional=True),
+    Stage("polish", "humanizer", idempotent=True, rules=HUMANIZER_POLISH_RULES),
+    Stage("llm_rewrite", "humanizer", rewrites=True),
+    # Cut the text to the requested number of words
+    Stage("trim", "text", idempotent=True),
+    # Balanced processor passes
+    Stage("balanced_phrases", "balanced", optional=True),
+    Stage("natural_elements", "balanced", optional=True),
+    Stage("synonyms", "balanced", optional=True),
+    Stage("unique_variations", "balanced", optional=True),
+    Stage("optimize_plagiarism", "balanced", optional=True),
+    Stage("ai_contractions", "balanced", idempotent=True, optional=True),
+    Stage("optimize_balanced", "balanced", optional=True),
+    Stage("balanced_polish", "balanced", idempotent=True, rules=BALANCED_POLISH_RULES)
+]}
+
+
+def load_stage_costs(path: Optional[str] = None) -> Dict[str, float]:
+    """Measured microseconds per word of each stage, or {} if they have not been measured"""
+    try:
+        with open(path or config.STAGE_COSTS_FILE, encoding="utf-8") as costs_file:
+            return {name: float(cost) for name, cost in json.load(costs_file).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+STAGE_COSTS = load_stage_costs()
+
+
+def estimate_seconds(stages: Sequence[Stage], words: int) -> float:
+    """Estimated run time of local stages on a text of the given length (the LLM call is not estimated)"""
+    return sum(STAGE_COSTS.get(stage.name, 0.0) for stage in stages) * words * config.STAGE_COST_SCALE / 1e6
+
+
+def schedule(stages: List[Stage], words: int, deadline: Optional[float]) -> Tuple[List[Stage], List[str]]:
+    """
+    Skip optional stages so the rest is expected to finish by the deadline
+
+    The most expensive optional stages are skipped first, which keeps as many
+    stages as possible. Required stages always run, even past the deadline.
+
+    Args:
+        stages: Stages of a compiled plan, in order
+        words: Word count of the text
+        deadline: time.time() by which the stages should be done, or None
+
+    Returns:
+        (stages to run, names of the skipped stages), both in plan order
+    """
+    if deadline is None:
+        return stages, []
+
+    budget = deadline - time.time()
+    estimate = estimate_seconds(stages, words)
+    skipped = set()
+    for stage in sorted((stage for stage in stages if stage.optional),
+                        key=lambda stage: STAGE_COSTS.get(stage.name, 0.0), reverse=True):
+        if estimate <= budget:
+            break
+        estimate -= estimate_seconds([stage], words)
+        skipped.add(stage.name)
+
+    return (
+        [stage for stage in stages if stage.name not in skipped],
+        [stage.name for stage in stages if stage.name in skipped]
+    )
+
+
+# Pipeline used when a spec for the requested intensity or style does not exist
+DEFAULT_PIPELINES = {
+    "humanize": "humanize:light",
+    "post_process": "post_process:balanced",
+    "blog": "blog:default"
+}
+
+
+def pipeline_name(kind: str, variant: Optional[str]) -> str:
+    """Name of the spec for an intensity or style, falling back to the kind's default"""
+    name = f"{kind}:{variant}"
+    return name if name in config.PIPELINES else DEFAULT_PIPELINES[kind]
+
+
+class Plan:
+    """A compiled pipeline: the stages to run and the ones the compiler removed"""
+
+    def __init__(self, name: str, stages: List[Stage], removed: List[Dict[str, str]]):
+        self.name = name
+        self.stages = stages
+        self.removed = removed
+
+    def segments(self) -> Iterator[Tuple[str, List[Stage]]]:
+        """Consecutive runs of stages that belong to the same processor"""
+        segment: List[Stage] = []
+        for stage in self.stages:
+            if segment and segment[-1].processor != stage.processor:
+                yield segment[0].processor, segment
+                segment = []
+            segment.append(stage)
+        if segment:
+            yield segment[0].processor, segment
+
+    def parts(self) -> List["Plan"]:
+        """
+        The plan cut around stages that rewrite the text
+
+        A rewriting stage (the LLM call) becomes a part of its own, so callers
+        can await it instead of holding a CPU worker while it waits.
+        """
+        parts: List[Plan] = []
+        stages: List[Stage] = []
+        for stage in self.stages:
+            if stage.rewrites:
+                if stages:
+                    parts.append(Plan(self.name, stages, []))
+                parts.append(Plan(self.name, [stage], []))
+                stages = []
+            else:
+                stages.append(stage)
+        if stages:
+            parts.append(Plan(self.name, stages, []))
+        return parts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "stages": [stage.name for stage in self.stages],
+            "removed": self.removed
+        }
+
+
+def _expand(name: str, post_process: Optional[str], including: Tuple[str, ...] = ()) -> Iterator[str]:
+    """Stage names of a spec with its includes resolved"""
+    if name in including:
+        raise ValueError(f"Pipeline '{name}' includes itself")
+    for entry in config.PIPELINES[name]:
+        if not entry.startswith("@"):
+            yield entry
+        elif entry == "@post_process":
+            if post_process is not None:
+                yield from _expand(pipeline_name("post_process", post_process), None, including + (name,))
+        else:
+            yield from _expand(entry[1:], post_process, including + (name,))
+
+
+@lru_cache(maxsize=None)
+def compile_pipeline(name: str, post_process: Optional[str] = None, llm_rewrite: bool = False) -> Plan:
+    """
+    Compile a pipeline spec into an execution plan
+
+    Args:
+        name: Spec name in config.PIPELINES
+        post_process: Intensity of the pipeline "@post_process" includes, or
+            None to leave post-processing out
+        llm_rewrite: Whether the LLM rewrite stage runs
+
+    Returns:
+        The Plan (shared between callers, do not modify it)
+
+    Raises:
+        ValueError: If the spec names an unknown stage or puts humanizer
+            stages after balanced ones (whose change spans they would shift)
+    """
+    stages: List[Stage] = []
+    removed: List[Dict[str, str]] = []
+
+    for entry in _expand(name, post_process):
+        stage = STAGES.get(entry)
+        if stage is None:
+            raise ValueError(f"Pipeline '{name}' has an unknown stage '{entry}'")
+        if stage.name == "llm_rewrite" and not llm_rewrite:
+            removed.append({"stage": stage.name, "reason": "not requested"})
+            continue
+        if stage.processor != "balanced" and any(kept.processor == "balanced" for kept in stages):
+            raise ValueError(f"Pipeline '{name}' runs '{stage.name}' after the balanced processor stages")
+
+        # Running an idempotent stage again straight after itself changes nothing
+        if stage.idempotent and not stage.is_polish and stages and stages[-1].name == stage.name:
+            removed.append({"stage": stage.name, "reason": "duplicate"})
+            continue
+
+        stages.append(stage)
+
+    return Plan(name, stages, removed)
+
+
+def run_pipeline(plan: Plan, text: str, seed: int, verbosity: str = "counts",
+                 max_words: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run a plan whose stages may belong to both processors
+
+    Args:
+        plan: Compiled plan
+        text: Input text
+        seed: Seed for the random choices of both processors
+        verbosity: How the balanced processor's changes are reported
+        max_words: Word limit of the trim stage
+
+    Returns:
+        dict: processed_content, the balanced processor's change report, the
+            humanizer's pass messages (humanizer_changes), the word count after
+            the trim stage (None without one) and the plan
+    """
+    from .humanizer_service import humanizer
+    from .balanced_processor import CHANGE_RULES, balanced_processor
+
+    changes = ChangeLog(CHANGE_RULES, verbosity)
+    humanizer_changes: List[str] = []
+    word_count = None
+
+    for processor, stages in plan.segments():
+        if processor == "humanizer":
+            buffer = TextBuffer(text)
+            humanizer.run_stages(buffer, stages, DecisionSampler(seed), humanizer_changes)
+            text = buffer.text
+        elif processor == "balanced":
+            text = balanced_processor.run_stages(text, stages, changes, DecisionSampler(seed))
+        else:
+            # The only text stage is trim
+            words = text.split()
+            word_count = len(words)
+            if max_words and word_count > max_words:
+                text = " ".join(words[:max_words])
+                word_count = max_words
+
+    return {
+        "success": True,
+        "processed_content": text,
+        **changes.export(),
+        "humanizer_changes": humanizer_changes,
+        "word_count": word_count,
+        "pipeline": plan.to_dict(),
+        "seed": seed
+    }
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Profiler - Per-request sampling profiles
+
+A SamplingProfiler runs a background thread that snapshots the stack of the
+thread it was started from at a fixed interval. It is started inside whatever
+worker thread or process runs a piece of the request, and the stacks it
+collects are merged into the request's Profile. The profile is reported as
+collapsed stacks ("frame;frame;frame count" lines, the input format of
+flamegraph.pl and speedscope) plus the top functions by cumulative time.
+
+Only transform-lane tasks are sampled. Time a request spends on the event
+loop or waiting on the LLM gateway is not broken down, since those threads
+serve every request at once; it shows as the gap between wall_ms and
+profiled_ms in the report.
+
+Nothing here runs unless a request asks to be profiled.
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+# Stack of frame labels, outermost first -> number of samples
+Stacks = Dict[Tuple[str, ...], int]
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that enters it
+
+    Frames above the one that entered the profiler are left out, so stacks
+    start at the profiled code rather than at the worker's main loop. The
+    sampler needs the GIL, so time spent inside one long C call (such as a
+    single regex scan) is attributed to the next sample taken after it.
+    """
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.stacks: Stacks = {}
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._target = threading.get_ident()
+        self._root = sys._getframe(1)
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None and frame is not self._root:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                key = tuple(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+
+def profile_call(interval: float, function: Callable, *args, **kwargs) -> Tuple[Any, Stacks, float]:
+    """Run a function under a sampling profiler and return (result, stacks, seconds)"""
+    with SamplingProfiler(interval) as profiler:
+        result = function(*args, **kwargs)
+    return result, profiler.stacks, profiler.duration
+
+
+class Profile:
+    """The merged samples of one profiled request"""
+
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Args:
+            interval: Seconds between samples (defaults to config.PROFILE_INTERVAL_MS)
+        """
+        self.interval = interval if interval is not None else config.PROFILE_INTERVAL_MS / 1000
+        self.stacks: Stacks = {}
+        # Seconds attributed to each stack
+        self.seconds: Dict[Tuple[str, ...], float] = {}
+        self.profiled_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, stacks: Stacks, duration: float, label: Optional[str] = None):
+        """
+        Merge samples taken by a SamplingProfiler
+
+        Args:
+            stacks: The profiler's stacks
+            duration: Seconds the profiler ran
+            label: Root frame the stacks are grouped under, e.g. the task name
+        """
+        prefix = (label,) if label else ()
+        # Samples are late while the profiled thread holds the GIL, so they are
+        # weighted by the time the profiler ran rather than by the interval
+        per_sample = duration / max(1, sum(stacks.values()))
+        for stack, count in stacks.items():
+            key = prefix + stack
+            self.stacks[key] = self.stacks.get(key, 0) + count
+            self.seconds[key] = self.seconds.get(key, 0.0) + count * per_sample
+        self.profiled_seconds += duration
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one "frame;frame;frame count" line per distinct stack"""
+        return "".join(
+            f"{';'.join(stack)} {count}\n"
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1])
+        )
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """Functions with the most cumulative time, with their self time"""
+        cumulative: Dict[str, float] = {}
+        own: Dict[str, float] = {}
+        samples: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            seconds = self.seconds[stack]
+            # A recursive function only counts once per sample
+            for label in set(stack):
+                cumulative[label] = cumulative.get(label, 0.0) + seconds
+                samples[label] = samples.get(label, 0) + count
+            own[stack[-1]] = own.get(stack[-1], 0.0) + seconds
+
+        return [
+            {
+                "function": label,
+                "cumulative_ms": round(seconds * 1000, 1),
+                "self_ms": round(own.get(label, 0.0) * 1000, 1),
+                "samples": samples[label]
+            }
+            for label, seconds in sorted(cumulative.items(), key=lambda item: -item[1])[:limit]
+        ]
+
+    def report(self, store: "ProfileStore", limit: Optional[int] = None) -> Dict[str, Any]:
+        """Store the collapsed stacks and return the summary included in the response"""
+        profile_id = store.put(self.collapsed())
+        return {
+            "profile_id": profile_id,
+            "collapsed_stacks_url": f"/profiles/{profile_id}",
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": sum(self.stacks.values()),
+            "wall_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "profiled_ms": round(self.profiled_seconds * 1000, 1),
+            "top_functions": self.top(limit or config.PROFILE_TOP_FUNCTIONS)
+        }
+
+
+class ProfileStore:
+    """The most recent collapsed-stack profiles, kept in memory"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, str]" = OrderedDict()
+
+    def put(self, collapsed: str) -> str:
+        """Store a profile and return its ID"""
+        profile_id = uuid.uuid4().hex
+        self._profiles[profile_id] = collapsed
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[str]:
+        """Get a stored profile's collapsed stacks"""
+        return self._profiles.get(profile_id)
+
+# Create global instance
+profile_store = ProfileStore(config.PROFILE_STORE_SIZE)
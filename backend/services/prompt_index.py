@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Prompt Index - Near-duplicate detection for blog prompts
+
+Every generated draft is remembered with a 64-bit SimHash of its prompt. The
+hash is built from the prompt's content words (lower-cased, stop words
+dropped, plural "s" stripped) regardless of their order, so "benefits of
+remote work" and "remote work benefits" hash the same and small rewordings
+land a few bits apart. Similarity is the fraction of equal bits.
+
+A request that opts in with a similarity threshold is served the draft of the
+closest earlier prompt with the same style, length and generation mode, if
+it is at least that similar. The draft still goes through the request's own
+pipeline with a fresh seed, so the post differs from the earlier one while the
+generation call is saved. The index holds the most recent
+config.PROMPT_INDEX_SIZE drafts in memory and is scanned linearly, which takes
+well under a millisecond at that size.
+"""
+
+import hashlib
+import re
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+HASH_BITS = 64
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "what", "when", "why", "with", "your", "you",
+    "about", "do", "does", "can", "should", "we", "our"
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def prompt_terms(prompt: str) -> Dict[str, int]:
+    """Content words of a prompt and how often each occurs"""
+    terms: Dict[str, int] = {}
+    for word in WORD_PATTERN.findall(prompt.lower()):
+        word = word.strip("'")
+        if not word or word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms[word] = terms.get(word, 0) + 1
+    return terms
+
+
+def simhash(prompt: str) -> int:
+    """64-bit SimHash of a prompt's content words"""
+    weights = [0] * HASH_BITS
+    for term, count in prompt_terms(prompt).items():
+        bits = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(HASH_BITS):
+            weights[bit] += count if bits >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def similarity(first: int, second: int) -> float:
+    """Fraction of equal bits between two hashes"""
+    return 1 - (first ^ second).bit_count() / HASH_BITS
+
+
+class PromptIndex:
+    """The most recent drafts, looked up by prompt similarity"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: Drafts kept (defaults to config.PROMPT_INDEX_SIZE)
+        """
+        self.max_entries = max_entries if max_entries is not None else config.PROMPT_INDEX_SIZE
+        # (settings, prompt) -> (hash, draft)
+        self._entries: "OrderedDict[Tuple[tuple, str], Tuple[int, Dict[str, Any]]]" = OrderedDict()
+
+        # Metrics
+        self.lookups = 0
+        self.hits = 0
+
+    def add(self, prompt: str, settings: tuple, draft: Dict[str, Any]):
+        """
+        Remember the draft generated for a prompt
+
+        Args:
+            prompt: The request's prompt
+            settings: Everything else the draft depends on (style, length, mode)
+            draft: The unprocessed draft result
+        """
+        if self.max_entries <= 0:
+            return
+        key = (settings, prompt.strip())
+        self._entries.pop(key, None)
+        self._entries[key] = (simhash(prompt), draft)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def find(self, prompt: str, settings: tuple, threshold: float) -> Optional[Dict[str, Any]]:
+        """
+        The draft of the most similar earlier prompt with the same settings
+
+        Args:
+            prompt: The request's prompt
+            settings: Settings the earlier draft must have been generated with
+            threshold: Lowest similarity accepted, from 0 to 1
+
+        Returns:
+            {"prompt", "similarity", "draft"} of the best match, or None
+        """
+        self.lookups += 1
+        target = simhash(prompt)
+        best: Optional[Tuple[float, str, Dict[str, Any]]] = None
+        for (entry_settings, entry_prompt), (entry_hash, draft) in self._entries.items():
+            if entry_settings != settings:
+                continue
+            score = similarity(target, entry_hash)
+            if score >= threshold and (best is None or score > best[0]):
+                best = (score, entry_prompt, draft)
+        if best is None:
+            return None
+
+        self.hits += 1
+        score, matched, draft = best
+        self._entries.move_to_end((settings, matched))
+        return {"prompt": matched, "similarity": round(score, 3), "draft": draft}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Size and hit rate of the index"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0
+        }
+
+# Create global instance
+prompt_index = PromptIndex()
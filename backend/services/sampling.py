@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Sampling - Bulk random decisions for per-sentence transforms
+
+Probabilistic passes used to roll random.random() and random.choice() once
+per sentence inside Python branches. A DecisionSampler draws a pass's
+decisions for every sentence at once instead: a mask of the sentences the
+pass touches and the option picked for each of them, as NumPy arrays. The
+pass then only visits the selected sentences.
+
+Decisions come from a single NumPy generator seeded with the request seed, so
+a seed reproduces a result on every install of the pinned NumPy version.
+"""
+
+from typing import Dict, List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+class DecisionSampler:
+    """Per-request source of random decisions, drawn in bulk"""
+
+    # Single draws are served from blocks of this many pre-drawn numbers
+    BLOCK_SIZE = 1024
+
+    def __init__(self, seed: int):
+        """
+        Args:
+            seed: Request seed; the same seed gives the same decisions
+        """
+        self._generator = np.random.default_rng(seed)
+        self._block: List[float] = []
+        self._next = 0
+
+    def uniform(self, count: int) -> List[float]:
+        """Draw count numbers in [0, 1)"""
+        return self._generator.random(count).tolist()
+
+    def random(self) -> float:
+        """Draw a single number in [0, 1) from the current block"""
+        if self._next >= len(self._block):
+            self._block = self.uniform(self.BLOCK_SIZE)
+            self._next = 0
+        value = self._block[self._next]
+        self._next += 1
+        return value
+
+    def choice(self, options: Sequence[T]) -> T:
+        """Pick a single option uniformly"""
+        return options[min(int(self.random() * len(options)), len(options) - 1)]
+
+    def select(self, count: int, probability: float) -> List[int]:
+        """Indexes, in ascending order, of the items out of count that are picked with the given probability"""
+        if count <= 0:
+            return []
+        return np.flatnonzero(self._generator.random(count) < probability).tolist()
+
+    def pick(self, count: int, probability: float, options: Sequence[T],
+             weights: Optional[Sequence[float]] = None) -> Dict[int, T]:
+        """
+        Select items with the given probability and pick an option for each
+
+        Args:
+            count: Number of items (sentences)
+            probability: Chance that an item is selected
+            options: Options to pick from
+            weights: Relative option weights (uniform if omitted)
+
+        Returns:
+            Selected item index -> picked option, in ascending index order
+        """
+        selected = self.select(count, probability)
+        if not selected:
+            return {}
+
+        if weights is None:
+            indexes = self._generator.integers(0, len(options), size=len(selected))
+        else:
+            p = np.asarray(weights, dtype=float)
+            indexes = self._generator.choice(len(options), size=len(selected), p=p / p.sum())
+        return {index: options[option] for index, option in zip(selected, indexes.tolist())}
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Shared Text - Zero-copy hand-off of large documents to worker processes
+
+Large texts are written once into a shared memory segment as UTF-8 and only a
+small handle crosses the process boundary. Workers decode straight from the
+shared buffer and write their output into a segment the parent preallocated,
+so multi-megabyte documents are never pickled in either direction.
+"""
+
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional, Tuple
+
+
+class SharedText(NamedTuple):
+    """Picklable handle to UTF-8 text stored in a shared memory segment"""
+    name: str
+    length: int
+    capacity: int
+
+
+def share_text(text: str) -> Tuple[shared_memory.SharedMemory, SharedText]:
+    """
+    Copy text into a new shared memory segment
+
+    Args:
+        text: The text to share
+
+    Returns:
+        The owning segment (close and unlink it when done) and its handle
+    """
+    data = text.encode("utf-8")
+    segment = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    segment.buf[:len(data)] = data
+    return segment, SharedText(segment.name, len(data), segment.size)
+
+
+def allocate_text(capacity: int) -> Tuple[shared_memory.SharedMemory, SharedText]:
+    """
+    Preallocate an empty segment for a worker to write its output into
+
+    Args:
+        capacity: Size of the segment in bytes
+
+    Returns:
+        The owning segment (close and unlink it when done) and its handle
+    """
+    segment = shared_memory.SharedMemory(create=True, size=max(1, capacity))
+    return segment, SharedText(segment.name, 0, segment.size)
+
+
+def read_segment(segment: shared_memory.SharedMemory, length: int) -> str:
+    """Decode the first length bytes of a segment without an intermediate bytes copy"""
+    with segment.buf[:length] as view:
+        return str(view, "utf-8")
+
+
+def _attach(handle: SharedText) -> shared_memory.SharedMemory:
+    """Attach to a segment owned by another process"""
+    try:
+        return shared_memory.SharedMemory(name=handle.name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the attach, but pool workers share the
+        # parent's resource tracker so this only repeats the parent's entry;
+        # the parent unregisters it when it unlinks the segment
+        return shared_memory.SharedMemory(name=handle.name)
+
+
+def read_text(handle: SharedText) -> str:
+    """Read text from a segment owned by another process"""
+    segment = _attach(handle)
+    try:
+        return read_segment(segment, handle.length)
+    finally:
+        segment.close()
+
+
+def write_text(handle: SharedText, text: str) -> Optional[int]:
+    """
+    Write text into a preallocated segment owned by another process
+
+    Args:
+        handle: Handle of the output segment
+        text: The text to write
+
+    Returns:
+        Number of bytes written, or None if the text does not fit
+    """
+    data = text.encode("utf-8")
+    if len(data) > handle.capacity:
+        return None
+
+    segment = _attach(handle)
+    try:
+        segment.buf[:len(data)] = data
+    finally:
+        segment.close()
+    return len(data)
+
+
+def release(segment: shared_memory.SharedMemory):
+    """Close and remove a segment owned by this process"""
+    try:
+        segment.close()
+        segment.unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Static Assets - Prebuilt, precompressed UI pages
+
+Each page is read once at startup, compressed once with every available
+encoding and served with an ETag and Cache-Control header, so repeat loads
+are either served from the browser cache or answered with a bodyless 304.
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+from typing import Dict
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+from .compression import available_encodings, compress, negotiate_encoding
+
+
+class StaticAsset:
+    """A static body with precomputed encodings and validator"""
+
+    def __init__(self, body: bytes, media_type: str):
+        """
+        Compress the body with every available encoding
+
+        Args:
+            body: The uncompressed body
+            media_type: Content-Type of the asset
+        """
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {"identity": body}
+        for encoding in available_encodings():
+            self.variants[encoding] = compress(body, encoding)
+
+        # Weak validator: every encoding of the same body matches it
+        self.etag = f'W/"{hashlib.sha256(body).hexdigest()[:20]}"'
+        self.cache_control = f"public, max-age={config.UI_CACHE_MAX_AGE}, must-revalidate"
+
+    def matches(self, if_none_match: str) -> bool:
+        """Check an If-None-Match header against this asset's ETag"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        opaque = self.etag[2:]
+        return "*" in tags or any(tag.removeprefix("W/") == opaque for tag in tags)
+
+    def response(self, request: Request) -> Response:
+        """Build the response for a request, honouring revalidation and Accept-Encoding"""
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+
+        if self.matches(request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=headers)
+
+        offered = [encoding for encoding in self.variants if encoding != "identity"]
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), offered)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        return Response(
+            content=self.variants[encoding or "identity"],
+            media_type=self.media_type,
+            headers=headers
+        )
+
+
+class StaticAssets:
+    """Registry of prebuilt pages loaded from the static directory"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def load(self, name: str, media_type: str = "text/html") -> StaticAsset:
+        """Read and precompress a file once"""
+        asset = StaticAsset((self.directory / name).read_bytes(), media_type)
+        self.assets[name] = asset
+        return asset
+
+    def response(self, name: str, request: Request) -> Response:
+        """Serve a loaded asset"""
+        return self.assets[name].response(request)
+
+# Create global instance with the built-in UI pages
+static_assets = StaticAssets(config.STATIC_DIR)
+static_assets.load("humanizer.html")
+static_assets.load("blog_generator.html")
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Text Buffer - Piece-table buffer for multi-pass text rewriting
+
+Edits are recorded as pieces pointing into the original text and an
+append-only buffer of inserted text instead of rebuilding the whole string on
+every replacement. The string is only materialized when a pass needs to scan
+it, once per pass, so the cost of a pass is linear in the text length no
+matter how many edits it makes.
+
+Replacement tables (phrase -> replacement) are compiled into a few alternation
+patterns so that a whole table is applied with one scan per round instead of
+one full-text substitution per entry, with the same result as substituting
+the entries one after another.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple, Union
+
+# (start, end, replacement) in the coordinates of the current text
+Edit = Tuple[int, int, str]
+
+# Piece: (chunk, start, end); chunk -1 is the base text, otherwise an index into the added chunks
+Piece = Tuple[int, int, int]
+
+BASE = -1
+
+
+class TextBuffer:
+    """Piece table over a base string and the text inserted into it"""
+
+    def __init__(self, text: str):
+        self._base = text
+        self._added: List[str] = []
+        self._pieces: List[Piece] = [(BASE, 0, len(text))] if text else []
+        self._length = len(text)
+        self._text: Optional[str] = text
+        self.edits_applied = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __str__(self) -> str:
+        return self.text
+
+    @property
+    def text(self) -> str:
+        """The current text, materialized at most once between edits"""
+        if self._text is None:
+            self._text = "".join(self._slice(piece) for piece in self._pieces)
+            # The joined string becomes the new base so pieces never pile up across passes
+            self._base = self._text
+            self._added = []
+            self._pieces = [(BASE, 0, len(self._text))] if self._text else []
+        return self._text
+
+    def _slice(self, piece: Piece) -> str:
+        chunk, start, end = piece
+        source = self._base if chunk == BASE else self._added[chunk]
+        if start == 0 and end == len(source):
+            return source
+        return source[start:end]
+
+    def apply(self, edits: Iterable[Edit]) -> int:
+        """
+        Apply edits in one sweep over the pieces
+
+        Args:
+            edits: Non-overlapping (start, end, replacement) edits sorted by
+                position, in the coordinates of the current text
+
+        Returns:
+            Number of edits applied
+        """
+        pieces = list(self._pieces)
+        new_pieces: List[Piece] = []
+        index = 0                # Next piece to look at
+        piece_offset = 0         # Text offset where pieces[index] starts
+        applied = 0
+        delta = 0
+
+        def copy_until(position: int):
+            """Copy pieces up to a text position, splitting the piece it falls in"""
+            nonlocal index, piece_offset
+            while index < len(pieces):
+                chunk, start, end = pieces[index]
+                size = end - start
+                if piece_offset + size <= position:
+                    new_pieces.append(pieces[index])
+                    piece_offset += size
+                    index += 1
+                    continue
+                if piece_offset < position:
+                    cut = start + position - piece_offset
+                    new_pieces.append((chunk, start, cut))
+                    pieces[index] = (chunk, cut, end)
+                    piece_offset = position
+                return
+
+        def skip_until(position: int):
+            """Drop pieces up to a text position, keeping the rest of the piece it falls in"""
+            nonlocal index, piece_offset
+            while index < len(pieces):
+                chunk, start, end = pieces[index]
+                size = end - start
+                if piece_offset + size <= position:
+                    piece_offset += size
+                    index += 1
+                    continue
+                if piece_offset < position:
+                    pieces[index] = (chunk, start + position - piece_offset, end)
+                    piece_offset = position
+                return
+
+        for start, end, replacement in edits:
+            if start < piece_offset or end < start or end > self._length:
+                raise ValueError(f"Edit ({start}, {end}) is out of order or out of range")
+            copy_until(start)
+            skip_until(end)
+            if replacement:
+                self._added.append(replacement)
+                new_pieces.append((len(self._added) - 1, 0, len(replacement)))
+            delta += len(replacement) - (end - start)
+            applied += 1
+
+        if not applied:
+            return 0
+
+        new_pieces.extend(pieces[index:])
+        self._pieces = new_pieces
+        self._length += delta
+        self._text = None
+        self.edits_applied += applied
+        return applied
+
+    def sub(self, pattern: Union[str, Pattern], repl: Union[str, Callable[[re.Match], Optional[str]]],
+            flags: int = 0) -> int:
+        """
+        Like re.sub, but recorded as edits on the buffer
+
+        Args:
+            pattern: Regular expression
+            repl: Replacement template, or a function of the match returning the
+                replacement (None leaves the match unchanged)
+            flags: Regex flags when pattern is a string
+
+        Returns:
+            Number of replacements made
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern, flags)
+
+        edits = []
+        for match in pattern.finditer(self.text):
+            replacement = repl(match) if callable(repl) else match.expand(repl)
+            if replacement is not None and replacement != match.group():
+                edits.append((match.start(), match.end(), replacement))
+        return self.apply(edits)
+
+    def rewrite_segments(self, separator: Union[str, Pattern], joiner: str,
+                         rewrite: Callable[[int, str], Optional[str]],
+                         select: Optional[Callable[[int], Iterable[int]]] = None) -> int:
+        """
+        Equivalent of joiner.join(rewritten segments of re.split(separator, text))
+
+        Args:
+            separator: Pattern the text is split on
+            joiner: String every separator is replaced with
+            rewrite: Function of (segment index, segment) returning the new
+                segment, or None to keep it
+            select: Function of the segment count returning the ascending
+                indexes of the segments to rewrite; all segments if omitted
+
+        Returns:
+            Number of edits made
+        """
+        if isinstance(separator, str):
+            separator = re.compile(separator)
+
+        text = self.text
+        spans = [match.span() for match in separator.finditer(text)]
+        edits = [(start, end, joiner) for start, end in spans if text[start:end] != joiner]
+        # Segment i runs from the end of separator i - 1 to the start of separator i
+        starts = [0] + [end for _, end in spans]
+        ends = [start for start, _ in spans] + [len(text)]
+
+        indexes = range(len(starts)) if select is None else select(len(starts))
+        segment_edits = []
+        for index in indexes:
+            start, end = starts[index], ends[index]
+            segment = text[start:end]
+            rewritten = rewrite(index, segment)
+            if rewritten is not None and rewritten != segment:
+                segment_edits.append((start, end, rewritten))
+
+        if segment_edits:
+            # Segments and separators never overlap; an empty segment sorts before
+            # the separator that starts where it is
+            edits = sorted(edits + segment_edits, key=lambda edit: (edit[0], edit[1]))
+        return self.apply(edits)
+
+
+def _is_boundary(text: str, position: int) -> bool:
+    """Whether a regex word boundary can fall at this position of the text"""
+    if position <= 0 or position >= len(text):
+        return True
+    before, after = text[position - 1], text[position]
+    return (before.isalnum() or before == "_") != (after.isalnum() or after == "_")
+
+
+class ReplacementTable:
+    """
+    A phrase -> replacement table compiled for single-scan application
+
+    Entries are grouped into rounds. An entry goes into a later round than any
+    earlier entry whose matches it could overlap, or whose replacements it
+    could match, so applying the rounds in order gives the same text as
+    substituting every entry in table order, with one scan per round.
+    """
+
+    def __init__(self, table: Dict[str, Sequence[str]], word_boundaries: bool = True,
+                 flags: int = re.IGNORECASE):
+        """
+        Args:
+            table: Phrase -> replacement, or phrase -> list of possible replacements
+            word_boundaries: Whether phrases only match as whole words
+            flags: Regex flags for matching
+        """
+        self.flags = flags
+        self.word_boundaries = word_boundaries
+        self.table = {
+            phrase: [replacements] if isinstance(replacements, str) else list(replacements)
+            for phrase, replacements in table.items()
+        }
+        self._keys = {self._key(phrase): phrase for phrase in self.table}
+        self._edge_cache: Dict[str, Tuple[str, set, set]] = {}
+        self.rounds = self._build_rounds()
+
+    def _key(self, text: str) -> str:
+        return text.lower() if self.flags & re.IGNORECASE else text
+
+    def _pattern(self, phrases: Iterable[str]) -> Pattern:
+        alternation = "|".join(re.escape(phrase) for phrase in phrases)
+        if self.word_boundaries:
+            alternation = r'\b(?:' + alternation + r')\b'
+        return re.compile(alternation, self.flags)
+
+    def _edges(self, text: str) -> Tuple[str, set, set]:
+        """Normalized text with its proper prefixes and suffixes a match could start or end at"""
+        edges = self._edge_cache.get(text)
+        if edges is None:
+            key = self._key(text)
+            cuts = [
+                i for i in range(1, len(key))
+                if not self.word_boundaries or _is_boundary(key, i)
+            ]
+            edges = (key, {key[:i] for i in cuts}, {key[i:] for i in cuts})
+            self._edge_cache[text] = edges
+        return edges
+
+    def _may_overlap(self, first: str, second: str) -> bool:
+        """Whether a match of `second` can overlap or contain text equal to `first`"""
+        first_key, first_prefixes, first_suffixes = self._edges(first)
+        second_key, second_prefixes, second_suffixes = self._edges(second)
+        if first_key in second_key or second_key in first_key:
+            return True
+        # A suffix of one equal to a prefix of the other, both at possible match edges
+        return not first_suffixes.isdisjoint(second_prefixes) or not second_suffixes.isdisjoint(first_prefixes)
+
+    def _can_interact(self, earlier: str, later: str) -> bool:
+        """Whether substituting `earlier` before `later` can give a different result than the reverse"""
+        return (
+            self._may_overlap(earlier, later)
+            or any(self._may_overlap(replacement, later) for replacement in self.table[earlier])
+            or any(self._may_overlap(replacement, earlier) for replacement in self.table[later])
+        )
+
+    def _build_rounds(self) -> List[Tuple[Pattern, List[str]]]:
+        """Group phrases into the fewest ordered rounds that preserve table order semantics"""
+        phrases = list(self.table)
+        round_of: Dict[str, int] = {}
+        for i, phrase in enumerate(phrases):
+            round_of[phrase] = 1 + max(
+                (round_of[earlier] for earlier in phrases[:i] if self._can_interact(earlier, phrase)),
+                default=-1
+            )
+
+        rounds = []
+        for number in range(max(round_of.values(), default=-1) + 1):
+            members = [phrase for phrase in phrases if round_of[phrase] == number]
+            # Longest first, so the longer of two phrases starting at the same spot wins
+            ordered = sorted(members, key=len, reverse=True)
+            rounds.append((self._pattern(ordered), members))
+        return rounds
+
+    def phrase_for(self, match: re.Match) -> str:
+        """The table phrase a match belongs to"""
+        return self._keys[self._key(match.group())]
+
+    def apply(self, buffer: TextBuffer, choose: Optional[Callable[[str, List[str]], Optional[str]]] = None) -> int:
+        """
+        Substitute every phrase in the buffer
+
+        Args:
+            buffer: The text buffer to edit
+            choose: Function of (phrase, replacements) returning the replacement
+                for one match, or None to leave it; defaults to the first replacement
+
+        Returns:
+            Number of replacements made
+        """
+        total = 0
+        for pattern, _ in self.rounds:
+            def replace(match: re.Match) -> Optional[str]:
+                phrase = self.phrase_for(match)
+                if choose is None:
+                    return self.table[phrase][0]
+                return choose(phrase, self.table[phrase])
+            total += buffer.sub(pattern, replace)
+        return total
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Upload Service - Streaming humanization of uploaded text files
+
+Uploaded .txt and .md files are parsed out of the multipart request body as
+it arrives, read in fixed-size chunks and decoded incrementally, cut into paragraphs as soon as a blank line is seen, and sent
+to the transform workers in groups. A bounded window of groups is in flight at
+a time and their outputs are streamed back in document order, so memory use
+depends on the chunk, group and window sizes, never on the size of the file.
+"""
+
+import asyncio
+import codecs
+import os
+import sys
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Deque, List, Optional, Tuple
+
+import anyio
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
+from starlette.responses import StreamingResponse
+
+# Import config - handle relative imports properly
+try:
+    from config import config
+except ImportError:
+    # If running from different directory, try parent directory
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import config
+
+from .paragraph_cache import PARAGRAPH_SPLIT, split_paragraphs
+
+# Accepted file extensions and the media type their output is streamed back as
+UPLOAD_MEDIA_TYPES = {
+    ".txt": "text/plain",
+    ".md": "text/markdown"
+}
+
+# (paragraph, separator written between it and the next paragraph)
+Piece = Tuple[str, str]
+
+
+class UploadError(Exception):
+    """Raised when an upload cannot be read as a text document"""
+
+
+def upload_media_type(filename: Optional[str]) -> Optional[str]:
+    """Output media type for an uploaded file name, or None if the type is not accepted"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return UPLOAD_MEDIA_TYPES.get(extension)
+
+
+class MultipartFile:
+    """
+    The file of a multipart/form-data request body, read while it is uploaded
+
+    Unlike a parsed form, nothing is spooled to disk: the body is only read as
+    far as read() asks, so the file can be processed before the upload ends.
+    The body must hold a single file part; settings go in the query string.
+    """
+
+    def __init__(self, content_type: str, body: AsyncIterator[bytes], field: str = "file"):
+        """
+        Args:
+            content_type: The request's Content-Type header
+            body: The request body chunks
+            field: Form field name of the file
+
+        Raises:
+            UploadError: If the body is not multipart/form-data
+        """
+        media_type, options = parse_options_header(content_type or "")
+        if media_type != b"multipart/form-data" or b"boundary" not in options:
+            raise UploadError("Upload must be multipart/form-data with a file field")
+
+        self.field = field
+        self.filename: Optional[str] = None
+        self._body = body.__aiter__()
+        self._buffer = bytearray()
+        self._in_file = False
+        self._file_done = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._parser = MultipartParser(options[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+
+    def _on_part_begin(self):
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name != self.field or b"filename" not in options or self.filename is not None:
+            raise UploadError(
+                f"Unexpected form field '{name}': send one '{self.field}' file and pass settings as query parameters"
+            )
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._buffer += data[start:end]
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
+
+    async def _feed(self) -> bool:
+        """Parse the next chunk of the body; False once the body has ended"""
+        async for chunk in self._body:
+            if chunk:
+                try:
+                    self._parser.write(chunk)
+                except MultipartParseError as e:
+                    raise UploadError(f"Malformed multipart body: {e}")
+                return True
+        return False
+
+    async def open(self) -> str:
+        """
+        Read up to the start of the file
+
+        Returns:
+            The uploaded file's name
+
+        Raises:
+            UploadError: If the body has no file part
+        """
+        while self.filename is None:
+            if not await self._feed():
+                raise UploadError(f"No '{self.field}' file in the upload")
+        return self.filename
+
+    async def read(self, size: int) -> bytes:
+        """Up to `size` bytes of the file, b"" once it has all been read"""
+        while len(self._buffer) < size and not self._file_done:
+            if not await self._feed():
+                raise UploadError("The upload ended before the file was complete")
+        if not self._buffer:
+            # Parse the rest of the body so that a field after the file is rejected, not ignored
+            while await self._feed():
+                pass
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+class UploadResponse(StreamingResponse):
+    """
+    A streaming response that is sent while the request body is still being read
+
+    StreamingResponse listens for the client disconnecting by reading the
+    request messages, which would take the rest of an upload away from the
+    body's reader. Here the reader sees a disconnect itself (request.stream()
+    raises), and DeadlineMiddleware watches for one once the body has arrived.
+    """
+
+    async def listen_for_disconnect(self, receive):
+        # Ends when the response has been sent
+        await anyio.sleep_forever()
+
+
+async def read_pieces(
+    read: Callable[[int], Awaitable[bytes]],
+    chunk_size: Optional[int] = None,
+    max_paragraph_chars: Optional[int] = None
+) -> AsyncIterator[Piece]:
+    """
+    Yield the paragraphs of a UTF-8 stream as they become complete
+
+    A paragraph longer than max_paragraph_chars is cut at its last whitespace
+    before the limit and the parts are rejoined with a space, so one huge
+    paragraph cannot make the reader hold the whole file.
+
+    Args:
+        read: Coroutine function returning up to n bytes, b"" at the end
+        chunk_size: Bytes read at a time (defaults to config.UPLOAD_CHUNK_SIZE)
+        max_paragraph_chars: Longest piece held in memory (defaults to
+            config.UPLOAD_MAX_PARAGRAPH_CHARS)
+
+    Yields:
+        (paragraph, separator) pieces in document order
+
+    Raises:
+        UploadError: If the stream is not valid UTF-8
+    """
+    chunk_size = chunk_size or config.UPLOAD_CHUNK_SIZE
+    max_paragraph_chars = max_paragraph_chars or config.UPLOAD_MAX_PARAGRAPH_CHARS
+    # utf-8-sig drops a leading byte order mark
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+
+    while True:
+        chunk = await read(chunk_size)
+        try:
+            tail += decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError as e:
+            raise UploadError(f"File is not valid UTF-8 text: {e.reason}")
+
+        if not chunk:
+            for paragraph in split_paragraphs(tail):
+                yield paragraph, "\n\n"
+            return
+
+        # Everything before the last blank line is made of complete paragraphs
+        boundary = None
+        for boundary in PARAGRAPH_SPLIT.finditer(tail):
+            pass
+        if boundary is not None:
+            for paragraph in split_paragraphs(tail[:boundary.start()]):
+                yield paragraph, "\n\n"
+            tail = tail[boundary.end():]
+
+        while len(tail) > max_paragraph_chars:
+            cut = max(tail.rfind(" ", 0, max_paragraph_chars), tail.rfind("\n", 0, max_paragraph_chars))
+            if cut <= 0:
+                cut = max_paragraph_chars
+            piece = tail[:cut].strip()
+            if piece:
+                yield piece, " "
+            tail = tail[cut:]
+
+
+async def stream_groups(
+    pieces: AsyncIterator[Piece],
+    process: Callable[[List[str]], Awaitable[List[str]]],
+    group_chars: Optional[int] = None,
+    window: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Process pieces in groups with a bounded window and yield the output in order
+
+    Args:
+        pieces: (paragraph, separator) pieces in document order
+        process: Coroutine function mapping a group of paragraphs to their outputs
+        group_chars: Characters collected into one group (defaults to config.UPLOAD_GROUP_CHARS)
+        window: Groups in flight at the same time (defaults to config.UPLOAD_WINDOW)
+
+    Yields:
+        UTF-8 encoded output, one block per group
+    """
+    group_chars = group_chars or config.UPLOAD_GROUP_CHARS
+    window = max(1, window or config.UPLOAD_WINDOW)
+    in_flight: Deque[Tuple[asyncio.Task, List[str]]] = deque()
+    separator = ""
+
+    def submit(paragraphs: List[str], separators: List[str]):
+        in_flight.append((asyncio.create_task(process(paragraphs)), separators))
+
+    async def collect() -> bytes:
+        """Wait for the oldest group and render it after the previous group's last separator"""
+        nonlocal separator
+        task, separators = in_flight.popleft()
+        parts = []
+        for output, next_separator in zip(await task, separators):
+            parts.append(separator)
+            parts.append(output)
+            separator = next_separator
+        return "".join(parts).encode("utf-8")
+
+    try:
+        paragraphs: List[str] = []
+        separators: List[str] = []
+        size = 0
+        async for paragraph, next_separator in pieces:
+            paragraphs.append(paragraph)
+            separators.append(next_separator)
+            size += len(paragraph)
+            if size >= group_chars:
+                if len(in_flight) >= window:
+                    yield await collect()
+                submit(paragraphs, separators)
+                paragraphs, separators, size = [], [], 0
+
+        if paragraphs:
+            if len(in_flight) >= window:
+                yield await collect()
+            submit(paragraphs, separators)
+
+        while in_flight:
+            yield await collect()
+    finally:
+        # The client went away or a group failed
+        for task, _ in in_flight:
+            task.cancel()
@@ -0,0 +1,67 @@
+"""
+Tests - Change spans
+
+Every reported span must cover exactly its recorded replacement text in the
+final output, even when later passes rewrote part of it.
+"""
+
+import pytest
+
+from benchmarks.bench_text_buffer import SAMPLE, make_document
+from services.balanced_processor import balanced_processor
+from services.change_log import ChangeLog
+from services.pipeline import compile_pipeline, run_pipeline
+
+RULES = {"swap": "'{original}' -> '{replacement}'", "insert": "Added '{replacement}'"}
+
+
+def assert_spans_match(output, report):
+    spans = report["change_spans"]
+    assert len(spans["offset"]) == len(spans["length"]) == len(spans["rule"]) == len(spans["replacement"])
+    for offset, length, replacement in zip(spans["offset"], spans["length"], spans["replacement"]):
+        assert output[offset:offset + length] == spans["replacements"][replacement]
+
+
+@pytest.mark.parametrize("target_balance", ["balanced", "plagiarism_focused", "ai_focused"])
+def test_process_content_spans_match_output(target_balance):
+    document = make_document(300)
+    for seed in range(10):
+        result = balanced_processor.process_content(document, target_balance, verbosity="spans", seed=seed)
+        assert result["change_spans"]["offset"]
+        assert_spans_match(result["processed_content"], result)
+
+
+def test_blog_pipeline_spans_match_output():
+    plan = compile_pipeline("blog:default", "balanced")
+    for seed in range(5):
+        result = run_pipeline(plan, make_document(300), seed, verbosity="spans", max_words=200)
+        assert_spans_match(result["processed_content"], result)
+
+
+def test_later_edit_splits_span():
+    changes = ChangeLog(RULES, "spans")
+    text = changes.apply("a b c", [(2, 3, "big change here", "swap")])
+    # Rewrite "change" inside the span and insert right before and after it
+    start = text.index("change")
+    text = changes.apply(text, [
+        (2, 2, "[", "insert"),
+        (start, start + len("change"), "edit", None),
+        (len("a big change here"), len("a big change here"), "]", "insert")
+    ])
+    assert text == "a [big edit here] c"
+
+    report = changes.export()
+    assert_spans_match(text, report)
+    spans = report["change_spans"]
+    texts = [spans["replacements"][replacement] for replacement in spans["replacement"]]
+    assert sorted(texts) == sorted(["big ", " here", "[", "]"])
+    assert report["change_counts"] == {"swap": 1, "insert": 2}
+
+
+def test_span_replaced_entirely_is_dropped():
+    changes = ChangeLog(RULES, "spans")
+    text = changes.apply(SAMPLE, [(0, 2, "That", "swap"), (3, 5, "", "swap")])
+    text = changes.apply(text, [(0, 6, "Now ", None)])
+    report = changes.export()
+    assert_spans_match(text, report)
+    assert report["change_spans"]["length"] == []
@@ -0,0 +1,117 @@
+"""
+Tests - Diff opcodes and spans
+
+The opcodes of a diff must cover both token sequences without gaps, and
+replaying them must give back both texts.
+"""
+
+import random
+
+import pytest
+
+from services.diff_engine import _intern, diff_texts, get_opcodes, matching_blocks, tokenize
+
+
+def opcodes_for(a_tokens, b_tokens, max_cost=1000):
+    a, b = _intern(a_tokens, b_tokens)
+    return get_opcodes(matching_blocks(a, b, max_cost), len(a), len(b))
+
+
+def assert_reconstructs(a_tokens, b_tokens, max_cost=1000):
+    opcodes = opcodes_for(a_tokens, b_tokens, max_cost)
+    rebuilt_a, rebuilt_b = [], []
+    i = j = 0
+    for tag, i0, i1, j0, j1 in opcodes:
+        # Contiguous on both sides
+        assert (i0, j0) == (i, j)
+        assert i0 <= i1 and j0 <= j1
+        if tag == "equal":
+            assert a_tokens[i0:i1] == b_tokens[j0:j1]
+        elif tag == "insert":
+            assert i0 == i1 and j0 < j1
+        elif tag == "delete":
+            assert i0 < i1 and j0 == j1
+        else:
+            assert tag == "replace" and i0 < i1 and j0 < j1
+        rebuilt_a += a_tokens[i0:i1]
+        rebuilt_b += b_tokens[j0:j1]
+        i, j = i1, j1
+    assert (i, j) == (len(a_tokens), len(b_tokens))
+    assert rebuilt_a == a_tokens
+    assert rebuilt_b == b_tokens
+
+
+def mutate(rng, tokens, vocabulary, edits):
+    """Apply random inserts, deletes and replacements to a token list"""
+    tokens = list(tokens)
+    for _ in range(edits):
+        position = rng.randrange(len(tokens) + 1)
+        operation = rng.choice(["insert", "delete", "replace"])
+        if operation == "insert" or position == len(tokens):
+            tokens.insert(position, rng.choice(vocabulary))
+        elif operation == "delete":
+            del tokens[position]
+        else:
+            tokens[position] = rng.choice(vocabulary)
+    return tokens
+
+
+@pytest.mark.parametrize("vocabulary_size", [3, 20, 500])
+def test_random_edits_reconstruct_both_sides(vocabulary_size):
+    rng = random.Random(vocabulary_size)
+    vocabulary = [f"w{n}" for n in range(vocabulary_size)]
+    for _ in range(100):
+        a_tokens = [rng.choice(vocabulary) for _ in range(rng.randrange(0, 120))]
+        b_tokens = mutate(rng, a_tokens, vocabulary, rng.randrange(0, 30))
+        assert_reconstructs(a_tokens, b_tokens)
+
+
+def test_unrelated_sequences_reconstruct_both_sides():
+    rng = random.Random(5)
+    for _ in range(50):
+        a_tokens = [rng.choice("abcdef") for _ in range(rng.randrange(0, 80))]
+        b_tokens = [rng.choice("abcdef") for _ in range(rng.randrange(0, 80))]
+        assert_reconstructs(a_tokens, b_tokens)
+        assert_reconstructs(a_tokens, b_tokens, max_cost=2)
+
+
+@pytest.mark.parametrize("a_text, b_text", [
+    ("", ""),
+    ("", "the the the"),
+    ("the the the", ""),
+    ("the the the the", "the the"),
+    ("the cat the cat the cat", "the the cat cat"),
+    ("a b a b a b", "b a b a b a"),
+    ("the very very very big dog", "the very big very dog"),
+])
+def test_repeated_words_reconstruct_both_sides(a_text, b_text):
+    assert_reconstructs(a_text.split(), b_text.split())
+    assert_reconstructs(b_text.split(), a_text.split())
+
+
+def test_spans_rebuild_revised_words():
+    rng = random.Random(9)
+    vocabulary = ["the", "cat", "sat", "on", "a", "mat.", "It", "was", "very", "warm."]
+    for _ in range(100):
+        a_tokens = [rng.choice(vocabulary) for _ in range(rng.randrange(0, 60))]
+        b_tokens = mutate(rng, a_tokens, vocabulary, rng.randrange(0, 15))
+        original = "  ".join(a_tokens)
+        revised = "\n".join(b_tokens)
+
+        result = diff_texts(original, revised)
+        rebuilt = []
+        position = 0
+        for tag, original_start, original_end, revised_start, revised_end in result["spans"]:
+            assert position <= original_start <= original_end
+            rebuilt += original[position:original_start].split()
+            assert original[original_start:original_end].split() == [] or tag != "insert"
+            assert revised[revised_start:revised_end].split() == [] or tag != "delete"
+            rebuilt += revised[revised_start:revised_end].split()
+            position = original_end
+        rebuilt += original[position:].split()
+        assert rebuilt == b_tokens
+
+        stats = result["stats"]
+        assert stats["words_original"] == len(tokenize(original)[0])
+        assert stats["words_unchanged"] + stats["words_deleted"] + stats["words_replaced"] == len(a_tokens)
+        assert stats["words_unchanged"] + stats["words_inserted"] + stats["words_replacing"] == len(b_tokens)
@@ -0,0 +1,79 @@
+"""
+Tests - Compiled pipelines
+
+A compiled plan must give the same output as running every stage of its
+spec in order, and must only drop the stages it reports as removed.
+"""
+
+import pytest
+
+from benchmarks.bench_text_buffer import make_document
+from config import config
+from services.pipeline import STAGES, Plan, _expand, compile_pipeline, run_pipeline
+
+INTENSITIES = [None, "balanced", "plagiarism_focused", "ai_focused", "heavy"]
+NAMES = ["blog:default", "blog:professional"]
+
+DOCUMENTS = [
+    make_document(250),
+    # Contractions the humanizer's word-bounded table and the ai_focused pass
+    # treat differently: inside longer words and after the humanizer has run
+    "A habit is hard to break. Submit is the last step, and the exhibit is open "
+    "until noon. The cannoted draft cannotes nothing, but we cannot wait. It is "
+    "clear that is what they are after, and I am sure you are right. Here is the "
+    "point: there is no reason we are late, so do not worry. It will not rain.",
+]
+
+
+def spec_plan(name, post_process):
+    """The uncompiled plan: every stage of the spec in order, without the LLM call"""
+    stages = [STAGES[stage] for stage in _expand(name, post_process) if stage != "llm_rewrite"]
+    return Plan(name, stages, [])
+
+
+def output(plan, document, seed, max_words):
+    result = run_pipeline(plan, document, seed, max_words=max_words)
+    return result["processed_content"], result["change_counts"], result["word_count"]
+
+
+@pytest.mark.parametrize("name", NAMES)
+@pytest.mark.parametrize("post_process", INTENSITIES)
+@pytest.mark.parametrize("max_words", [None, 150])
+def test_compiled_plan_matches_spec(name, post_process, max_words):
+    compiled = compile_pipeline(name, post_process)
+    reference = spec_plan(name, post_process)
+    for document in DOCUMENTS:
+        for seed in (1, 42):
+            assert output(compiled, document, seed, max_words) == output(reference, document, seed, max_words)
+
+
+@pytest.mark.parametrize("post_process", INTENSITIES)
+def test_blog_default_removals(post_process):
+    plan = compile_pipeline("blog:default", post_process)
+    assert plan.removed == [{"stage": "llm_rewrite", "reason": "not requested"}]
+
+    kept = [stage.name for stage in plan.stages]
+    removed = {entry["stage"] for entry in plan.removed}
+    assert kept == [stage for stage in _expand("blog:default", post_process) if stage not in removed]
+
+
+@pytest.mark.parametrize("post_process", INTENSITIES)
+def test_blog_professional_keeps_every_stage(post_process):
+    plan = compile_pipeline("blog:professional", post_process)
+    assert plan.removed == []
+    assert [stage.name for stage in plan.stages] == list(_expand("blog:professional", post_process))
+
+
+def test_llm_rewrite_is_kept_when_requested():
+    plan = compile_pipeline("blog:default", "balanced", llm_rewrite=True)
+    assert "llm_rewrite" in [stage.name for stage in plan.stages]
+    assert {"stage": "llm_rewrite", "reason": "not requested"} not in plan.removed
+
+
+def test_only_back_to_back_repeats_are_removed(monkeypatch):
+    monkeypatch.setitem(config.PIPELINES, "test:repeats", [
+        "contractions", "contractions", "vocabulary", "contractions", "polish", "polish"
+    ])
+    plan = compile_pipeline.__wrapped__("test:repeats")
+    assert [stage.name for stage in plan.stages] == ["contractions", "vocabulary", "contractions", "polish", "polish"]
+    assert plan.removed == [{"stage": "contractions", "reason": "duplicate"}]
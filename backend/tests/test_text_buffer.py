@@ -0,0 +1,112 @@
+"""
+Tests - TextBuffer and ReplacementTable against plain re.sub
+
+A replacement table applied in rounds through the buffer must give the same
+text as substituting its entries one after another on a string.
+"""
+
+import random
+import re
+
+import pytest
+
+from benchmarks.bench_text_buffer import make_document
+from services.humanizer_service import humanizer
+from services.text_buffer import ReplacementTable, TextBuffer
+
+# Phrases that overlap, contain each other or match each other's replacements
+OVERLAPPING_TABLE = {
+    "in order to": "to",
+    "order": "sequence",
+    "to the": "toward the",
+    "it is": "it's",
+    "is not": "isn't",
+    "not": "never",
+    "never": "not ever",
+    "sequence": "series",
+    "a lot of": "many",
+    "lot": "bunch",
+}
+
+WORDS = ["in", "order", "to", "the", "it", "is", "not", "never", "a", "lot", "of",
+         "sequence", "It", "IS", "Order", "toward", "lots", "orders", "to,", "not."]
+
+
+def substitute_in_order(table, text, word_boundaries=True, flags=re.IGNORECASE):
+    """Substitute every entry of the table, one full pass per entry, in table order"""
+    for phrase, replacements in table.items():
+        replacement = replacements if isinstance(replacements, str) else replacements[0]
+        pattern = re.escape(phrase)
+        if word_boundaries:
+            pattern = r'\b' + pattern + r'\b'
+        text = re.sub(pattern, lambda match: replacement, text, flags=flags)
+    return text
+
+
+def random_text(rng, words=60):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def apply_table(table, text, **options):
+    buffer = TextBuffer(text)
+    ReplacementTable(table, **options).apply(buffer)
+    return buffer.text
+
+
+@pytest.mark.parametrize("word_boundaries", [True, False])
+@pytest.mark.parametrize("flags", [re.IGNORECASE, 0])
+def test_overlapping_table_matches_sequential_sub(word_boundaries, flags):
+    rng = random.Random(7)
+    for _ in range(200):
+        text = random_text(rng)
+        expected = substitute_in_order(OVERLAPPING_TABLE, text, word_boundaries, flags)
+        assert apply_table(OVERLAPPING_TABLE, text, word_boundaries=word_boundaries, flags=flags) == expected
+
+
+def test_shuffled_tables_match_sequential_sub():
+    rng = random.Random(11)
+    entries = list(OVERLAPPING_TABLE.items())
+    for _ in range(50):
+        rng.shuffle(entries)
+        table = dict(entries)
+        text = random_text(rng)
+        assert apply_table(table, text) == substitute_in_order(table, text)
+
+
+@pytest.mark.parametrize("table_name, word_boundaries", [
+    ("human_replacements", False),
+    ("contractions", True),
+    ("vocabulary_replacements", True),
+])
+def test_humanizer_tables_match_sequential_sub(table_name, word_boundaries):
+    table = getattr(humanizer, table_name)
+    text = make_document(2000)
+    expected = substitute_in_order(table, text, word_boundaries)
+    assert apply_table(table, text, word_boundaries=word_boundaries) == expected
+
+
+def test_sub_matches_re_sub():
+    rng = random.Random(3)
+    pattern = re.compile(r'\b(not|never)\b', re.IGNORECASE)
+    for _ in range(100):
+        text = random_text(rng)
+        buffer = TextBuffer(text)
+        buffer.sub(pattern, r'[\1]')
+        assert buffer.text == pattern.sub(r'[\1]', text)
+
+
+def test_repeated_sub_passes_match_re_sub():
+    text = make_document(500)
+    buffer = TextBuffer(text)
+    for pattern, repl in [(r'\bthe\b', "THE"), (r'THE (\w+)', r'\1 THE'), (r'\s+', " "), (r'\.', "!")]:
+        buffer.sub(pattern, repl)
+        text = re.sub(pattern, repl, text)
+        assert buffer.text == text
+
+
+def test_apply_edits():
+    buffer = TextBuffer("one two three four")
+    assert buffer.apply([(0, 3, "1"), (8, 8, "and "), (14, 18, "")]) == 3
+    assert buffer.text == "1 two and three "
+    buffer.apply([(2, 5, "TWO"), (len(buffer), len(buffer), "end")])
+    assert buffer.text == "1 TWO and three end"
@@ -4,14 +4,39 @@ Flask UI for Blog Generator
 A simple web interface for generating blog posts using the FastAPI backend
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import requests
+from requests.adapters import HTTPAdapter
+import gzip
+import hashlib
 import json
 
+# Try to import optional libraries
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
 app = Flask(__name__)
 
 # FastAPI backend URL
 BACKEND_URL = "http://localhost:8000"
+BACKEND_POOL_SIZE = 32
+
+# Pooled keep-alive connections to the backend, shared by every request
+backend = requests.Session()
+backend.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE))
+backend.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE))
+
+# Browsers reuse the page this long before revalidating with its ETag
+PAGE_CACHE_MAX_AGE = 300
+
+# Per-connection headers that must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "trailers", "transfer-encoding", "upgrade"
+}
 
 # HTML template for the blog generator UI
 HTML_TEMPLATE = """
@@ -341,6 +366,7 @@ HTML_TEMPLATE = """
             document.getElementById('generateBtn').disabled = true;
             
             try {
+                // The backend queues the generation, so no request stays open for the whole run
                 const response = await fetch('/generate', {
                     method: 'POST',
                     headers: {
@@ -354,7 +380,12 @@ HTML_TEMPLATE = """
                     })
                 });
                 
-                const result = await response.json();
+                const job = await response.json().catch(() => ({}));
+                if (!response.ok) {
+                    throw new Error(errorMessage(job, `Backend error: ${response.status}`));
+                }
+                
+                const result = await waitForJob(job.job_id);
                 
                 if (result.success) {
                     // Display generated blog
@@ -391,6 +422,34 @@ HTML_TEMPLATE = """
             }
         });
         
+        function errorMessage(data, fallback) {
+            // Validation errors (422) carry a list of {loc, msg} objects
+            if (Array.isArray(data.detail)) {
+                return data.detail
+                    .map(item => `${(item.loc || []).filter(part => part !== 'body').join('.')}: ${item.msg}`)
+                    .join('; ');
+            }
+            return data.detail || data.error || fallback;
+        }
+        
+        function waitForJob(jobId) {
+            return new Promise((resolve, reject) => {
+                const source = new EventSource(`/jobs/${jobId}/events`);
+                source.addEventListener('completed', (e) => {
+                    source.close();
+                    resolve(JSON.parse(e.data).result);
+                });
+                source.addEventListener('failed', (e) => {
+                    source.close();
+                    reject(new Error(JSON.parse(e.data).error || 'Blog generation failed'));
+                });
+                source.onerror = () => {
+                    source.close();
+                    reject(new Error('Lost connection to the job progress stream'));
+                };
+            });
+        }
+        
         // Allow Enter key to submit
         document.getElementById('topic').addEventListener('keydown', function(e) {
             if (e.key === 'Enter') {
@@ -402,19 +461,70 @@ HTML_TEMPLATE = """
 </html>
 """
 
+def proxy_response(upstream):
+    """Relay a streamed backend response as-is, without buffering or re-encoding it"""
+    headers = [
+        (name, value) for name, value in upstream.raw.headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    ]
+    
+    def relay():
+        try:
+            # Chunks are forwarded as they arrive, so server-sent events pass straight through
+            yield from upstream.raw.stream(64 * 1024, decode_content=False)
+        finally:
+            upstream.close()
+    
+    return Response(stream_with_context(relay()), status=upstream.status_code, headers=headers)
+
+def backend_request(method, path, deadline=None, **kwargs):
+    """Call the backend over the pooled session, streaming the response"""
+    headers = kwargs.pop('headers', {})
+    # Let the browser and the backend negotiate compression end to end
+    headers['Accept-Encoding'] = request.headers.get('Accept-Encoding', 'identity')
+    if deadline:
+        # Seconds we will wait; the backend stops working on the request after that
+        headers['X-Request-Timeout-Ms'] = str(int(deadline * 1000))
+    return backend.request(method, f"{BACKEND_URL}{path}", headers=headers, stream=True, **kwargs)
+
+def build_page(html):
+    """Encode and precompress a page once, with an ETag for revalidation"""
+    body = html.encode('utf-8')
+    variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if HAS_BROTLI:
+        variants['br'] = brotli.compress(body, quality=11)
+    return {'variants': variants, 'etag': hashlib.sha256(body).hexdigest()[:20]}
+
+# The page has no template variables, so it is built once at startup
+INDEX_PAGE = build_page(HTML_TEMPLATE)
+
 @app.route('/')
 def index():
     """Main page with the blog generator UI"""
-    return render_template_string(HTML_TEMPLATE)
+    if request.if_none_match.contains_weak(INDEX_PAGE['etag']):
+        response = Response(status=304)
+    else:
+        encodings = [name for name in INDEX_PAGE['variants'] if name != 'identity']
+        encoding = request.accept_encodings.best_match(encodings)
+        response = Response(INDEX_PAGE['variants'][encoding or 'identity'], mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(INDEX_PAGE['etag'], weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = PAGE_CACHE_MAX_AGE
+    response.cache_control.must_revalidate = True
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/generate', methods=['POST'])
 def generate_blog():
-    """Generate blog by calling the FastAPI backend"""
+    """Queue a blog generation on the FastAPI backend"""
     try:
         data = request.get_json()
         
         # Prepare request for FastAPI backend
-        backend_request = {
+        backend_request_body = {
             "prompt": data.get('topic'),
             "style": data.get('style', 'informative'),
             "max_length": data.get('maxLength', 800),
@@ -422,29 +532,15 @@ def generate_blog():
             "processing_intensity": "heavy"
         }
         
-        # Call FastAPI backend
-        response = requests.post(
-            f"{BACKEND_URL}/generate-blog",
-            json=backend_request,
-            headers={'Content-Type': 'application/json'},
-            timeout=60
+        # The backend returns a job id right away; progress is followed over /jobs/<id>/events
+        upstream = backend_request(
+            'POST',
+            '/jobs/generate-blog',
+            json=backend_request_body,
+            timeout=(5, 30),
+            deadline=30
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return jsonify({
-                'success': True,
-                'content': result.get('content', ''),
-                'word_count': result.get('word_count', 0),
-                'model_used': result.get('model_used', ''),
-                'processing_changes': result.get('processing_changes', 0)
-            })
-        else:
-            error_data = response.json() if response.content else {}
-            return jsonify({
-                'success': False,
-                'error': error_data.get('detail', f'Backend error: {response.status_code}')
-            }), 400
+        return proxy_response(upstream)
             
     except requests.exceptions.ConnectionError:
         return jsonify({
@@ -454,7 +550,7 @@ def generate_blog():
     except requests.exceptions.Timeout:
         return jsonify({
             'success': False,
-            'error': 'Request timed out. The blog generation is taking too long.'
+            'error': 'Request timed out. The backend did not accept the job in time.'
         }), 500
     except Exception as e:
         return jsonify({
@@ -462,11 +558,25 @@ def generate_blog():
             'error': f'Unexpected error: {str(e)}'
         }), 500
 
+@app.route('/jobs/<job_id>')
+@app.route('/jobs/<job_id>/events')
+def job_proxy(job_id):
+    """Relay job status and server-sent progress events from the backend"""
+    try:
+        # The read timeout applies between chunks; the backend sends keep-alives
+        upstream = backend_request('GET', request.path, timeout=(5, 60))
+        return proxy_response(upstream)
+    except requests.exceptions.RequestException:
+        return jsonify({
+            'success': False,
+            'error': 'Cannot connect to backend server. Make sure the FastAPI server is running on port 8000.'
+        }), 502
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
     try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=5)
+        response = backend.get(f"{BACKEND_URL}/health", timeout=5)
         if response.status_code == 200:
             return jsonify({'status': 'healthy', 'backend': 'connected'})
         else: